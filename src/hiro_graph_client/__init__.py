@@ -1,28 +1,65 @@
 """
 Package which contains the classes to communicate with HIRO Graph.
+
+The classes are imported from their submodules on first access, so importing this package does not load *requests*,
+*websocket* or *apscheduler* until they are needed.
 """
-import site
-from os import path
-
-from hiro_graph_client.appclient import HiroApp
-from hiro_graph_client.authclient import HiroAuth
-from hiro_graph_client.authzclient import HiroAuthz
-from hiro_graph_client.client import HiroGraph
-from hiro_graph_client.clientlib import AbstractTokenApiHandler, GraphConnectionHandler, AuthenticationTokenError, \
-    FixedTokenError, TokenUnauthorizedError, PasswordAuthTokenApiHandler, FixedTokenApiHandler, \
-    EnvironmentTokenApiHandler, SSLConfig
-from hiro_graph_client.iamclient import HiroIam
-from hiro_graph_client.kiclient import HiroKi
-from hiro_graph_client.variablesclient import HiroVariables
+import importlib
+
 from hiro_graph_client.version import __version__
 
-this_directory = path.abspath(path.dirname(__file__))
+_lazy_attributes = {
+    'HiroApp': 'hiro_graph_client.appclient',
+    'HiroAuth': 'hiro_graph_client.authclient',
+    'HiroAuthz': 'hiro_graph_client.authzclient',
+    'HiroGraph': 'hiro_graph_client.client',
+    'HiroIam': 'hiro_graph_client.iamclient',
+    'HiroKi': 'hiro_graph_client.kiclient',
+    'HiroVariables': 'hiro_graph_client.variablesclient',
+    'AbstractTokenApiHandler': 'hiro_graph_client.clientlib',
+    'GraphConnectionHandler': 'hiro_graph_client.clientlib',
+    'AuthenticationTokenError': 'hiro_graph_client.clientlib',
+    'FixedTokenError': 'hiro_graph_client.clientlib',
+    'TokenUnauthorizedError': 'hiro_graph_client.clientlib',
+    'PasswordAuthTokenApiHandler': 'hiro_graph_client.clientlib',
+    'FixedTokenApiHandler': 'hiro_graph_client.clientlib',
+    'EnvironmentTokenApiHandler': 'hiro_graph_client.clientlib',
+    'SSLConfig': 'hiro_graph_client.clientlib',
+    'FileTokenStore': 'hiro_graph_client.cachelib',
+    'FileVersionCache': 'hiro_graph_client.cachelib',
+    'FileEventPositionStore': 'hiro_graph_client.cachelib',
+    'AbstractEventsWebSocketHandler': 'hiro_graph_client.eventswebsocket',
+    'EventsFilter': 'hiro_graph_client.eventswebsocket',
+    'EventMessage': 'hiro_graph_client.eventswebsocket',
+    'AbstractActionWebSocketHandler': 'hiro_graph_client.actionwebsocket',
+    'TimeseriesWriter': 'hiro_graph_client.timeserieswriter',
+    'TimeseriesCache': 'hiro_graph_client.timeseriescache',
+    'TimeseriesFollower': 'hiro_graph_client.timeseriesfollower',
+    'TimeseriesSpool': 'hiro_graph_client.timeseriesspool',
+    'TimeseriesShipper': 'hiro_graph_client.timeseriesspool',
+    'SpoolFullError': 'hiro_graph_client.timeseriesspool'
+}
+""" Attributes of this package and the submodules they are imported from on first access """
 
 __all__ = [
     'HiroGraph', 'HiroAuth', 'HiroApp', 'HiroIam', 'HiroKi', 'HiroAuthz', 'HiroVariables', 'GraphConnectionHandler',
     'AbstractTokenApiHandler', 'PasswordAuthTokenApiHandler', 'FixedTokenApiHandler', 'EnvironmentTokenApiHandler',
     'AuthenticationTokenError', 'FixedTokenError', 'TokenUnauthorizedError', '__version__',
-    'SSLConfig'
+    'SSLConfig', 'FileTokenStore', 'FileVersionCache', 'FileEventPositionStore', 'AbstractEventsWebSocketHandler',
+    'EventsFilter', 'EventMessage', 'AbstractActionWebSocketHandler', 'TimeseriesWriter',
+    'TimeseriesCache', 'TimeseriesFollower', 'TimeseriesSpool', 'TimeseriesShipper', 'SpoolFullError'
 ]
 
-site.addsitedir(this_directory)
+
+def __getattr__(name: str):
+    module_name = _lazy_attributes.get(name)
+    if not module_name:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
@@ -13,6 +13,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from websocket import WebSocketApp
 
 from hiro_graph_client.clientlib import AbstractTokenApiHandler
+from hiro_graph_client.profiling import profiled
 from hiro_graph_client.websocketlib import AbstractAuthenticatedWebSocketHandler
 
 logger = logging.getLogger(__name__)
@@ -583,7 +584,8 @@ class AbstractActionWebSocketHandler(AbstractAuthenticatedWebSocketHandler):
                     return
 
                 try:
-                    self.on_submit_action(action_message.id, action_message.capability, action_message.parameters)
+                    with profiled('on_submit_action', self):
+                        self.on_submit_action(action_message.id, action_message.capability, action_message.parameters)
                 except Exception as err:
                     logger.error(str(err))
                     self.send_action_result(action_id=action_message.id, result=None, code=500, message=str(err))
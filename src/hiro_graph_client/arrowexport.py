@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Conversion of paged results of HIRO Graph into columnar Apache Arrow batches and Parquet files.
+
+Requires the optional package *pyarrow* (``pip install hiro_graph_client[arrow]``). It is imported on first use.
+
+The schema is inferred from the values: Each attribute becomes a column, its type is the type *pyarrow* infers for
+its values. Attributes without any values, JSON objects and attributes with mixed types become string columns (objects
+as JSON).
+
+* :func:`to_table` infers the schema of each page and unifies them: Attributes of later pages are added as columns and
+  conflicting types are promoted (int64 and double to double, any other conflict to string).
+* :func:`to_parquet` has to fix the schema before the first page is written. It infers it from the first page and raises
+  :class:`SchemaMismatchError` when a later page has an attribute that is not part of it or a value that does not match
+  the type of its column. Use :func:`scan_schema` to infer the schema of all pages in a first pass instead.
+
+With an explicit *schema*, only its columns are exported: Other attributes are dropped and values that cannot be
+converted become null, both with a warning.
+"""
+import json
+import logging
+from collections.abc import Mapping
+from typing import Iterator, Iterable, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+
+def import_pyarrow():
+    """
+    :return: The module *pyarrow*.
+    :raises ImportError: When *pyarrow* is not installed.
+    """
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError as err:
+        raise ImportError("Arrow and Parquet export require the package 'pyarrow'. "
+                          "Install it via 'pip install hiro_graph_client[arrow]'.") from err
+
+
+def _to_string(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (Mapping, list)):
+        return json.dumps(value, default=lambda obj: dict(obj) if isinstance(obj, Mapping) else str(obj))
+    return str(value)
+
+
+class SchemaMismatchError(ValueError):
+    """
+    A page does not fit the schema that has been inferred from the first page.
+    """
+    pass
+
+
+def _needs_string_column(data_type) -> bool:
+    pa = import_pyarrow()
+    while pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        data_type = data_type.value_type
+    return pa.types.is_struct(data_type) or pa.types.is_null(data_type)
+
+
+def _infer_schema(rows: List[Mapping]):
+    pa = import_pyarrow()
+
+    names = {}
+    for row in rows:
+        for name in row:
+            names.setdefault(name, None)
+
+    fields = []
+    for name in names:
+        values = [row.get(name) for row in rows]
+        try:
+            data_type = pa.array([dict(value) if isinstance(value, Mapping) else value for value in values]).type
+            if not pa.types.is_null(data_type) and _needs_string_column(data_type):
+                data_type = pa.string()
+        except (pa.ArrowException, TypeError, ValueError, OverflowError):
+            data_type = pa.string()
+        fields.append(pa.field(name, data_type))
+
+    return pa.schema(fields)
+
+
+def _without_null_types(schema):
+    pa = import_pyarrow()
+    return pa.schema([pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field for field in schema])
+
+
+def _promote(name: str, left, right):
+    pa = import_pyarrow()
+
+    if left == right or pa.types.is_null(right):
+        return left
+    if pa.types.is_null(left):
+        return right
+    try:
+        return pa.unify_schemas([pa.schema([pa.field(name, left)]), pa.schema([pa.field(name, right)])],
+                                promote_options='permissive').field(name).type
+    except (pa.ArrowException, TypeError, ValueError):
+        return pa.string()
+
+
+def infer_schema(rows: List[Mapping]):
+    """
+    Infer the schema of the columns of *rows*.
+
+    :param rows: The rows of one page.
+    :return: The *pyarrow.Schema* with one field per attribute in the order of their first appearance.
+    """
+    return _without_null_types(_infer_schema(rows))
+
+
+def unify_schemas(schemas: Iterable):
+    """
+    Unify the schemas of several pages: The columns of all schemas in the order of their first appearance. Conflicting
+    types are promoted to a common type, like int64 and double to double, or to string.
+
+    :param schemas: The *pyarrow.Schema* objects.
+    :return: The unified *pyarrow.Schema*.
+    """
+    pa = import_pyarrow()
+
+    types = {}
+    for schema in schemas:
+        for field in schema:
+            types[field.name] = _promote(field.name, types[field.name], field.type) \
+                if field.name in types else field.type
+
+    return _without_null_types(pa.schema([pa.field(name, data_type) for name, data_type in types.items()]))
+
+
+def scan_schema(pages: Iterable[List[Mapping]]):
+    """
+    Infer the schema of all *pages* without keeping them in memory. Use it for a first pass over the pages before
+    they are written with :func:`to_parquet`.
+
+    :param pages: Pages of rows.
+    :return: The unified *pyarrow.Schema* of all pages.
+    """
+    return unify_schemas(_infer_schema(rows) for rows in pages if rows)
+
+
+def _conform(batch, schema):
+    """
+    :param batch: A *pyarrow.RecordBatch*.
+    :param schema: A *pyarrow.Schema* that has been unified with the schema of *batch*.
+    :return: *batch* with the columns and types of *schema*.
+    """
+    pa = import_pyarrow()
+
+    arrays = []
+    for field in schema:
+        index = batch.schema.get_field_index(field.name)
+        if index < 0:
+            arrays.append(pa.nulls(batch.num_rows, type=field.type))
+            continue
+
+        column = batch.column(index)
+        if column.type == field.type:
+            arrays.append(column)
+        elif pa.types.is_string(field.type):
+            arrays.append(pa.array([_to_string(value) for value in column.to_pylist()], type=field.type))
+        else:
+            try:
+                arrays.append(column.cast(field.type))
+            except pa.ArrowInvalid:
+                arrays.append(column.cast(field.type, safe=False))
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class RecordBatchConverter:
+    """
+    Converts pages of rows to *pyarrow.RecordBatch* objects of one schema.
+    """
+
+    schema: Any
+    """ The *pyarrow.Schema* of all batches. Inferred from the first page if not given. """
+
+    strict: bool
+    """ Raise :class:`SchemaMismatchError` instead of dropping attributes or values that do not fit the schema """
+
+    _reported: set
+    """ Columns that have already been warned about """
+
+    def __init__(self, schema=None, strict: bool = False):
+        """
+        Constructor
+
+        :param schema: Optional *pyarrow.Schema*. Default is to infer it from the first page.
+        :param strict: Raise :class:`SchemaMismatchError` instead of dropping attributes that are not part of the
+               schema and replacing values that do not match the type of their column by null, both with a warning.
+               Default is False.
+        """
+        self.schema = schema
+        self.strict = strict
+        self._reported = set()
+
+    def convert(self, rows: List[Mapping]):
+        """
+        :param rows: One page of rows.
+        :return: The *pyarrow.RecordBatch* of *rows*.
+        """
+        pa = import_pyarrow()
+
+        if self.schema is None:
+            self.schema = infer_schema(rows)
+
+        self._report_unknown_columns(rows)
+
+        arrays = [self._convert_column(field, [row.get(field.name) for row in rows]) for field in self.schema]
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def _convert_column(self, field, values: list):
+        pa = import_pyarrow()
+
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            return pa.array([_to_string(value) for value in values], type=field.type)
+
+        try:
+            return pa.array(values, type=field.type)
+        except (pa.ArrowException, TypeError, ValueError, OverflowError):
+            pass
+
+        converted = []
+        failures = 0
+        for value in values:
+            try:
+                pa.scalar(value, type=field.type)
+                converted.append(value)
+            except (pa.ArrowException, TypeError, ValueError, OverflowError):
+                if self.strict:
+                    raise SchemaMismatchError(f"Value {value!r} of column '{field.name}' does not match its type "
+                                              f"{field.type}.")
+                converted.append(None)
+                failures += 1
+
+        logger.warning("%d values of column '%s' do not match its type %s and have been replaced by null.",
+                       failures, field.name, field.type)
+        return pa.array(converted, type=field.type)
+
+    def _report_unknown_columns(self, rows: List[Mapping]) -> None:
+        names = set(self.schema.names)
+        for row in rows:
+            for name in row:
+                if name not in names and self.strict:
+                    raise SchemaMismatchError(f"Column '{name}' is not part of the schema.")
+                if name not in names and name not in self._reported:
+                    self._reported.add(name)
+                    logger.warning("Column '%s' is not part of the schema and has been dropped.", name)
+
+
+def record_batches(pages: Iterable[List[Mapping]], schema=None, strict: bool = False) -> Iterator:
+    """
+    :param pages: Pages of rows.
+    :param schema: Optional *pyarrow.Schema*. Default is to infer it from the first page.
+    :param strict: Raise :class:`SchemaMismatchError` for pages that do not fit the schema. See
+           :class:`RecordBatchConverter`. Default is False.
+    :return: Iterator over one *pyarrow.RecordBatch* per non-empty page.
+    """
+    converter = RecordBatchConverter(schema, strict)
+    for rows in pages:
+        if rows:
+            yield converter.convert(rows)
+
+
+def to_table(pages: Iterable[List[Mapping]], schema=None):
+    """
+    :param pages: Pages of rows.
+    :param schema: Optional *pyarrow.Schema*. Default is to unify the schemas inferred from each page.
+    :return: A *pyarrow.Table* with all rows.
+    """
+    pa = import_pyarrow()
+
+    if schema is not None:
+        batches = list(record_batches(pages, schema))
+    else:
+        # Each page is converted with its own schema, so no attribute or value is lost before the schemas are unified.
+        batches = [RecordBatchConverter(_infer_schema(rows)).convert(rows) for rows in pages if rows]
+        schema = unify_schemas(batch.schema for batch in batches)
+        batches = [_conform(batch, schema) for batch in batches]
+
+    if batches:
+        return pa.Table.from_batches(batches, schema=schema)
+
+    return schema.empty_table()
+
+
+def to_parquet(pages: Iterable[List[Mapping]], path: Any, schema=None, compression: str = 'snappy') -> int:
+    """
+    Write all rows to a Parquet file page by page, so only one page is held in memory at a time.
+
+    :param pages: Pages of rows.
+    :param path: Path or writable binary file object for the Parquet file.
+    :param schema: Optional *pyarrow.Schema*, e.g. from :func:`scan_schema`. Default is to infer it from the first
+           page.
+    :param compression: Compression codec of the Parquet file. Default is 'snappy'.
+    :return: Amount of rows written.
+    :raises SchemaMismatchError: When the schema has been inferred from the first page and a later page has an
+            attribute that is not part of it or a value that does not match the type of its column.
+    """
+    pa = import_pyarrow()
+    import pyarrow.parquet as pq
+
+    writer = None
+    count = 0
+    try:
+        for batch in record_batches(pages, schema, strict=schema is None):
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema, compression=compression)
+            writer.write_table(pa.Table.from_batches([batch]))
+            count += batch.num_rows
+
+        if writer is None:
+            writer = pq.ParquetWriter(path, schema or pa.schema([]), compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return count
+
+
+def flatten_event(event: Mapping) -> dict:
+    """
+    Turn an event of the history into a flat row: The attributes of its body plus the remaining fields of the event
+    with the prefix *event/*, like *event/type* and *event/timestamp*.
+
+    :param event: The event.
+    :return: The row.
+    """
+    row = {f"event/{key}": value for key, value in event.items() if key != 'body'}
+    body = event.get('body')
+    if isinstance(body, Mapping):
+        row.update(body)
+    return row
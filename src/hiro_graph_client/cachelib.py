@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Stores for data that can be shared between processes on the same host and survive restarts, like the tokens of a
+TokenApiHandler or the result of /api/version.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import weakref
+from abc import abstractmethod
+from contextlib import contextmanager
+from typing import Optional, Iterator, IO, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+
+###################################################################################################################
+# File lock
+###################################################################################################################
+
+class _FileLockState:
+    """
+    The state of the lock on one lock file, shared by all :class:`FileLock` objects of its path within this process.
+    """
+
+    thread_lock: threading.RLock
+    """ Serializes the threads of this process since file locks are held per process """
+
+    file: Optional[IO] = None
+    depth: int = 0
+
+    def __init__(self):
+        self.thread_lock = threading.RLock()
+
+
+_file_lock_states: "weakref.WeakValueDictionary[str, _FileLockState]" = weakref.WeakValueDictionary()
+""" The state of each lock file in use by this process """
+
+_file_lock_states_lock = threading.Lock()
+""" Guards *_file_lock_states* """
+
+
+class FileLock:
+    """
+    An exclusive lock that works between processes as well as between threads of the same process. Uses an advisory
+    lock on a lock file (*fcntl.flock* on POSIX, *msvcrt.locking* on Windows).
+
+    All FileLock objects of the same path within a process share one lock, since locks on separate file descriptors of
+    one process do not exclude each other. The lock is reentrant for the thread that holds it.
+    """
+
+    path: str
+    """ Path of the lock file """
+
+    _state: _FileLockState
+    """ The state shared with the other FileLock objects of *self.path* """
+
+    def __init__(self, path: str):
+        """
+        Constructor
+
+        :param path: Path of the lock file. Will be created if it does not exist.
+        """
+        self.path = path
+
+        with _file_lock_states_lock:
+            key = os.path.realpath(path)
+            self._state = _file_lock_states.get(key)
+            if self._state is None:
+                self._state = _file_lock_states[key] = _FileLockState()
+
+    def acquire(self) -> None:
+        state = self._state
+        state.thread_lock.acquire()
+        try:
+            if state.depth == 0:
+                file = open(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600), 'r+b')
+                try:
+                    if fcntl:
+                        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+                    else:  # pragma: no cover
+                        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                except Exception:
+                    file.close()
+                    raise
+                state.file = file
+            state.depth += 1
+        except Exception:
+            state.thread_lock.release()
+            raise
+
+    def release(self) -> None:
+        state = self._state
+        try:
+            state.depth -= 1
+            if state.depth == 0:
+                try:
+                    if fcntl:
+                        fcntl.flock(state.file.fileno(), fcntl.LOCK_UN)
+                    else:  # pragma: no cover
+                        state.file.seek(0)
+                        msvcrt.locking(state.file.fileno(), msvcrt.LK_UNLCK, 1)
+                finally:
+                    state.file.close()
+                    state.file = None
+        finally:
+            state.thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.release()
+
+
+###################################################################################################################
+# Token stores
+###################################################################################################################
+
+class AbstractTokenStore:
+    """
+    Root class for stores that share token information (see :class:`~hiro_graph_client.clientlib.TokenInfo`) between
+    several TokenApiHandlers, even across processes.
+
+    A TokenApiHandler holds *self.lock()* while it reads the stored token and obtains or refreshes it if necessary, so
+    only one of the handlers sharing a store talks to the auth API at a time while the others reuse its result.
+    """
+
+    @staticmethod
+    def make_key(*args: Optional[str]) -> str:
+        """
+        Create a key for an entry in the store that does not reveal its components.
+
+        :param args: Strings that identify the token, like root_url, client_id and username.
+        :return: Hash over all *args*.
+        """
+        return hashlib.sha256('\n'.join(arg or '' for arg in args).encode('utf-8')).hexdigest()
+
+    @abstractmethod
+    def lock(self):
+        """
+        :return: A context manager which holds an exclusive lock on the store.
+        """
+        raise RuntimeError('Cannot use method of this abstract class.')
+
+    @abstractmethod
+    def load(self, key: str) -> Optional[dict]:
+        """
+        :param key: Key of the entry.
+        :return: The stored dict or None if nothing has been stored under *key*.
+        """
+        raise RuntimeError('Cannot use method of this abstract class.')
+
+    @abstractmethod
+    def save(self, key: str, data: Optional[dict]) -> None:
+        """
+        :param key: Key of the entry.
+        :param data: The dict to store. None removes the entry.
+        """
+        raise RuntimeError('Cannot use method of this abstract class.')
+
+
+class JsonFileStore:
+    """
+    A dict of JSON values in a file that is shared between all processes of a host which use the same *path*, i.e. the
+    workers of a pre-forking server. Each entry is stored under a key.
+
+    The file is created with permissions 0600 and replaced atomically on each write. Different stores (like
+    :class:`FileTokenStore` and :class:`FileVersionCache`) can share the same file since their keys do not overlap.
+    All stores of the same path within a process share one :class:`FileLock`, so their updates do not get lost.
+    """
+
+    path: str
+    """ Path of the JSON file """
+
+    _file_lock: FileLock
+
+    def __init__(self, path: str):
+        """
+        Constructor
+
+        :param path: Path of the JSON file. A lock file with the additional suffix *.lock* will be created next to it.
+        """
+        self.path = path
+        self._file_lock = FileLock(path + '.lock')
+
+    def lock(self) -> FileLock:
+        return self._file_lock
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+                return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as err:
+            logger.warning("Cannot read %s: %s", self.path, str(err))
+            return {}
+
+    def _write(self, data: dict) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.jsonstore-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self, key: str) -> Optional[dict]:
+        with self._file_lock:
+            return self._read().get(key)
+
+    def save(self, key: str, data: Optional[dict]) -> None:
+        with self._file_lock:
+            content = self._read()
+            if data is None:
+                content.pop(key, None)
+            else:
+                content[key] = data
+            self._write(content)
+
+
+class FileTokenStore(JsonFileStore, AbstractTokenStore):
+    """
+    Token store in a JSON file. See :class:`JsonFileStore`.
+
+    Since a stored token is reused as long as it has not expired, this store also lets short-lived processes start
+    without obtaining a new token first.
+
+    The file contains access tokens and refresh tokens. It should be located in a directory only the owner of the
+    processes can access.
+    """
+    pass
+
+
+###################################################################################################################
+# Version cache
+###################################################################################################################
+
+class FileVersionCache(JsonFileStore):
+    """
+    Caches the result of /api/version per root_url in a JSON file. See :class:`JsonFileStore`.
+    """
+
+    ttl: int
+    """ Seconds after which a cached entry is considered stale """
+
+    def __init__(self, path: str, ttl: int = 3600):
+        """
+        Constructor
+
+        :param path: Path of the JSON file.
+        :param ttl: Seconds after which a cached entry is considered stale and should be revalidated. Default is one
+               hour.
+        """
+        super().__init__(path)
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(root_url: str) -> str:
+        return 'version:' + root_url
+
+    def load_version(self, root_url: str) -> Tuple[Optional[dict], bool]:
+        """
+        :param root_url: The root_url of the version info.
+        :return: Tuple of the cached version info (or None) and a flag that is True when the entry is stale.
+        """
+        entry = self.load(self._key(root_url))
+        if not entry or not isinstance(entry.get('version_info'), dict):
+            return None, True
+
+        return entry['version_info'], time.time() - float(entry.get('timestamp') or 0) > self.ttl
+
+    def save_version(self, root_url: str, version_info: dict) -> None:
+        """
+        :param root_url: The root_url of the version info.
+        :param version_info: The result of /api/version.
+        """
+        self.save(self._key(root_url), {"version_info": version_info, "timestamp": time.time()})
+
+
+###################################################################################################################
+# Event positions
+###################################################################################################################
+
+class FileEventPositionStore(JsonFileStore):
+    """
+    Stores the position (timestamp and nanotime) of the last event an events websocket has delivered, so a consumer
+    can catch up on the events it missed after a restart. See :class:`JsonFileStore`.
+    """
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return 'events:' + name
+
+    def load_position(self, name: str) -> Optional[Tuple[int, int]]:
+        """
+        :param name: Name of the consumer.
+        :return: Tuple of timestamp in ms and nanotime of the last event or None if nothing has been stored.
+        """
+        entry = self.load(self._key(name))
+        if not entry or entry.get('timestamp') is None:
+            return None
+
+        return int(entry['timestamp']), int(entry.get('nanotime') or 0)
+
+    def save_position(self, name: str, timestamp: int, nanotime: int) -> None:
+        """
+        :param name: Name of the consumer.
+        :param timestamp: Timestamp in ms of the last event.
+        :param nanotime: Nanotime of the last event.
+        """
+        self.save(self._key(name), {"timestamp": timestamp, "nanotime": nanotime})
+
+
+@contextmanager
+def optional_lock(lock) -> Iterator[None]:
+    """
+    Hold *lock* if it is not None.
+
+    :param lock: A context manager or None.
+    """
+    if lock is None:
+        yield
+    else:
+        with lock:
+            yield
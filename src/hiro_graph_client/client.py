@@ -1,26 +1,54 @@
 #!/usr/bin/env python3
 import datetime
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Iterator, Union, List, Dict
-from urllib.parse import quote_plus
+from urllib.parse import quote_plus, quote
 
+from hiro_graph_client import arrowexport, replay, timeserieslib, timeseriesaggregation
 from hiro_graph_client.clientlib import AuthenticatedAPIHandler, AbstractTokenApiHandler
+from hiro_graph_client.nodeloader import BatchLoader, MISSING
+from hiro_graph_client.profiling import profile_public_methods
+from hiro_graph_client.records import record_pairs_hook
 
+logger = logging.getLogger(__name__)
+""" The logger for this module """
 
+MAX_IDS_QUERY_LENGTH = 4000
+""" Max length of the url-encoded ids within one request of :func:`HiroGraph.get_nodes` """
+
+
+@profile_public_methods
 class HiroGraph(AuthenticatedAPIHandler):
     """
     Python implementation for accessing the HIRO Graph REST API.
     See https://core.engine.datagroup.de/help/specs/?url=definitions/graph.yaml
     """
 
-    def __init__(self, api_handler: AbstractTokenApiHandler):
+    _node_loader: BatchLoader = None
+    """ Batches calls of :func:`get_node` if *batch_lookups* is set """
+
+    def __init__(self,
+                 api_handler: AbstractTokenApiHandler,
+                 batch_lookups: bool = False,
+                 batch_window: float = 0.005,
+                 max_batch_size: int = 100):
         """
         Constructor
 
         :param api_handler: External API handler.
+        :param batch_lookups: Collect calls of :func:`get_node` from several threads within *batch_window* and fetch
+               them with one request via */query/ids*. Default is False.
+        :param batch_window: Seconds to wait for more lookups after the first one of a batch. Default is 0.005.
+        :param max_batch_size: Max lookups per batch. Default is 100.
         """
         super().__init__(api_name='graph',
                          api_handler=api_handler)
 
+        if batch_lookups:
+            self._node_loader = BatchLoader(self._load_nodes, batch_window, max_batch_size)
+
     ###############################################################################################################
     # REST API operations
     ###############################################################################################################
@@ -49,7 +77,8 @@ class HiroGraph(AuthenticatedAPIHandler):
               offset=0,
               order: str = None,
               meta: bool = None,
-              count: bool = None) -> dict:
+              count: bool = None,
+              records: bool = False) -> dict:
         """
         https://core.engine.datagroup.de/help/specs/?url=definitions/graph.yaml#/[Query]_Search/post_query_vertices
 
@@ -61,6 +90,8 @@ class HiroGraph(AuthenticatedAPIHandler):
         :param meta: List detailed metainformations in result payload
         :param count: Just return the number of found items. Result payload is like
                ``{"items":[<number of items found as int>]}``.
+        :param records: Return vertices and edges as compact, read-only
+               :class:`~hiro_graph_client.records.GraphRecord` instead of dicts. Default is False.
         :return: Result payload
         """
         url = self.endpoint + '/query/vertices'
@@ -78,7 +109,7 @@ class HiroGraph(AuthenticatedAPIHandler):
             data['listMeta'] = meta
         if count is not None:
             data['count'] = count
-        return self.post(url, data)
+        return self.post(url, data, object_pairs_hook=record_pairs_hook if records else None)
 
     def query_gremlin(self,
                       query: str,
@@ -108,17 +139,19 @@ class HiroGraph(AuthenticatedAPIHandler):
             data['listMeta'] = meta
         return self.post(url, data)
 
-    def create_node(self, data: dict, obj_type: str, return_id=False) -> Union[dict, str]:
+    def create_node(self, data: dict, obj_type: str, return_id=False, stream: bool = False) -> Union[dict, str]:
         """
         https://core.engine.datagroup.de/help/specs/?url=definitions/graph.yaml#/[Graph]_Entity/post_new__type_
 
         :param data: Payload for the new node/vertex
         :param obj_type: ogit/_type of the new node/vertex
         :param return_id: Return only the ogit/_id as string. Default is False to return everything as dict.
+        :param stream: Encode the payload incrementally while it is sent. Use this for very large payloads. Default is
+               False.
         :return: The result payload
         """
         url = self.endpoint + '/new/' + quote_plus(obj_type)
-        res = self.post(url, data)
+        res = self.post(url, data, stream=stream)
         return res['ogit/_id'] if return_id and 'error' not in res else res
 
     def update_node(self, node_id: str, data: dict) -> dict:
@@ -189,6 +222,12 @@ class HiroGraph(AuthenticatedAPIHandler):
         :param meta: List detailed metainformations in result payload
         :return: The result payload
         """
+        if self._node_loader and not vid:
+            result = self._node_loader.load((node_id, fields.replace(" ", "") if fields else None, meta,
+                                             include_deleted))
+            if result is not MISSING:
+                return dict(result)
+
         query = {
             "fields": fields.replace(" ", "") if fields else None,
             "listMeta": meta,
@@ -204,25 +243,81 @@ class HiroGraph(AuthenticatedAPIHandler):
                   fields: str = None,
                   meta: bool = None,
                   include_deleted: bool = None,
-                  ) -> dict:
+                  records: bool = False,
+                  chunk_size: int = None,
+                  max_query_length: int = MAX_IDS_QUERY_LENGTH,
+                  concurrency: int = 4) -> dict:
         """
         https://core.engine.datagroup.de/help/specs/?url=definitions/graph.yaml#/[Query]_Search/get_query_ids
 
+        By default, all ids are fetched with a single request and its result is returned as is. Set *chunk_size* to
+        split long lists of ids into chunks of at most *chunk_size* ids and *max_query_length* characters of the
+        url-encoded ids, which are fetched concurrently. The items of a chunked result are in the order of *node_ids*
+        and each id is contained once. Ids that have not been found are listed under *missing* in the result.
+
         :param node_ids: list of ogit/_ids of the node/vertexes or edges
         :param fields: Filter for fields
         :param meta: List detailed metainformations in result payload
         :param include_deleted: allow to get if ogit/_is-deleted=true
-        :return: The result payload
+        :param records: Return vertices and edges as compact, read-only
+               :class:`~hiro_graph_client.records.GraphRecord` instead of dicts. Default is False.
+        :param chunk_size: Max ids per request. Default is None: One request for all ids.
+        :param max_query_length: Max length of the url-encoded ids per request with *chunk_size*. Default is
+               *MAX_IDS_QUERY_LENGTH*.
+        :param concurrency: Max parallel requests with *chunk_size*. Should not exceed the *pool_maxsize* of the
+               connection. Default is 4.
+        :return: The result payload. With *chunk_size*: *{"items": [...], "missing": [...]}* or the first error.
         """
-        query = {
-            "query": ",".join(node_ids),
-            "fields": fields.replace(" ", "") if fields else None,
-            "includeDeleted": include_deleted,
-            "listMeta": meta
-        }
+        if not chunk_size:
+            query = {
+                "query": ",".join(node_ids),
+                "fields": fields.replace(" ", "") if fields else None,
+                "includeDeleted": include_deleted,
+                "listMeta": meta
+            }
+
+            url = self.endpoint + '/query/ids' + self._get_query_part(query)
+            return self.get(url, object_pairs_hook=record_pairs_hook if records else None)
+
+        unique_ids = list(dict.fromkeys(node_ids))
+
+        requested_fields = fields.replace(" ", "") if fields else None
+        if requested_fields and 'ogit/_id' not in requested_fields.split(','):
+            # ogit/_id is needed to merge the chunks and removed from the items again.
+            fields = requested_fields + ',ogit/_id'
+        else:
+            fields = requested_fields
+
+        def _get_chunk(chunk: List[str]) -> dict:
+            query = {
+                "query": ",".join(chunk),
+                "fields": fields,
+                "includeDeleted": include_deleted,
+                "listMeta": meta
+            }
+
+            url = self.endpoint + '/query/ids' + self._get_query_part(query)
+            return self.get(url, object_pairs_hook=record_pairs_hook if records else None)
+
+        chunks = self._chunk_ids(unique_ids, chunk_size, max_query_length)
+        if len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="GetNodes") as executor:
+                results = list(executor.map(_get_chunk, chunks))
+        else:
+            results = [_get_chunk(chunks[0] if chunks else [])]
 
-        url = self.endpoint + '/query/ids' + self._get_query_part(query)
-        return self.get(url)
+        items_by_id = {}
+        for result in results:
+            if 'error' in result:
+                return result
+            for item in result.get('items') or []:
+                items_by_id.setdefault(item.get('ogit/_id'), item)
+
+        merged = dict(results[0])
+        merged['items'] = [self._without_added_field(items_by_id[node_id], requested_fields, 'ogit/_id')
+                           for node_id in unique_ids if node_id in items_by_id]
+        merged['missing'] = [node_id for node_id in unique_ids if node_id not in items_by_id]
+        return merged
 
     def get_node_by_xid(self,
                         node_id: str,
@@ -269,23 +364,167 @@ class HiroGraph(AuthenticatedAPIHandler):
         :param include_deleted: allow to get if ogit/_is-deleted=true
         :return: The result payload. Either a list of dict or a dict with an error message.
         """
-        query = {
-            "from": starttime,
-            "to": endtime,
-            "include_deleted": include_deleted,
-            "limit": limit,
-            "with": with_ids,
-            "order": order,
-            "aggregate": aggregate
-        }
-
-        url = self.endpoint + '/' + quote_plus(node_id) + '/values' + self._get_query_part(query)
+        url = self._get_timeseries_url(node_id, starttime, endtime, include_deleted, limit, with_ids, order, aggregate)
         res = self.get(url)
         if 'error' in res:
             return res
         timeseries: list = res['items']
         return timeseries
 
+    def get_timeseries_arrays(self,
+                              node_id: str,
+                              starttime: str = None,
+                              endtime: str = None,
+                              include_deleted: bool = None,
+                              limit: int = None,
+                              with_ids: str = None,
+                              order: str = "asc",
+                              aggregate: str = None,
+                              split_ids: bool = False,
+                              non_numeric: str = timeserieslib.MASK) \
+            -> Union[timeserieslib.TimeseriesArrays, Dict[str, timeserieslib.TimeseriesArrays]]:
+        """
+        Like :func:`get_timeseries`, but returns the values as NumPy arrays. Requires *numpy*.
+
+        :param node_id: ogit/_id of the node containing timeseries
+        :param starttime: ms since epoch.
+        :param endtime: ms since epoch.
+        :param include_deleted: allow to get if ogit/_is-deleted=true
+        :param limit: limit of entries to return
+        :param with_ids: list of ids to aggregate in result
+        :param order: order by a timestamp asc|desc|none. Default is "asc" here.
+        :param aggregate: aggregate numeric values for multiple timeseries ids with same timestamp: avg|min|max|sum|none
+        :param split_ids: Return separate arrays per timeseries id. Use this with *with_ids* and aggregate "none".
+               Default is False.
+        :param non_numeric: How to handle values that are not numeric: 'mask' (default) or 'object'. See
+               :mod:`hiro_graph_client.timeserieslib`.
+        :return: The arrays. A dict of {ogit/_id: arrays} if *split_ids* is set.
+        :raises ValueError: When the result contains an error.
+        """
+        url = self._get_timeseries_url(node_id, starttime, endtime, include_deleted, limit, with_ids, order, aggregate)
+        items = self._items_of(self.get(url))
+        if split_ids:
+            return timeserieslib.split_by_id(items, node_id, non_numeric)
+        return timeserieslib.to_arrays(items, non_numeric)
+
+    def get_timeseries_range(self,
+                             node_id: str,
+                             ts_from: int,
+                             ts_to: int = None,
+                             include_deleted: bool = None,
+                             with_ids: str = None,
+                             aggregate: str = None,
+                             limit: int = 10000,
+                             slices: int = None,
+                             concurrency: int = 4,
+                             output: str = 'items',
+                             split_ids: bool = False,
+                             non_numeric: str = timeserieslib.MASK) \
+            -> Union[List, timeserieslib.TimeseriesArrays, Dict[str, timeserieslib.TimeseriesArrays]]:
+        """
+        Fetch all values of *[ts_from, ts_to)* via :func:`get_timeseries` in concurrent time slices. Slices that reach
+        *limit* are subdivided, so the result is never truncated. See :func:`hiro_graph_client.timeserieslib.fetch_range`.
+
+        :param node_id: ogit/_id of the node containing timeseries
+        :param ts_from: Start of the range in ms since epoch (inclusive).
+        :param ts_to: End of the range in ms since epoch (exclusive). Default is now.
+        :param include_deleted: allow to get if ogit/_is-deleted=true
+        :param with_ids: list of ids to aggregate in result
+        :param aggregate: aggregate numeric values for multiple timeseries ids with same timestamp: avg|min|max|sum|none
+        :param limit: Max values per request. Default is 10000.
+        :param slices: Initial amount of slices. Default is 2 * *concurrency*.
+        :param concurrency: Max parallel requests. Should not exceed the *pool_maxsize* of the connection. Default is 4.
+        :param output: 'items' (default) for a list of dicts like :func:`get_timeseries` or 'arrays' for NumPy arrays
+               like :func:`get_timeseries_arrays`.
+        :param split_ids: With *output* 'arrays': Return separate arrays per timeseries id. Default is False.
+        :param non_numeric: With *output* 'arrays': How to handle values that are not numeric: 'mask' (default) or
+               'object'.
+        :return: All values ordered by timestamp in the form given by *output*.
+        :raises ValueError: When a result contains an error.
+        """
+        if output not in ['items', 'arrays']:
+            raise ValueError(f"Unknown output '{output}'.")
+
+        def _fetch(starttime: int, endtime: int, _limit: int) -> list:
+            url = self._get_timeseries_url(node_id,
+                                           str(starttime),
+                                           str(endtime),
+                                           include_deleted,
+                                           _limit,
+                                           with_ids,
+                                           "asc",
+                                           aggregate)
+            return self._items_of(self.get(url))
+
+        items = timeserieslib.fetch_range(_fetch,
+                                          ts_from,
+                                          ts_to if ts_to is not None else int(time.time() * 1000),
+                                          limit,
+                                          slices,
+                                          concurrency)
+
+        if output == 'items':
+            return items
+        if split_ids:
+            return timeserieslib.split_by_id(items, node_id, non_numeric)
+        return timeserieslib.to_arrays(items, non_numeric)
+
+    def get_timeseries_matrix(self,
+                              node_ids: List[str],
+                              ts_from: int,
+                              ts_to: int,
+                              step: int,
+                              method: Union[str, float] = timeseriesaggregation.MEAN,
+                              fill: Union[str, float, None] = timeseriesaggregation.FILL_NAN,
+                              include_deleted: bool = None,
+                              limit: int = 10000,
+                              concurrency: int = 8,
+                              output: str = 'matrix') -> Any:
+        """
+        Fetch several timeseries for the same window concurrently and align them onto the grid *ts_from, ts_from + step,
+        ...* as one matrix with a row per grid point and a column per timeseries. Requires *numpy*.
+
+        See :func:`hiro_graph_client.timeseriesaggregation.align`.
+
+        :param node_ids: ogit/_id of each node containing timeseries. They become the columns in this order. Duplicates
+               are fetched once.
+        :param ts_from: Start of the window and first grid point in ms since epoch (inclusive).
+        :param ts_to: End of the window in ms since epoch (exclusive).
+        :param step: Distance of the grid points in ms.
+        :param method: Aggregation of the values within each grid interval: 'mean' (default), 'min', 'max', 'sum',
+               'count', 'first', 'last' or a percentile like 95.0.
+        :param fill: Value for grid points without values: 'nan' (default), 'previous', 'linear' or a number.
+        :param include_deleted: allow to get if ogit/_is-deleted=true
+        :param limit: Max values per request. Longer timeseries are fetched in several requests. Default is 10000.
+        :param concurrency: Max parallel requests. Should not exceed the *pool_maxsize* of the connection. Default is 8.
+        :param output: 'matrix' (default) for an :class:`~hiro_graph_client.timeseriesaggregation.AlignedTimeseries`
+               with the 2-D array *values* or 'arrow' for a *pyarrow.Table* with the column *timestamp* and one column
+               per ogit/_id (requires *pyarrow*).
+        :return: The aligned timeseries in the form given by *output*.
+        :raises ValueError: When a result contains an error.
+        """
+        if output not in ['matrix', 'arrow']:
+            raise ValueError(f"Unknown output '{output}'.")
+
+        node_ids = list(dict.fromkeys(node_ids))
+
+        def _fetch(node_id: str) -> timeserieslib.TimeseriesArrays:
+            return self.get_timeseries_range(node_id,
+                                             ts_from,
+                                             ts_to,
+                                             include_deleted=include_deleted,
+                                             limit=limit,
+                                             slices=1,
+                                             concurrency=1,
+                                             output='arrays')
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="TimeseriesMatrix") as executor:
+            series = dict(zip(node_ids, executor.map(_fetch, node_ids)))
+
+        aligned = timeseriesaggregation.align(series, step, ts_from, ts_to, method, fill)
+
+        return aligned.to_arrow() if output == 'arrow' else aligned
+
     def get_timeseries_history(self,
                                node_id: str,
                                timestamp: str = None,
@@ -298,18 +537,33 @@ class HiroGraph(AuthenticatedAPIHandler):
         :param include_deleted: allow to get if ogit/_is-deleted=true
         :return: The result payload. Either a list of dict or a dict with an error message.
         """
-        query = {
-            "include_deleted": include_deleted,
-            "timestamp": timestamp
-        }
-
-        url = self.endpoint + '/' + quote_plus(node_id) + '/values/history' + self._get_query_part(query)
+        url = self._get_timeseries_history_url(node_id, timestamp, include_deleted)
         res = self.get(url)
         if 'error' in res:
             return res
         timeseries: list = res['items']
         return timeseries
 
+    def get_timeseries_history_arrays(self,
+                                      node_id: str,
+                                      timestamp: str = None,
+                                      include_deleted: bool = None,
+                                      non_numeric: str = timeserieslib.MASK) -> timeserieslib.TimeseriesArrays:
+        """
+        Like :func:`get_timeseries_history`, but returns the values as NumPy arrays. Requires *numpy*.
+
+        :param node_id: ogit/_id of the node containing timeseries
+        :param timestamp: timestamp in ms
+        :param include_deleted: allow to get if ogit/_is-deleted=true
+        :param non_numeric: How to handle values that are not numeric: 'mask' (default) or 'object'. See
+               :mod:`hiro_graph_client.timeserieslib`.
+        :return: The arrays.
+        :raises ValueError: When the result contains an error.
+        """
+        url = self._get_timeseries_history_url(node_id, timestamp, include_deleted)
+        items = self._items_of(self.get(url))
+        return timeserieslib.to_arrays(items, non_numeric)
+
     def query_timeseries(self,
                          starttime: str = None,
                          endtime: str = None,
@@ -329,26 +583,48 @@ class HiroGraph(AuthenticatedAPIHandler):
         :param limit: limit of entries to return
         :return: The result payload. Either a list of dict or a dict with an error message.
         """
-        query = {
-            "from": starttime,
-            "to": endtime,
-            "limit": limit,
-            "order": order,
-            "aggregate": aggregate
-        }
-
-        url = self.endpoint + '/query/values' + self._get_query_part(query)
+        url = self._get_query_timeseries_url(starttime, endtime, limit, order, aggregate)
         res = self.get(url)
         if 'error' in res:
             return res
         timeseries: list = res['items']
         return timeseries
 
+    def query_timeseries_arrays(self,
+                                starttime: str = None,
+                                endtime: str = None,
+                                limit: int = None,
+                                order: str = "asc",
+                                aggregate: str = None,
+                                split_ids: bool = False,
+                                non_numeric: str = timeserieslib.MASK) \
+            -> Union[timeserieslib.TimeseriesArrays, Dict[str, timeserieslib.TimeseriesArrays]]:
+        """
+        Like :func:`query_timeseries`, but returns the values as NumPy arrays. Requires *numpy*.
+
+        :param starttime: ms since epoch.
+        :param endtime: ms since epoch.
+        :param limit: limit of entries to return
+        :param order: order by a timestamp asc|desc|none. Default is "asc" here.
+        :param aggregate: aggregate numeric values for multiple timeseries ids with same timestamp: avg|min|max|sum|none
+        :param split_ids: Return separate arrays per timeseries id. Default is False.
+        :param non_numeric: How to handle values that are not numeric: 'mask' (default) or 'object'. See
+               :mod:`hiro_graph_client.timeserieslib`.
+        :return: The arrays. A dict of {ogit/_id: arrays} if *split_ids* is set.
+        :raises ValueError: When the result contains an error.
+        """
+        url = self._get_query_timeseries_url(starttime, endtime, limit, order, aggregate)
+        items = self._items_of(self.get(url))
+        if split_ids:
+            return timeserieslib.split_by_id(items, None, non_numeric)
+        return timeserieslib.to_arrays(items, non_numeric)
+
     def post_timeseries(self,
                         node_id: str,
                         items: list,
                         synchronous: bool = True,
-                        ttl: int = None) -> dict:
+                        ttl: int = None,
+                        stream: bool = False) -> dict:
         """
         https://core.engine.datagroup.de/help/specs/?url=definitions/graph.yaml#/[Storage]_Timeseries/post__id__values
 
@@ -356,6 +632,8 @@ class HiroGraph(AuthenticatedAPIHandler):
         :param ttl: time to live for values to be stored in seconds (overrides /ttl in vertex).
         :param node_id: ogit/_id of the node containing timeseries
         :param items: list of timeseries values [{timestamp: (ms since epoch), value: ...},...]
+        :param stream: Encode *items* incrementally while they are sent, so the encoded body is never held in memory
+               as a whole. Use this for hundreds of thousands of items. Default is False.
         :return: The result payload
         """
 
@@ -366,7 +644,7 @@ class HiroGraph(AuthenticatedAPIHandler):
 
         url = self.endpoint + '/' + quote_plus(node_id) + '/values' + self._get_query_part(query)
         data = {"items": items}
-        return self.post(url, data)
+        return self.post(url, data, stream=stream)
 
     def get_attachment(self,
                        node_id: str,
@@ -454,7 +732,8 @@ class HiroGraph(AuthenticatedAPIHandler):
                    ts_from: int = 0,
                    ts_to: int = datetime.datetime.now(),
                    ogit_type: str = None,
-                   jfilter: str = None) -> dict:
+                   jfilter: str = None,
+                   records: bool = False) -> dict:
         """
         Replays events from history
 
@@ -464,6 +743,8 @@ class HiroGraph(AuthenticatedAPIHandler):
         :param ts_to: timestamp in ms where to end returning entries (default: now)
         :param jfilter: jfilter string to limit matching results
         :param ogit_type: Entity or Verb ogit/_type for filtering result based on this type
+        :param records: Return the vertices and edges within the events as compact, read-only
+               :class:`~hiro_graph_client.records.GraphRecord` instead of dicts. Default is False.
         :return: The result payload
         """
 
@@ -475,7 +756,453 @@ class HiroGraph(AuthenticatedAPIHandler):
         }
 
         url = self.endpoint + '/events' + self._get_query_part(query)
-        return self.get(url)
+        return self.get(url, object_pairs_hook=record_pairs_hook if records else None)
+
+    ###############################################################################################################
+    # Replay
+    ###############################################################################################################
+
+    def replay_events(self,
+                      ts_from: int,
+                      ts_to: int = None,
+                      ogit_type: str = None,
+                      jfilter: str = None,
+                      window: int = 3600000,
+                      concurrency: int = 4,
+                      prefetch: int = None,
+                      records: bool = False) -> Iterator[dict]:
+        """
+        Replay the events of *[ts_from, ts_to)* via :func:`get_events` in time slices of *window* ms that are fetched
+        concurrently. The events are yielded ordered by timestamp and nanotime while later slices are still fetched.
+        See :func:`hiro_graph_client.replay.replay_slices`.
+
+        :param ts_from: timestamp in ms where to start returning entries (inclusive)
+        :param ts_to: timestamp in ms where to end returning entries (exclusive, default: now)
+        :param ogit_type: Entity or Verb ogit/_type for filtering result based on this type
+        :param jfilter: jfilter string to limit matching results
+        :param window: Duration of each slice in ms. Default is one hour.
+        :param concurrency: Max parallel requests. Should not exceed the *pool_maxsize* of the connection. Default is 4.
+        :param prefetch: Max slices fetched ahead of the consumer. Default is 2 * *concurrency*.
+        :param records: Return the vertices and edges within the events as compact, read-only
+               :class:`~hiro_graph_client.records.GraphRecord` instead of dicts. Default is False.
+        :return: Iterator over the events.
+        :raises ValueError: When a result contains an error.
+        """
+
+        def _fetch(start: int, end: int) -> list:
+            return self._items_of(self.get_events(start, end, ogit_type, jfilter, records))
+
+        return replay.replay_slices(_fetch,
+                                    ts_from,
+                                    ts_to if ts_to is not None else int(time.time() * 1000),
+                                    window,
+                                    concurrency,
+                                    prefetch)
+
+    def replay_history(self,
+                       node_id: str,
+                       ts_from: int,
+                       ts_to: int = None,
+                       history_type: str = 'full',
+                       include_deleted: bool = None,
+                       meta: bool = None,
+                       window: int = 86400000,
+                       page_size: int = 1000,
+                       concurrency: int = 4,
+                       prefetch: int = None) -> Iterator[dict]:
+        """
+        Replay the history of a node of *[ts_from, ts_to)* via :func:`get_history` in time slices of *window* ms that
+        are fetched concurrently, each with offset paging of *page_size* entries. The entries are yielded ordered by
+        timestamp and nanotime (*ogit/_modified-on* for *history_type* 'element') while later slices are still fetched.
+
+        :param node_id: Id of the node
+        :param ts_from: timestamp in ms where to start returning entries (inclusive)
+        :param ts_to: timestamp in ms where to end returning entries (exclusive, default: now)
+        :param history_type: Response format: full - full event (default), element - only event body, diff - diff to
+               previous event. Entries without timestamp are yielded first within their slice.
+        :param include_deleted: allow to get if ogit/_is-deleted=true (default: false)
+        :param meta: return list type attributes with metadata (default: false)
+        :param window: Duration of each slice in ms. Default is one day.
+        :param page_size: Entries per request within a slice. Default is 1000.
+        :param concurrency: Max parallel requests. Should not exceed the *pool_maxsize* of the connection. Default is 4.
+        :param prefetch: Max slices fetched ahead of the consumer. Default is 2 * *concurrency*.
+        :return: Iterator over the history entries.
+        :raises ValueError: When a result contains an error.
+        """
+
+        def _fetch(start: int, end: int) -> list:
+            entries = []
+            offset = 0
+            while True:
+                page = self._items_of(self.get_history(node_id,
+                                                       start,
+                                                       end,
+                                                       history_type,
+                                                       limit=page_size,
+                                                       offset=offset,
+                                                       include_deleted=include_deleted,
+                                                       meta=meta))
+                entries.extend(page)
+                if len(page) < page_size:
+                    return entries
+                offset += page_size
+
+        return replay.replay_slices(_fetch,
+                                    ts_from,
+                                    ts_to if ts_to is not None else int(time.time() * 1000),
+                                    window,
+                                    concurrency,
+                                    prefetch)
+
+    ###############################################################################################################
+    # Columnar export
+    ###############################################################################################################
+
+    def query_to_arrow(self,
+                       query: str,
+                       fields: str = None,
+                       order: str = None,
+                       meta: bool = None,
+                       page_size: int = 10000,
+                       schema=None):
+        """
+        Run :func:`query` page by page and collect the vertices in a *pyarrow.Table*. Requires *pyarrow*.
+        See :mod:`hiro_graph_client.arrowexport` about the schema.
+
+        :param query: The actual query. e.g. ogit\\\\/_type: ogit\\\\/Question for vertices.
+        :param fields: the comma separated list of fields to return
+        :param order: order by a field asc|desc, e.g. ogit/name desc. Set this to get stable pages.
+        :param meta: List detailed metainformations in result payload
+        :param page_size: Amount of vertices per request. Default is 10000.
+        :param schema: Optional *pyarrow.Schema*. Default is to unify the schemas inferred from each page.
+        :return: The *pyarrow.Table*.
+        """
+        return arrowexport.to_table(self._query_pages(query, fields, order, meta, page_size), schema)
+
+    def query_to_parquet(self,
+                         path: Any,
+                         query: str,
+                         fields: str = None,
+                         order: str = None,
+                         meta: bool = None,
+                         page_size: int = 10000,
+                         schema=None,
+                         compression: str = 'snappy',
+                         prescan: bool = False) -> int:
+        """
+        Run :func:`query` page by page and write the vertices to a Parquet file. Only one page is held in memory at a
+        time. Requires *pyarrow*. See :mod:`hiro_graph_client.arrowexport` about the schema.
+
+        :param path: Path or writable binary file object for the Parquet file.
+        :param query: The actual query. e.g. ogit\\\\/_type: ogit\\\\/Question for vertices.
+        :param fields: the comma separated list of fields to return
+        :param order: order by a field asc|desc, e.g. ogit/name desc. Set this to get stable pages.
+        :param meta: List detailed metainformations in result payload
+        :param page_size: Amount of vertices per request. Default is 10000.
+        :param schema: Optional *pyarrow.Schema*. Default is to infer it from the first page.
+        :param compression: Compression codec of the Parquet file. Default is 'snappy'.
+        :param prescan: Fetch all pages twice: First to infer the schema of all of them, then to write them. Default
+               is to infer the schema from the first page and to raise a
+               :class:`~hiro_graph_client.arrowexport.SchemaMismatchError` for later pages that do not fit it.
+        :return: Amount of vertices written.
+        """
+        if prescan and schema is None:
+            schema = arrowexport.scan_schema(self._query_pages(query, fields, order, meta, page_size))
+
+        return arrowexport.to_parquet(self._query_pages(query, fields, order, meta, page_size),
+                                      path,
+                                      schema,
+                                      compression)
+
+    def get_nodes_to_arrow(self,
+                           node_ids: list,
+                           fields: str = None,
+                           meta: bool = None,
+                           include_deleted: bool = None,
+                           page_size: int = 1000,
+                           schema=None):
+        """
+        Run :func:`get_nodes` for chunks of *node_ids* and collect the results in a *pyarrow.Table*. Requires *pyarrow*.
+        See :mod:`hiro_graph_client.arrowexport` about the schema.
+
+        :param node_ids: list of ogit/_ids of the node/vertexes or edges
+        :param fields: Filter for fields
+        :param meta: List detailed metainformations in result payload
+        :param include_deleted: allow to get if ogit/_is-deleted=true
+        :param page_size: Amount of ids per request. Default is 1000.
+        :param schema: Optional *pyarrow.Schema*. Default is to unify the schemas inferred from each page.
+        :return: The *pyarrow.Table*.
+        """
+        return arrowexport.to_table(self._get_nodes_pages(node_ids, fields, meta, include_deleted, page_size), schema)
+
+    def get_nodes_to_parquet(self,
+                             path: Any,
+                             node_ids: list,
+                             fields: str = None,
+                             meta: bool = None,
+                             include_deleted: bool = None,
+                             page_size: int = 1000,
+                             schema=None,
+                             compression: str = 'snappy',
+                             prescan: bool = False) -> int:
+        """
+        Run :func:`get_nodes` for chunks of *node_ids* and write the results to a Parquet file. Requires *pyarrow*.
+        See :mod:`hiro_graph_client.arrowexport` about the schema.
+
+        :param path: Path or writable binary file object for the Parquet file.
+        :param node_ids: list of ogit/_ids of the node/vertexes or edges
+        :param fields: Filter for fields
+        :param meta: List detailed metainformations in result payload
+        :param include_deleted: allow to get if ogit/_is-deleted=true
+        :param page_size: Amount of ids per request. Default is 1000.
+        :param schema: Optional *pyarrow.Schema*. Default is to infer it from the first page.
+        :param compression: Compression codec of the Parquet file. Default is 'snappy'.
+        :param prescan: Fetch all pages twice: First to infer the schema of all of them, then to write them. Default
+               is to infer the schema from the first page and to raise a
+               :class:`~hiro_graph_client.arrowexport.SchemaMismatchError` for later pages that do not fit it.
+        :return: Amount of vertices written.
+        """
+        if prescan and schema is None:
+            schema = arrowexport.scan_schema(self._get_nodes_pages(node_ids, fields, meta, include_deleted, page_size))
+
+        return arrowexport.to_parquet(self._get_nodes_pages(node_ids, fields, meta, include_deleted, page_size),
+                                      path,
+                                      schema,
+                                      compression)
+
+    def get_events_to_arrow(self,
+                            ts_from: int = 0,
+                            ts_to: int = None,
+                            ogit_type: str = None,
+                            jfilter: str = None,
+                            window: int = None,
+                            schema=None):
+        """
+        Run :func:`get_events` and collect the events in a *pyarrow.Table*. Each row contains the attributes of the
+        body of an event and the remaining fields of the event with the prefix *event/*. Requires *pyarrow*.
+        See :mod:`hiro_graph_client.arrowexport` about the schema.
+
+        :param ts_from: timestamp in ms where to start returning entries (default: 0)
+        :param ts_to: timestamp in ms where to end returning entries (default: now)
+        :param ogit_type: Entity or Verb ogit/_type for filtering result based on this type
+        :param jfilter: jfilter string to limit matching results
+        :param window: Optional time span in ms per request. Default is to request the whole time span at once.
+        :param schema: Optional *pyarrow.Schema*. Default is to unify the schemas inferred from each page.
+        :return: The *pyarrow.Table*.
+        """
+        return arrowexport.to_table(self._get_events_pages(ts_from, ts_to, ogit_type, jfilter, window), schema)
+
+    def get_events_to_parquet(self,
+                              path: Any,
+                              ts_from: int = 0,
+                              ts_to: int = None,
+                              ogit_type: str = None,
+                              jfilter: str = None,
+                              window: int = None,
+                              schema=None,
+                              compression: str = 'snappy',
+                              prescan: bool = False) -> int:
+        """
+        Run :func:`get_events` and write the events to a Parquet file. See :func:`get_events_to_arrow` about the
+        columns. Set *window* to hold only the events of one time window in memory at a time. Requires *pyarrow*.
+
+        :param path: Path or writable binary file object for the Parquet file.
+        :param ts_from: timestamp in ms where to start returning entries (default: 0)
+        :param ts_to: timestamp in ms where to end returning entries (default: now)
+        :param ogit_type: Entity or Verb ogit/_type for filtering result based on this type
+        :param jfilter: jfilter string to limit matching results
+        :param window: Optional time span in ms per request. Default is to request the whole time span at once.
+        :param schema: Optional *pyarrow.Schema*. Default is to infer it from the first page.
+        :param compression: Compression codec of the Parquet file. Default is 'snappy'.
+        :param prescan: Fetch all pages twice: First to infer the schema of all of them, then to write them. Default
+               is to infer the schema from the first page and to raise a
+               :class:`~hiro_graph_client.arrowexport.SchemaMismatchError` for later pages that do not fit it.
+        :return: Amount of events written.
+        """
+        if prescan and schema is None:
+            schema = arrowexport.scan_schema(self._get_events_pages(ts_from, ts_to, ogit_type, jfilter, window))
+
+        return arrowexport.to_parquet(self._get_events_pages(ts_from, ts_to, ogit_type, jfilter, window),
+                                      path,
+                                      schema,
+                                      compression)
+
+    ###############################################################################################################
+    # Internal methods
+    ###############################################################################################################
+
+    def _get_timeseries_url(self,
+                            node_id: str,
+                            starttime: str,
+                            endtime: str,
+                            include_deleted: bool,
+                            limit: int,
+                            with_ids: str,
+                            order: str,
+                            aggregate: str) -> str:
+        query = {
+            "from": starttime,
+            "to": endtime,
+            "include_deleted": include_deleted,
+            "limit": limit,
+            "with": with_ids,
+            "order": order,
+            "aggregate": aggregate
+        }
+
+        return self.endpoint + '/' + quote_plus(node_id) + '/values' + self._get_query_part(query)
+
+    def _get_timeseries_history_url(self, node_id: str, timestamp: str, include_deleted: bool) -> str:
+        query = {
+            "include_deleted": include_deleted,
+            "timestamp": timestamp
+        }
+
+        return self.endpoint + '/' + quote_plus(node_id) + '/values/history' + self._get_query_part(query)
+
+    def _get_query_timeseries_url(self, starttime: str, endtime: str, limit: int, order: str, aggregate: str) -> str:
+        query = {
+            "from": starttime,
+            "to": endtime,
+            "limit": limit,
+            "order": order,
+            "aggregate": aggregate
+        }
+
+        return self.endpoint + '/query/values' + self._get_query_part(query)
+
+    @staticmethod
+    def _chunk_ids(node_ids: List[str], chunk_size: int, max_query_length: int) -> List[List[str]]:
+        """
+        :param node_ids: The ids.
+        :param chunk_size: Max ids per chunk.
+        :param max_query_length: Max length of the url-encoded, comma-separated ids of a chunk.
+        :return: The chunks of *node_ids* in their order. Each chunk contains at least one id.
+        """
+        chunks = []
+        chunk = []
+        length = 0
+        for node_id in node_ids:
+            id_length = len(quote(node_id, safe="/")) + 1
+            if chunk and (len(chunk) >= chunk_size or length + id_length > max_query_length):
+                chunks.append(chunk)
+                chunk = []
+                length = 0
+            chunk.append(node_id)
+            length += id_length
+
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _items_of(self, result: dict) -> list:
+        if 'error' in result:
+            raise ValueError(self._get_error_message(result))
+        return result.get('items') or []
+
+    @staticmethod
+    def _group_keys(keys: List[tuple]) -> Dict[tuple, List[str]]:
+        """
+        :param keys: Keys *(id, fields, ...)* of a batch.
+        :return: The ids per combination of the remaining parameters.
+        """
+        groups = {}
+        for key in keys:
+            groups.setdefault(key[1:], []).append(key[0])
+        return groups
+
+    @staticmethod
+    def _without_added_field(item: dict, fields: str, field: str) -> dict:
+        """
+        Remove *field* from *item* if it is not part of the requested *fields*, but has been added to merge results.
+        """
+        if fields and field not in fields.split(',') and field in item:
+            item = {key: value for key, value in item.items() if key != field}
+        return item
+
+    def _load_nodes(self, keys: List[tuple]) -> Dict[tuple, dict]:
+        """
+        Batch function of *self._node_loader*. Keys are *(node_id, fields, meta, include_deleted)*. Nodes that have
+        not been found or batches that failed are left out, so :func:`get_node` requests them on its own and
+        returns the original error.
+        """
+        values = {}
+        for (fields, meta, include_deleted), node_ids in self._group_keys(keys).items():
+            query_fields = fields
+            if fields and 'ogit/_id' not in fields.split(','):
+                query_fields = fields + ',ogit/_id'
+
+            result = self.get_nodes(node_ids,
+                                    fields=query_fields,
+                                    meta=meta,
+                                    include_deleted=include_deleted,
+                                    chunk_size=len(node_ids))
+            if 'error' in result:
+                logger.debug("Batch of %d nodes failed: %s", len(node_ids), self._get_error_message(result))
+                continue
+
+            for item in result.get('items') or []:
+                values[(item.get('ogit/_id'), fields, meta, include_deleted)] = \
+                    self._without_added_field(item, fields, 'ogit/_id')
+        return values
+
+    def _query_pages(self, query: str, fields: str, order: str, meta: bool, page_size: int) -> Iterator[list]:
+        offset = 0
+        while True:
+            items = self._items_of(
+                self.query(query, fields=fields, limit=page_size, offset=offset, order=order, meta=meta, records=True)
+            )
+            # The server may cap a page below page_size, so only an empty page ends the query.
+            if not items:
+                return
+            yield items
+
+            offset += len(items)
+
+    def _get_nodes_pages(self,
+                         node_ids: list,
+                         fields: str,
+                         meta: bool,
+                         include_deleted: bool,
+                         page_size: int) -> Iterator[list]:
+        for start in range(0, len(node_ids), page_size):
+            yield self._items_of(
+                self.get_nodes(node_ids[start:start + page_size],
+                               fields=fields,
+                               meta=meta,
+                               include_deleted=include_deleted,
+                               records=True)
+            )
+
+    @staticmethod
+    def _before(event: dict, timestamp: int) -> bool:
+        event_timestamp, _ = replay.event_time(event)
+        return event_timestamp is None or event_timestamp < timestamp
+
+    def _get_events_pages(self,
+                          ts_from: int,
+                          ts_to: int,
+                          ogit_type: str,
+                          jfilter: str,
+                          window: int) -> Iterator[list]:
+        ts_to = ts_to if ts_to is not None else int(time.time() * 1000)
+        window = window or (ts_to - ts_from) or 1
+
+        # Both ends of get_events are inclusive. Events on the end of a window are left to the next window, so only
+        # the last window includes its end ts_to.
+        window_from = ts_from
+        while True:
+            window_to = min(window_from + window, ts_to)
+            last = window_to >= ts_to
+            events = self._items_of(self.get_events(window_from, window_to, ogit_type, jfilter, records=True))
+            if not last:
+                events = [event for event in events if self._before(event, window_to)]
+            yield [arrowexport.flatten_event(event) for event in events]
+
+            if last:
+                return
+            window_from = window_to
+
 
 def escape_slashes_in_lucene_query(querystring: str) -> str:
     new_querystring = ""
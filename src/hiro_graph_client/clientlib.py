@@ -1,19 +1,25 @@
 #!/usr/bin/env python3
 import base64
+import copy
 import json
 import logging
 import os
+import random
 import threading
 import time
 import urllib
 from abc import abstractmethod
-from typing import Optional, Any, Iterator, Union, Tuple
+from functools import lru_cache
+from typing import Optional, Any, Iterator, Union, Tuple, List, Callable
 from urllib.parse import quote, urlencode
 
 import backoff
 import requests
 import requests.adapters
 
+from hiro_graph_client.cachelib import AbstractTokenStore, FileVersionCache, optional_lock
+from hiro_graph_client.jsonstream import JsonStream
+from hiro_graph_client.loadbalancer import LoadBalancingSession, LEAST_LOADED
 from hiro_graph_client.version import __version__
 
 logger = logging.getLogger(__name__)
@@ -309,13 +315,15 @@ class AbstractAPI:
 
     def get(self,
             url: str,
-            expected_media_type: str = 'application/json') -> Any:
+            expected_media_type: str = 'application/json',
+            object_pairs_hook: Callable = None) -> Any:
         """
         Implementation of GET
 
         :param url: Url to use
         :param expected_media_type: The expected media type. Default is 'application/json'. If this is set to '*' or
                '*/*', any media_type is accepted.
+        :param object_pairs_hook: Optional *object_pairs_hook* for decoding JSON results. See *json.loads()*.
         :return: The payload of the response
         """
 
@@ -328,14 +336,16 @@ class AbstractAPI:
                                     timeout=self._timeout,
                                     proxies=self._get_proxies())
             self._log_communication(res)
-            return self._parse_response(res, expected_media_type)
+            return self._parse_response(res, expected_media_type, object_pairs_hook)
 
         return _get()
 
     def post(self,
              url: str,
              data: Any,
-             expected_media_type: str = 'application/json') -> Any:
+             expected_media_type: str = 'application/json',
+             object_pairs_hook: Callable = None,
+             stream: bool = False) -> Any:
         """
         Implementation of POST
 
@@ -343,20 +353,25 @@ class AbstractAPI:
         :param data: The payload to POST
         :param expected_media_type: The expected media type. Default is 'application/json'. If this is set to '*' or
                '*/*', any media_type is accepted.
+        :param object_pairs_hook: Optional *object_pairs_hook* for decoding JSON results. See *json.loads()*.
+        :param stream: Encode the payload incrementally while it is sent with *Transfer-Encoding: chunked* instead of
+               encoding it into one string first. See :class:`~hiro_graph_client.jsonstream.JsonStream`. The request
+               body is not logged then. Default is False.
         :return: The payload of the response
         """
 
         @backoff.on_exception(*BACKOFF_ARGS, **BACKOFF_KWARGS, max_tries=self._get_max_tries)
         def _post() -> Any:
             res = self._session.post(url,
-                                     json=data,
+                                     json=None if stream else data,
+                                     data=JsonStream(data) if stream else None,
                                      headers=self._get_headers(),
                                      verify=self.ssl_config.get_verify(),
                                      cert=self.ssl_config.get_cert(),
                                      timeout=self._timeout,
                                      proxies=self._get_proxies())
-            self._log_communication(res)
-            return self._parse_response(res, expected_media_type)
+            self._log_communication(res, request_body=not stream)
+            return self._parse_response(res, expected_media_type, object_pairs_hook)
 
         return _post()
 
@@ -513,13 +528,15 @@ class AbstractAPI:
 
     def _parse_response(self,
                         res: requests.Response,
-                        expected_media_type: str = 'application/json') -> Any:
+                        expected_media_type: str = 'application/json',
+                        object_pairs_hook: Callable = None) -> Any:
         """
         Parse the response of the backend.
 
         :param res: The result payload
         :param expected_media_type: The expected media type. Default is 'application/json'. If this is set to '*' or
                '*/*', any media_type is accepted.
+        :param object_pairs_hook: Optional *object_pairs_hook* for decoding JSON results. See *json.loads()*.
         :return: The result payload. A json type when the result media_type within Content-Type is 'application/json'
                  (usually a dict), a str otherwise.
         :raises RequestException: On HTTP errors.
@@ -532,7 +549,7 @@ class AbstractAPI:
             if expected_media_type not in ['*', '*/*']:
                 AbstractAPI._check_content_type(res, expected_media_type)
             if expected_media_type.lower() == 'application/json':
-                return res.json()
+                return res.json(object_pairs_hook=object_pairs_hook) if object_pairs_hook else res.json()
             else:
                 return str(res.text)
         except (json.JSONDecodeError, ValueError):
@@ -698,10 +715,18 @@ class AbstractAPI:
 # ConnectionHandler class
 ###################################################################################################################
 
+_shared_connections: dict = {}
+""" Registry of GraphConnectionHandlers shared within this process. See *GraphConnectionHandler.get_shared()* """
+
+_shared_connections_lock = threading.Lock()
+
+
 class GraphConnectionHandler(AbstractAPI):
     """
     Contains information about a Graph Connection. This class also handles resolving the current api endpoints.
     Also creates the requests.Session which will be shared among the API Modules using this connection.
+
+    The API information of /api/version is loaded on first use of an endpoint, not at construction.
     """
 
     _pool_maxsize = 10
@@ -716,16 +741,39 @@ class GraphConnectionHandler(AbstractAPI):
     custom_endpoints: dict = None
     """Override API endpoints."""
 
+    _version_cache: Optional[FileVersionCache] = None
+    """Optional on-disk cache for the result of /api/version"""
+
+    _version_ttl: Optional[int] = None
+    """Seconds after which *self._version_info* gets revalidated. None: Never."""
+
+    _version_timestamp: Optional[float] = None
+    """Monotonic time when *self._version_info* has been loaded. None if it shall never be revalidated."""
+
+    _version_revalidating: bool = False
+    """A revalidation of *self._version_info* is running."""
+
+    _version_source = None
+    """The connection handler whose version information this handler uses, if it has been copied from one."""
+
+    _owns_session: bool = False
+    """The session has been created by this handler and gets closed by *self.close()*."""
+
     _lock: threading.RLock
     """Reentrant mutex for thread safety"""
 
     def __init__(self,
-                 root_url: str = None,
+                 root_url: Union[str, List[str]] = None,
                  custom_endpoints: dict = None,
                  version_info: dict = None,
                  pool_maxsize: int = None,
                  pool_block: bool = None,
                  connection_handler=None,
+                 version_cache: FileVersionCache = None,
+                 version_ttl: int = None,
+                 load_balancing: str = None,
+                 cool_down: float = None,
+                 health_check_interval: float = None,
                  *args,
                  **kwargs):
         """
@@ -744,11 +792,16 @@ class GraphConnectionHandler(AbstractAPI):
         This object creates the *requests.Session* and *requests.adapters.HTTPAdapter* for this *root_url*. The
         *pool_maxsize* of such a session can be set via the parameter in the constructor. When a TokenApiHandler is
         shared between different API objects (like HiroGraph, HiroApp, etc.), this session and its pool are also
-        shared.
+        shared. See *GraphConnectionHandler.get_shared()* for a connection handler that is shared process-wide.
+
+        When *root_url* is a list of several root urls, requests are spread over these nodes by a
+        :class:`~hiro_graph_client.loadbalancer.LoadBalancingSession`. The first root url is the one all endpoints are
+        resolved against.
 
         See parent :class:`AbstractAPI` for a description of all remaining parameters.
 
-        :param root_url: Root url for HIRO, like https://core.engine.datagroup.de.
+        :param root_url: Root url for HIRO, like https://core.engine.datagroup.de, or a list of root urls of several
+               nodes of the same HIRO installation.
         :param custom_endpoints: Optional map of {name:endpoint_path, ...} that overrides or adds to the endpoints taken
                from /api/version. Example see above.
         :param version_info: Optional full dict of the JSON result received via /api/version. Setting this will use it
@@ -759,6 +812,16 @@ class GraphConnectionHandler(AbstractAPI):
                but do not cache them. See requests.adapters.HTTPAdapter. *pool_block* is ignored when *session* is set.
         :param connection_handler: Copy parameters from this already existing connection handler. Overrides all other
                parameters.
+        :param version_cache: Optional on-disk cache for the result of /api/version. A cached result is used
+               immediately. Stale entries are revalidated in the background.
+        :param version_ttl: Optional seconds after which the result of /api/version gets revalidated in the
+               background. Default is None: Load it once. Does not apply to *version_info*.
+        :param load_balancing: How requests are spread over several nodes: 'least_loaded' (default) or
+               'lowest_latency'. Only used with several root urls.
+        :param cool_down: Seconds a node that produced an error does not receive requests before it gets probed again.
+               Default is 30. Only used with several root urls.
+        :param health_check_interval: Optional seconds between health probes of all nodes in the background. Only used
+               with several root urls.
         :param args: Unnamed parameter passthrough for parent class.
         :param kwargs: Named parameter passthrough for parent class.
         """
@@ -768,18 +831,33 @@ class GraphConnectionHandler(AbstractAPI):
             root_url = connection_handler._root_url
             session = connection_handler._session
             custom_endpoints = connection_handler.custom_endpoints
-            version_info = connection_handler._version_info
+            version_info = None
+            version_cache = None
+            version_ttl = None
+            self._version_source = connection_handler._version_source or connection_handler
         else:
             if not root_url:
                 raise ValueError("'root_url' must not be empty.")
 
-            adapter = requests.adapters.HTTPAdapter(
-                pool_maxsize=pool_maxsize or self._pool_maxsize,
-                pool_connections=1,
-                pool_block=pool_block or self._pool_block
-            )
-            session = requests.Session()
-            session.mount(prefix=root_url, adapter=adapter)
+            root_urls = [root_url] if isinstance(root_url, str) else list(root_url)
+            root_url = root_urls[0]
+            self._owns_session = True
+
+            if len(root_urls) > 1:
+                session = LoadBalancingSession(root_urls,
+                                               strategy=load_balancing or LEAST_LOADED,
+                                               cool_down=cool_down or 30.0,
+                                               health_check_interval=health_check_interval)
+            else:
+                session = requests.Session()
+
+            for node_root_url in root_urls:
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_maxsize=pool_maxsize or self._pool_maxsize,
+                    pool_connections=1,
+                    pool_block=pool_block or self._pool_block
+                )
+                session.mount(prefix=node_root_url, adapter=adapter)
 
         super().__init__(
             root_url=root_url,
@@ -791,17 +869,122 @@ class GraphConnectionHandler(AbstractAPI):
 
         self.custom_endpoints = custom_endpoints
         self._version_info = version_info
+        self._version_cache = version_cache
+        self._version_ttl = version_ttl
+
+        if isinstance(self._session, LoadBalancingSession) and not connection_handler:
+            # Health probes do not pass these per request.
+            self._session.verify = self.ssl_config.get_verify()
+            self._session.cert = self.ssl_config.get_cert()
+            self._session.proxies = self._proxies or {}
+
+        if not self._version_info and self._version_cache:
+            self._load_cached_version()
+
+    @staticmethod
+    def get_shared(root_url: Union[str, List[str]], ssl_config: SSLConfig = None, **kwargs):
+        """
+        Get the GraphConnectionHandler of this process for *root_url* and *ssl_config*. It is created on the first
+        call. Use it as *connection_handler* for TokenApiHandlers, so all of them share one session, its connection
+        pool and the API information of /api/version.
+
+        :param root_url: Root url for HIRO, like https://core.engine.datagroup.de, or a list of root urls.
+        :param ssl_config: Optional configuration for SSL connections.
+        :param kwargs: Further parameters for the constructor of GraphConnectionHandler. Only used when the handler
+               gets created.
+        :return: The shared GraphConnectionHandler.
+        """
+        ssl_config = ssl_config or SSLConfig()
+        key = (
+            root_url if isinstance(root_url, str) else tuple(root_url),
+            ssl_config.get_verify(),
+            ssl_config.get_cert()
+        )
+
+        with _shared_connections_lock:
+            connection_handler = _shared_connections.get(key)
+            if not connection_handler:
+                connection_handler = GraphConnectionHandler(root_url=root_url, ssl_config=ssl_config, **kwargs)
+                _shared_connections[key] = connection_handler
+
+            return connection_handler
+
+    @staticmethod
+    def clear_shared() -> None:
+        """
+        Remove all connection handlers created by *GraphConnectionHandler.get_shared()* from the registry and close
+        them.
+        """
+        with _shared_connections_lock:
+            connection_handlers = list(_shared_connections.values())
+            _shared_connections.clear()
 
-        self.get_version()
+        for connection_handler in connection_handlers:
+            connection_handler.close()
 
     @staticmethod
     def _remove_slash(endpoint: str) -> str:
         return endpoint[:-1] if endpoint[-1] == '/' else endpoint
 
+    def _load_cached_version(self) -> None:
+        """
+        Use the version info from *self._version_cache*. Revalidate it in a background thread when it is stale.
+        """
+        version_info, stale = self._version_cache.load_version(self._root_url)
+        if not version_info:
+            return
+
+        self._version_info = version_info
+        self._version_timestamp = time.monotonic()
+
+        if stale:
+            self._start_version_revalidation()
+
+    def _start_version_revalidation(self) -> None:
+        """
+        Start a background thread that revalidates *self._version_info* unless one is running already.
+        """
+        with self._lock:
+            if self._version_revalidating:
+                return
+            self._version_revalidating = True
+
+        threading.Thread(target=self._revalidate_version, daemon=True).start()
+
+    def _revalidate_version(self) -> None:
+        """
+        Fetch /api/version without holding *self._lock*, so readers keep using the current version info meanwhile.
+        """
+        try:
+            version_info = self.get(self._root_url + '/api/version')
+            if 'error' in version_info:
+                raise ValueError(self._get_error_message(version_info))
+
+            with self._lock:
+                self._version_info = version_info
+
+            if self._version_cache:
+                self._version_cache.save_version(self._root_url, version_info)
+        except Exception as err:
+            logger.warning("Cannot revalidate version info of %s: %s", self._root_url, str(err))
+        finally:
+            with self._lock:
+                self._version_timestamp = time.monotonic()
+                self._version_revalidating = False
+
     ###############################################################################################################
     # Public methods
     ###############################################################################################################
 
+    def close(self) -> None:
+        """
+        Close the session and its connection pool and stop the health checks of a load balancing session. Handlers
+        copied from this one via *connection_handler* share the session and cannot be used afterwards. Closing such
+        a copy does nothing, since the session belongs to the handler it has been copied from.
+        """
+        if self._owns_session:
+            self._session.close()
+
     def get_api_endpoint_of(self, api_name: str) -> str:
         """
         Determines endpoints of the API names.
@@ -866,7 +1049,9 @@ class GraphConnectionHandler(AbstractAPI):
             Optional[str],
             Optional[dict]
         ]:
-            _url: str = self._root_url.lower().replace('https://', 'wss://').replace('http://', 'ws://')
+            _root_url = self._session.select_root_url() \
+                if isinstance(self._session, LoadBalancingSession) else self._root_url
+            _url: str = _root_url.lower().replace('https://', 'wss://').replace('http://', 'ws://')
             _proxy, _proxy_port, _proxy_auth = _get_proxy_info(_url)
             return self._remove_slash(_url + _endpoint), _protocol, _proxy, _proxy_port, _proxy_auth
 
@@ -892,13 +1077,27 @@ class GraphConnectionHandler(AbstractAPI):
         """
         HIRO REST query API: `GET self._endpoint + '/api/version'`
 
+        The result is loaded on the first call and cached. When *version_ttl* has been set, an expired result is
+        revalidated in the background while the cached result is returned.
+
         :param force_update: Force updating the internal cache with version_info via API request.
         :return: The result payload
         """
+        if self._version_source:
+            return self._version_source.get_version(force_update=force_update)
+
         with self._lock:
             if not self._version_info or force_update:
                 url = self._root_url + '/api/version'
                 self._version_info = self.get(url)
+                self._version_timestamp = time.monotonic()
+
+                if self._version_cache and 'error' not in self._version_info:
+                    self._version_cache.save_version(self._root_url, self._version_info)
+
+            elif self._version_ttl is not None and self._version_timestamp is not None and \
+                    time.monotonic() - self._version_timestamp > self._version_ttl:
+                self._start_version_revalidation()
 
             return self._version_info
 
@@ -907,6 +1106,43 @@ class GraphConnectionHandler(AbstractAPI):
 # TokenApiHandler classes
 ###################################################################################################################
 
+@lru_cache(maxsize=128)
+def _decode_token_claims(token: str) -> dict:
+    """
+    Decode the payload of a token. Cached per token string, so each token is decoded only once.
+
+    :param token: The token to decode.
+    :return: The dict with the decoded token payload. Shared between all callers - do not modify.
+    :raises AuthenticationTokenError: When the token does not contain the base64 encoded data payload.
+    """
+    base64_payload: list = token.split('.')
+    if len(base64_payload) == 1:
+        raise AuthenticationTokenError("Token is missing base64 payload")
+
+    payload = base64_payload[1] + '=' * (4 - len(base64_payload[1]) % 4)
+
+    json_payload = base64.urlsafe_b64decode(payload)
+
+    return dict(json.loads(json_payload))
+
+
+def token_expires_at(token: str) -> Optional[int]:
+    """
+    Get the expiry of a token from its claim 'exp'.
+
+    :param token: The token.
+    :return: Expiry in ms since epoch or None when the token has no (decodable) claim 'exp'.
+    """
+    if not token:
+        return None
+
+    try:
+        exp = _decode_token_claims(token).get('exp')
+        return int(exp) * 1000 if exp else None
+    except (AuthenticationTokenError, ValueError, TypeError):
+        return None
+
+
 class AbstractTokenApiHandler(GraphConnectionHandler):
     """
     Root class for all TokenApiHandler classes. This adds token handling.
@@ -935,6 +1171,15 @@ class AbstractTokenApiHandler(GraphConnectionHandler):
         """
         raise RuntimeError('Cannot use property of this abstract class.')
 
+    def get_token_and_generation(self) -> Tuple[str, int]:
+        """
+        Return the current token together with its generation. The generation increases each time the token gets
+        replaced. Handlers that cannot replace their token always return generation 0.
+
+        :return: Tuple of token and generation.
+        """
+        return self.token, 0
+
     def decode_token(self) -> dict:
         """
         Return a dict with the decoded token payload from the internal token. This payload contains detailed
@@ -951,19 +1196,28 @@ class AbstractTokenApiHandler(GraphConnectionHandler):
         Return a dict with the decoded token payload. This payload contains detailed information about what this token
         has access to.
 
+        The payload is decoded only once per token. Nested values are shared between all calls for the same token and
+        must not be modified.
+
         :param token: The token to decode.
         :return: The dict with the decoded token payload.
         :raises AuthenticationTokenError: When the token does not contain the base64 encoded data payload.
         """
-        base64_payload: list = token.split('.')
-        if len(base64_payload) == 1:
-            raise AuthenticationTokenError("Token is missing base64 payload")
+        return dict(_decode_token_claims(token))
 
-        payload = base64_payload[1] + '=' * (4 - len(base64_payload[1]) % 4)
+    def token_expires_at(self) -> Optional[int]:
+        """
+        Get the expiry of the current token from its claim 'exp'.
 
-        json_payload = base64.urlsafe_b64decode(payload)
+        :return: Expiry in ms since epoch or None when the token has no (decodable) claim 'exp'.
+        """
+        return token_expires_at(self.token)
 
-        return dict(json.loads(json_payload))
+    def can_refresh_token(self) -> bool:
+        """
+        :return: Whether :func:`refresh_token` can obtain a new token. Default is True.
+        """
+        return True
 
     @abstractmethod
     def refresh_token(self) -> None:
@@ -972,6 +1226,16 @@ class AbstractTokenApiHandler(GraphConnectionHandler):
         """
         raise RuntimeError('Cannot use method of this abstract class.')
 
+    def refresh_token_if_current(self, generation: Optional[int]) -> None:
+        """
+        Refresh the token unless the token of *generation* has been replaced already, so concurrent requests that
+        received 401 for the same token result in a single refresh. The default just calls :func:`refresh_token`.
+
+        :param generation: Generation of the token that has been found invalid (see
+               *self.get_token_and_generation()*). None: Always refresh.
+        """
+        self.refresh_token()
+
     @abstractmethod
     def revoke_token(self, token_hint: str = "revoke_token") -> None:
         """
@@ -1019,6 +1283,9 @@ class FixedTokenApiHandler(AbstractTokenApiHandler):
     def token(self) -> str:
         return self._token
 
+    def can_refresh_token(self) -> bool:
+        return False
+
     def refresh_token(self) -> None:
         raise FixedTokenError('Token is invalid and cannot be changed because it has been given externally.')
 
@@ -1027,10 +1294,13 @@ class FixedTokenApiHandler(AbstractTokenApiHandler):
 
     def refresh_time(self) -> Optional[int]:
         """
+        The token cannot be refreshed by this handler, but its expiry can be used to schedule its replacement.
 
-        :return: Always none
+        :return: Claim 'exp' of the token minus *TokenInfo.refresh_offset* (in ms) or None if the token has no such
+                 claim.
         """
-        return None
+        expires_at = self.token_expires_at()
+        return expires_at - TokenInfo.refresh_offset if expires_at else None
 
 
 class EnvironmentTokenApiHandler(AbstractTokenApiHandler):
@@ -1060,6 +1330,9 @@ class EnvironmentTokenApiHandler(AbstractTokenApiHandler):
     def token(self) -> str:
         return os.environ[self._env_var]
 
+    def can_refresh_token(self) -> bool:
+        return False
+
     def refresh_token(self) -> None:
         raise FixedTokenError(
             "Token is invalid and cannot be changed because it has been given as environment variable '{}'"
@@ -1072,10 +1345,14 @@ class EnvironmentTokenApiHandler(AbstractTokenApiHandler):
 
     def refresh_time(self) -> Optional[int]:
         """
+        The token cannot be refreshed by this handler, but its expiry can be used to schedule reading a replaced
+        token from the environment.
 
-        :return: Always none
+        :return: Claim 'exp' of the token minus *TokenInfo.refresh_offset* (in ms) or None if the token has no such
+                 claim or the environment variable is not set.
         """
-        return None
+        expires_at = token_expires_at(os.environ.get(self._env_var))
+        return expires_at - TokenInfo.refresh_offset if expires_at else None
 
 
 class TokenInfo:
@@ -1093,6 +1370,8 @@ class TokenInfo:
     """ Timestamp of when the token has been fetched in ms."""
     refresh_offset = 5000
     """ Milliseconds of offset for token expiry """
+    generation = 0
+    """ Counts the replacements of the token within a TokenApiHandler """
 
     def __init__(self, token: str = None, refresh_token: str = None, expires_at: int = -1, refresh_offset: int = 5000):
         """
@@ -1149,6 +1428,8 @@ class TokenInfo:
             expires_in = res.get('expires_in')
             if expires_in:
                 self.expires_at = self.last_update + int(expires_in) * 1000
+            else:
+                self.expires_at = token_expires_at(self.token) or self.expires_at
 
         refresh_token = res.get('refresh_token')
         if refresh_token:
@@ -1161,10 +1442,11 @@ class TokenInfo:
         :return: True when the token has been expired *(expires_at - refresh_offset) <= get_epoch_mills()*. If
                  no *expires_at* is available, always return False since this token would never expire.
         """
-        if self.refresh_time() is None:
+        refresh_time = self.refresh_time()
+        if refresh_time is None:
             return False
 
-        return self.refresh_time() <= self.get_epoch_millis()
+        return refresh_time <= self.get_epoch_millis()
 
     def refresh_time(self) -> Optional[int]:
         """
@@ -1174,6 +1456,33 @@ class TokenInfo:
         """
         return self.expires_at - self.refresh_offset if self.expires_at > 0 else None
 
+    def to_dict(self) -> dict:
+        """
+        :return: The token information as dict for a token store.
+        """
+        return {
+            "token": self.token,
+            "refresh_token": self.refresh_token,
+            "expires_at": self.expires_at,
+            "last_update": self.last_update
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, refresh_offset: int = 5000):
+        """
+        Create TokenInfo from a dict created by *self.to_dict()*.
+
+        :param data: The dict with the token information.
+        :param refresh_offset: See constructor.
+        :return: The new TokenInfo.
+        """
+        token_info = cls(token=data.get('token'),
+                         refresh_token=data.get('refresh_token'),
+                         expires_at=int(data.get('expires_at') or -1),
+                         refresh_offset=refresh_offset)
+        token_info.last_update = int(data.get('last_update') or 0)
+        return token_info
+
     def clear_token_data(self, access_token_only: bool):
         """
         Handle internal data on a token revoke.
@@ -1192,13 +1501,15 @@ class PasswordAuthTokenApiHandler(AbstractTokenApiHandler):
     API Tokens will be fetched using this class. It does not handle any automatic token fetching, refresh or token
     expiry. This has to be checked and triggered by the *caller*.
 
-    The methods of this class are thread-safe, so it can be shared between several HIRO objects.
+    The methods of this class are thread-safe, so it can be shared between several HIRO objects. *self._token_info* is
+    never modified in place. Each change of the token creates a new TokenInfo which replaces the reference atomically,
+    so reading a valid token does not need to acquire *self._lock*.
 
     It is built this way to avoid endless calling loops when resolving tokens.
     """
 
     _token_info: TokenInfo = None
-    """Contains all token information"""
+    """Contains all token information. Treat as immutable: Replace it via *self._publish_token_info()*."""
 
     _lock: threading.RLock
     """Reentrant mutex for thread safety"""
@@ -1211,12 +1522,32 @@ class PasswordAuthTokenApiHandler(AbstractTokenApiHandler):
     _secure_logging: bool = True
     """Avoid logging of sensitive data."""
 
+    _token_store: Optional[AbstractTokenStore] = None
+    """Optional store to share the token with other handlers and processes."""
+
+    _token_store_key: str = None
+    """Key of the token within *self._token_store*."""
+
+    _refresh_jitter: int = 10000
+    """Maximum milliseconds the background refresh happens before *self.refresh_time()*."""
+
+    _refresh_thread: Optional[threading.Thread] = None
+    """Thread that refreshes the token in the background."""
+
+    _refresh_condition: threading.Condition
+    """Wakes up *self._refresh_thread* when the token changes or the refresh shall stop."""
+
+    _refresh_stopped: bool = True
+
     def __init__(self,
                  username: str = None,
                  password: str = None,
                  client_id: str = None,
                  client_secret: str = None,
                  secure_logging: bool = True,
+                 token_store: AbstractTokenStore = None,
+                 background_refresh: bool = False,
+                 refresh_jitter: int = None,
                  *args, **kwargs):
         """
         Constructor
@@ -1229,6 +1560,16 @@ class PasswordAuthTokenApiHandler(AbstractTokenApiHandler):
         :param client_id: OAuth client_id for authentication
         :param client_secret: OAuth client_secret for authentication
         :param secure_logging: If this is enabled, payloads that might contain sensitive information are not logged.
+        :param token_store: Optional store that shares the token with all other handlers using the same store, i.e.
+               a :class:`~hiro_graph_client.cachelib.FileTokenStore` shared between the worker processes of a host.
+               Only one of these handlers will obtain or refresh the token while the others reuse it. Handlers share
+               a token when their root_url, client_id and username are the same.
+        :param background_refresh: Refresh the token in a background thread before it expires, so requests never
+               have to wait for a refresh. The refresh within the requesting thread remains as a fallback. See
+               *self.start_background_refresh()*. Default is False.
+        :param refresh_jitter: Maximum milliseconds the background refresh happens before *self.refresh_time()*. A
+               random value up to this is used for each refresh, so handlers sharing a token store do not refresh all
+               at once. Default is 10000.
         :param args: Unnamed parameter passthrough for parent class. 
         :param kwargs: Named parameter passthrough for parent class. 
         """
@@ -1241,23 +1582,46 @@ class PasswordAuthTokenApiHandler(AbstractTokenApiHandler):
 
         self._secure_logging = secure_logging
 
+        self._token_store = token_store
+        self._token_store_key = AbstractTokenStore.make_key(self._root_url, client_id, username)
+
         self._token_info = TokenInfo()
         self._lock = threading.RLock()
 
+        self._refresh_jitter = refresh_jitter if refresh_jitter is not None else self._refresh_jitter
+        self._refresh_condition = threading.Condition()
+
+        if background_refresh:
+            self.start_background_refresh()
+
     @property
     def endpoint(self):
         return self.get_api_endpoint_of('auth')
 
     @property
     def token(self) -> str:
-        """Get the token. Get or refresh it if necessary."""
+        """Get the token. Get or refresh it if necessary. Only acquires the lock when this is necessary."""
+        return self.get_token_and_generation()[0]
+
+    def get_token_and_generation(self) -> Tuple[str, int]:
+        """
+        Get the token and its generation. Get or refresh the token if necessary. Only acquires the lock when this is
+        necessary.
+
+        :return: Tuple of token and generation.
+        """
+        token_info = self._token_info
+        if token_info.token and not token_info.expired():
+            return token_info.token, token_info.generation
+
         with self._lock:
             if not self._token_info.token:
                 self.get_token()
             elif self._token_info.expired():
                 self.refresh_token()
 
-            return self._token_info.token
+            token_info = self._token_info
+            return token_info.token, token_info.generation
 
     def _log_communication(self, res: requests.Response, request_body: bool = True, response_body: bool = True) -> None:
         """
@@ -1306,36 +1670,70 @@ class PasswordAuthTokenApiHandler(AbstractTokenApiHandler):
                 "password": self._password
             }
 
-            res = self.post(url, data)
-            self._token_info.parse_token_result(res, "{}.get_token".format(self.__class__.__name__))
+            with optional_lock(self._token_store and self._token_store.lock()):
+                if self._load_stored_token():
+                    return
+
+                res = self.post(url, data)
+                token_info = copy.copy(self._token_info)
+                token_info.parse_token_result(res, "{}.get_token".format(self.__class__.__name__))
+                self._publish_token_info(token_info)
+                self._save_stored_token()
+                self._notify_background_refresh()
 
     def refresh_token(self) -> None:
         """
         Construct a request to refresh an existing token. API self._endpoint + '/refresh'.
 
+        :raises AuthenticationTokenError: When no auth_endpoint is set.
+        """
+        self.refresh_token_if_current(None)
+
+    def refresh_token_if_current(self, generation: Optional[int]) -> None:
+        """
+        Refresh the token like :func:`refresh_token` unless it has been replaced already.
+
+        Concurrent calls for the same *generation* (i.e. by several requests that received 401 for the same token)
+        result in a single refresh: The first call refreshes, the others find that the token has been replaced already
+        and return.
+
+        :param generation: Generation of the token that has been found invalid. Skip the refresh if the current token
+               has another generation. None: Always refresh.
         :raises AuthenticationTokenError: When no auth_endpoint is set.
         """
         with self._lock:
+            if generation is not None and generation != self._token_info.generation:
+                logger.debug("%s: Token has been replaced already.", self.__class__.__name__)
+                return
+
             if not self.endpoint:
                 raise AuthenticationTokenError(
                     'Token is invalid and endpoint (auth_endpoint) for refresh is not set.')
 
-            if not self._token_info.refresh_token:
-                self.get_token()
-                return
+            with optional_lock(self._token_store and self._token_store.lock()):
+                if self._load_stored_token():
+                    return
 
-            url = self.endpoint + '/refresh'
-            data = {
-                "client_id": self._client_id,
-                "client_secret": self._client_secret,
-                "refresh_token": self._token_info.refresh_token
-            }
+                if not self._token_info.refresh_token:
+                    self.get_token()
+                    return
 
-            try:
-                res = self.post(url, data)
-                self._token_info.parse_token_result(res, "{}.refresh_token".format(self.__class__.__name__))
-            except AuthenticationTokenError:
-                self.get_token()
+                url = self.endpoint + '/refresh'
+                data = {
+                    "client_id": self._client_id,
+                    "client_secret": self._client_secret,
+                    "refresh_token": self._token_info.refresh_token
+                }
+
+                try:
+                    res = self.post(url, data)
+                    token_info = copy.copy(self._token_info)
+                    token_info.parse_token_result(res, "{}.refresh_token".format(self.__class__.__name__))
+                    self._publish_token_info(token_info)
+                    self._save_stored_token()
+                    self._notify_background_refresh()
+                except AuthenticationTokenError:
+                    self.get_token()
 
     def revoke_token(self, token_hint: str = "refresh_token") -> None:
         """
@@ -1349,7 +1747,7 @@ class PasswordAuthTokenApiHandler(AbstractTokenApiHandler):
                 raise AuthenticationTokenError(
                     'Token is invalid and endpoint (auth_endpoint) for revoke is not set.')
 
-            auth_api_version = float(self._version_info['auth']['version'])
+            auth_api_version = float(self.get_version()['auth']['version'])
             url = self.endpoint + '/revoke'
 
             if auth_api_version >= 6.6:
@@ -1376,7 +1774,138 @@ class PasswordAuthTokenApiHandler(AbstractTokenApiHandler):
 
             self.post(url, data)
 
-            self._token_info.clear_token_data(token_hint != "refresh_token")
+            token_info = copy.copy(self._token_info)
+            token_info.clear_token_data(token_hint != "refresh_token")
+            self._publish_token_info(token_info)
+
+            if self._token_store:
+                self._token_store.save(self._token_store_key, None)
+
+            self._notify_background_refresh()
+
+    ###############################################################################################################
+    # Token store
+    ###############################################################################################################
+
+    def _load_stored_token(self) -> bool:
+        """
+        Take over the token from *self._token_store* if another handler has stored a token that differs from the
+        current one and has not expired yet. Call this while holding the lock of the store.
+
+        :return: True if the stored token has been taken over.
+        """
+        if not self._token_store:
+            return False
+
+        data = self._token_store.load(self._token_store_key)
+        if not data:
+            return False
+
+        token_info = TokenInfo.from_dict(data, refresh_offset=self._token_info.refresh_offset)
+        if not token_info.token or token_info.token == self._token_info.token or token_info.expired():
+            return False
+
+        logger.debug("%s: Using token from token store.", self.__class__.__name__)
+        self._publish_token_info(token_info)
+        self._notify_background_refresh()
+        return True
+
+    def _publish_token_info(self, token_info: TokenInfo) -> None:
+        """
+        Replace *self._token_info*. Readers see either the old or the new TokenInfo completely.
+
+        :param token_info: The new TokenInfo. Must not be changed afterwards.
+        """
+        with self._lock:
+            token_info.generation = self._token_info.generation + 1
+            self._token_info = token_info
+
+    def _save_stored_token(self) -> None:
+        """
+        Publish the current token to *self._token_store*. Call this while holding the lock of the store.
+        """
+        if self._token_store:
+            self._token_store.save(self._token_store_key, self._token_info.to_dict())
+
+    ###############################################################################################################
+    # Background refresh
+    ###############################################################################################################
+
+    def start_background_refresh(self) -> None:
+        """
+        Start a daemon thread that refreshes the token a random time of up to *refresh_jitter* milliseconds before
+        *self.refresh_time()*. The thread waits until a token has been obtained for the first time. Does nothing if the
+        thread is running already.
+        """
+        with self._refresh_condition:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+
+            self._refresh_stopped = False
+            self._refresh_thread = threading.Thread(target=self._background_refresh,
+                                                    name=f"{self.__class__.__name__}-refresh",
+                                                    daemon=True)
+            self._refresh_thread.start()
+
+    def stop_background_refresh(self) -> None:
+        """
+        Stop the background refresh thread and wait for it to exit.
+        """
+        with self._refresh_condition:
+            self._refresh_stopped = True
+            self._refresh_condition.notify_all()
+            thread = self._refresh_thread
+            self._refresh_thread = None
+
+        if thread and thread is not threading.current_thread():
+            thread.join()
+
+    def _notify_background_refresh(self) -> None:
+        """
+        Let the background refresh thread recalculate its next refresh time.
+        """
+        with self._refresh_condition:
+            self._refresh_condition.notify_all()
+
+    def _background_refresh(self) -> None:
+        # Wait at least this many seconds between two attempts. Increases on errors.
+        min_delay = 1
+
+        while True:
+            with self._refresh_condition:
+                if self._refresh_stopped:
+                    return
+
+                refresh_time = self.refresh_time()
+
+                if refresh_time is None:
+                    jitter = 0
+                    timeout = None
+                else:
+                    # Never use more than half of the lifetime of the token as jitter.
+                    lifetime = refresh_time - self._token_info.last_update
+                    jitter = random.randint(0, max(min(self._refresh_jitter, lifetime // 2), 0))
+                    timeout = max((refresh_time - jitter - TokenInfo.get_epoch_millis()) / 1000, min_delay)
+
+                self._refresh_condition.wait(timeout=timeout)
+
+                if self._refresh_stopped:
+                    return
+
+            token_info = self._token_info
+            refresh_time = token_info.refresh_time()
+            if refresh_time is None or refresh_time - jitter > TokenInfo.get_epoch_millis():
+                # Woken up because the token has changed.
+                continue
+
+            try:
+                logger.debug("%s: Refreshing token in background.", self.__class__.__name__)
+                self.refresh_token_if_current(token_info.generation)
+                min_delay = 1
+            except Exception as err:
+                min_delay = min(min_delay * 2, 60)
+                logger.warning("%s: Background token refresh failed, retrying in %ds: %s",
+                               self.__class__.__name__, min_delay, str(err))
 
     def refresh_time(self) -> Optional[int]:
         """
@@ -1428,6 +1957,9 @@ class AuthenticatedAPIHandler(AbstractAPI):
     _api_name: str
     """Name of the API."""
 
+    _token_local: threading.local
+    """Generation of the token used by the current request of each thread."""
+
     def __init__(self,
                  api_handler: AbstractTokenApiHandler,
                  api_name: str):
@@ -1444,6 +1976,7 @@ class AuthenticatedAPIHandler(AbstractAPI):
 
         self._api_handler = api_handler
         self._api_name = api_name
+        self._token_local = threading.local()
 
     @property
     def endpoint(self) -> str:
@@ -1456,24 +1989,27 @@ class AuthenticatedAPIHandler(AbstractAPI):
     def _check_response(self, res: requests.Response) -> None:
         """
         Response checking. Tries to refresh the token on status_code 401, then raises RequestException to try
-        again using backoff.
+        again using backoff. The token is only refreshed if the request used the current token. Otherwise, the retry
+        just uses the token that has replaced it meanwhile.
 
         :param res: The result payload
         :raises requests.exceptions.RequestException: When an error 401 occurred and the token has been refreshed.
         """
         if res.status_code == 401:
-            self._api_handler.refresh_token()
+            self._api_handler.refresh_token_if_current(getattr(self._token_local, 'generation', None))
 
             # Raise this exception to trigger retry with backoff
             raise requests.exceptions.RequestException
 
     def _handle_token(self) -> Optional[str]:
         """
-        Try to return a valid token by obtaining or refreshing it.
+        Try to return a valid token by obtaining or refreshing it. Remembers the generation of the token for
+        *self._check_response()*.
 
         :return: A valid token.
         """
-        return self._api_handler.token
+        token, self._token_local.generation = self._api_handler.get_token_and_generation()
+        return token
 
 
 ###################################################################################################################
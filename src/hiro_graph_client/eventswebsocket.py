@@ -1,18 +1,27 @@
+import heapq
 import json
 import logging
 import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from websocket import WebSocketApp, WebSocketException
 
+from hiro_graph_client.cachelib import FileEventPositionStore
+from hiro_graph_client.client import HiroGraph
 from hiro_graph_client.clientlib import AbstractTokenApiHandler
+from hiro_graph_client.profiling import profiled
 from hiro_graph_client.websocketlib import AbstractAuthenticatedWebSocketHandler, ErrorMessage, ReaderStatus
 
 logger = logging.getLogger(__name__)
 """ The logger for this module """
 
+MIN_TOKEN_REFRESH_DELAY = 1.0
+""" Min seconds until the token is sent again when its refresh time has already passed """
+
 
 class EventMessage:
     """
@@ -55,7 +64,14 @@ class EventMessage:
         :param message: The message received from the websocket. Will be decoded here.
         :return: The EventMessage or None if this is not an EventMessage (type or id are missing).
         """
-        json_message: dict = json.loads(message)
+        return cls.from_dict(json.loads(message))
+
+    @classmethod
+    def from_dict(cls, json_message: dict):
+        """
+        :param json_message: A decoded event, i.e. from the websocket or from *HiroGraph.get_events()*.
+        :return: The EventMessage or None if this is not an EventMessage (type or id are missing).
+        """
         if not isinstance(json_message, dict):
             return None
 
@@ -109,6 +125,12 @@ class EventsFilter:
 class AbstractEventsWebSocketHandler(AbstractAuthenticatedWebSocketHandler):
     """
     A handler for issue events
+
+    With *catch_up=True*, the handler keeps the position (timestamp and nanotime) of the last event it delivered and
+    optionally persists it in a *position_store*. Each time the websocket opens, after the filters have been
+    registered, the events since this position are replayed via *HiroGraph.replay_events()* with the jfilter of each
+    filter and delivered to *on_event* in order before any live event. Events are de-duplicated by id and nanotime, so
+    events that arrive both via replay and live are delivered only once. Events of additional *scopes* are not replayed.
     """
     _events_filter_messages: Dict[str, EventsFilter] = {}
     _scopes: List[str] = []
@@ -118,11 +140,37 @@ class AbstractEventsWebSocketHandler(AbstractAuthenticatedWebSocketHandler):
 
     _token_scheduler: BackgroundScheduler
 
+    catch_up: bool = False
+    position_store: Optional[FileEventPositionStore] = None
+    position_name: Optional[str] = None
+    catch_up_max: Optional[int] = None
+    catch_up_window: int = 3600000
+    dedupe_size: int = 10000
+
+    _position: Optional[Tuple[int, int]] = None
+    """ (timestamp, nanotime) of the last event delivered """
+
+    _position_saved: float = 0.0
+    """ Monotonic time the position has been persisted last """
+
+    _seen: OrderedDict
+    """ Keys (id, nanotime) of the latest events delivered in the order of their delivery """
+
+    _position_lock: threading.RLock
+    """ Guards the position and *self._seen* """
+
     def __init__(self,
                  api_handler: AbstractTokenApiHandler,
                  events_filters: List[EventsFilter],
                  scopes: List[str] = None,
-                 query_params: Dict[str, str] = None):
+                 query_params: Dict[str, str] = None,
+                 catch_up: bool = False,
+                 catch_up_from: int = None,
+                 position_store: FileEventPositionStore = None,
+                 position_name: str = None,
+                 catch_up_max: int = None,
+                 catch_up_window: int = 3600000,
+                 dedupe_size: int = 10000):
         """
         Constructor
 
@@ -135,8 +183,20 @@ class AbstractEventsWebSocketHandler(AbstractAuthenticatedWebSocketHandler):
         :param query_params: URL Query parameters for this specific websocket. Use Dict[str,str] only here,
                              i.e set {"allscopes": "false"} instead of {"allscopes": False}. The default here is to set
                              {'allscopes': 'false'}.
+        :param catch_up: Replay the events missed since the last event delivered each time the websocket opens.
+                         Default is False.
+        :param catch_up_from: Timestamp in ms to catch up from when no position is known yet. Default is None: Start
+                              with live events.
+        :param position_store: Optional store to persist the position across restarts. Requires *position_name*.
+        :param position_name: Name of this consumer in *position_store*.
+        :param catch_up_max: Max ms to catch up. Older events are skipped with a warning. Default is None: No limit.
+        :param catch_up_window: Duration in ms of the slices the events are replayed in. Default is one hour.
+        :param dedupe_size: Amount of the latest events remembered for de-duplication. Default is 10000.
         """
-        _query_params = query_params.copy()
+        if position_store and not position_name:
+            raise ValueError('Parameter position_name= is required with position_store=.')
+
+        _query_params = query_params.copy() if query_params else None
         if _query_params is None:
             _query_params = {'allscopes': 'false'}
         elif 'allscopes' not in _query_params:
@@ -161,6 +221,21 @@ class AbstractEventsWebSocketHandler(AbstractAuthenticatedWebSocketHandler):
 
         self._scopes = scopes or []
 
+        self.catch_up = catch_up
+        self.position_store = position_store
+        self.position_name = position_name
+        self.catch_up_max = catch_up_max
+        self.catch_up_window = catch_up_window
+        self.dedupe_size = dedupe_size
+
+        self._seen = OrderedDict()
+        self._position_lock = threading.RLock()
+
+        if position_store:
+            self._position = position_store.load_position(position_name)
+        if self._position is None and catch_up_from is not None:
+            self._position = (catch_up_from, 0)
+
     ###############################################################################################################
     # Websocket Events
     ###############################################################################################################
@@ -189,6 +264,12 @@ class AbstractEventsWebSocketHandler(AbstractAuthenticatedWebSocketHandler):
         except Exception as err:
             raise WebSocketFilterException('Setting events filter failed') from err
 
+        if self.catch_up:
+            try:
+                self._catch_up()
+            except Exception as err:
+                raise WebSocketCatchUpException('Catching up on missed events failed') from err
+
     def on_close(self, ws: WebSocketApp, code: int = None, reason: str = None):
         """
         Cancel the self._token_refresh_thread. Registered filters remain as they are.
@@ -200,6 +281,9 @@ class AbstractEventsWebSocketHandler(AbstractAuthenticatedWebSocketHandler):
         if self._token_scheduler.running:
             self._token_scheduler.shutdown()
 
+        if self.catch_up:
+            self._save_position(force=True)
+
     def on_message(self, ws: WebSocketApp, message: str):
         """
         Create an EventMessage from the incoming message and hand it over to *self.on_event*.
@@ -212,8 +296,11 @@ class AbstractEventsWebSocketHandler(AbstractAuthenticatedWebSocketHandler):
         if event_message:
             if event_message.type not in ['CREATE', 'UPDATE', 'DELETE']:
                 logger.error("Unknown event message of type '%s'", event_message.type)
+            elif self.catch_up:
+                self._deliver(event_message)
             else:
-                self.on_event(event_message)
+                with profiled('on_event', self):
+                    self.on_event(event_message)
         else:
             error_message = ErrorMessage.parse(message)
             if error_message:
@@ -275,6 +362,96 @@ class AbstractEventsWebSocketHandler(AbstractAuthenticatedWebSocketHandler):
         """
         pass
 
+    ###################################################################################################################
+    # Catch-up
+    ###################################################################################################################
+
+    def get_position(self) -> Optional[Tuple[int, int]]:
+        """
+        :return: (timestamp, nanotime) of the last event delivered or None.
+        """
+        with self._position_lock:
+            return self._position
+
+    @staticmethod
+    def _event_position(event: dict) -> Tuple[int, int]:
+        return int(event.get('timestamp') or 0), int(event.get('nanotime') or 0)
+
+    def _catch_up(self) -> None:
+        """
+        Replay the events since *self._position* and deliver them in order.
+        """
+        position = self.get_position()
+        if position is None:
+            return
+
+        ts_from = position[0]
+        ts_to = int(time.time() * 1000) + 1
+        if self.catch_up_max and ts_to - ts_from > self.catch_up_max:
+            logger.warning("Skipping events of %d ms before catching up.", ts_to - ts_from - self.catch_up_max)
+            ts_from = ts_to - self.catch_up_max
+
+        with self._initial_messages_lock:
+            jfilters = [events_filter.content for events_filter in self._events_filter_messages.values()]
+
+        graph = HiroGraph(self._api_handler)
+        replays = [graph.replay_events(ts_from, ts_to, jfilter=jfilter, window=self.catch_up_window)
+                   for jfilter in jfilters]
+
+        count = 0
+        for event in heapq.merge(*replays, key=self._event_position):
+            if self._event_position(event) <= position:
+                continue
+            event_message = EventMessage.from_dict(event)
+            if event_message and event_message.type in ['CREATE', 'UPDATE', 'DELETE']:
+                count += self._deliver(event_message)
+
+        logger.info("Caught up on %d events since %d.", count, position[0])
+
+    def _deliver(self, event_message: EventMessage) -> bool:
+        """
+        Hand *event_message* over to *self.on_event* unless it has been delivered before.
+
+        :param event_message: The event.
+        :return: True if it has been delivered.
+        """
+        key = (event_message.id, event_message.nanotime)
+        with self._position_lock:
+            if key in self._seen:
+                return False
+            self._seen[key] = None
+            if len(self._seen) > self.dedupe_size:
+                self._seen.popitem(last=False)
+
+        with profiled('on_event', self):
+            self.on_event(event_message)
+
+        position = (int(event_message.timestamp or 0), int(event_message.nanotime or 0))
+        with self._position_lock:
+            if self._position is None or position > self._position:
+                self._position = position
+
+        self._save_position()
+        return True
+
+    def _save_position(self, force: bool = False) -> None:
+        """
+        Persist the position in *self.position_store* at most once per second unless *force* is set.
+        """
+        if not self.position_store:
+            return
+
+        with self._position_lock:
+            if self._position is None or (not force and time.monotonic() - self._position_saved < 1.0):
+                return
+            self._position_saved = time.monotonic()
+            timestamp, nanotime = self._position
+
+        try:
+            self.position_store.save_position(self.position_name, timestamp, nanotime)
+        except Exception as err:
+            logger.warning("Cannot save the position of %s: %s", self.position_name, str(err))
+
     ###################################################################################################################
     # Filter handling
     ###################################################################################################################
@@ -344,9 +521,14 @@ class AbstractEventsWebSocketHandler(AbstractAuthenticatedWebSocketHandler):
     ###################################################################################################################
 
     def _set_next_token_refresh(self):
-        if self._api_handler.refresh_time() is not None:
-            # make seconds
-            timestamp = self._api_handler.refresh_time() / 1000
+        # Handlers which cannot refresh their token (i.e. FixedTokenApiHandler) would only send the same token again.
+        if not self._api_handler.can_refresh_token():
+            return
+
+        refresh_time = self._api_handler.refresh_time()
+        if refresh_time is not None:
+            # make seconds. A refresh time in the past is scheduled shortly, so it is not missed by the scheduler.
+            timestamp = max(refresh_time / 1000, time.time() + MIN_TOKEN_REFRESH_DELAY)
 
             self._token_scheduler.add_job(
                 func=lambda: self._token_refresh_thread(),
@@ -399,3 +581,10 @@ class WebSocketFilterException(WebSocketException):
     On errors with setting or parsing filter information.
     """
     pass
+
+
+class WebSocketCatchUpException(WebSocketException):
+    """
+    On errors while catching up on missed events.
+    """
+    pass
@@ -3,8 +3,10 @@ from typing import Any, Iterator
 from urllib.parse import quote_plus
 
 from hiro_graph_client.clientlib import AuthenticatedAPIHandler, AbstractTokenApiHandler
+from hiro_graph_client.profiling import profile_public_methods
 
 
+@profile_public_methods
 class HiroIam(AuthenticatedAPIHandler):
     """
     Python implementation for accessing the HIRO IAM REST API.
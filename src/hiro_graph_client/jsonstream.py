@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON encoding of large request bodies, so the encoded body never has to be held in memory as a whole.
+"""
+import json
+from typing import Any, Iterator
+
+CHUNK_SIZE = 65536
+""" Approximate size in bytes of the chunks of the body """
+
+SLICE_SIZE = 1000
+""" Amount of list elements that are encoded at once """
+
+
+class JsonStream:
+    """
+    A JSON document that is encoded into chunks of bytes while it is iterated, for use as streaming request body
+    (*requests.post(data=JsonStream(...))*), which is sent with *Transfer-Encoding: chunked*.
+
+    Dicts and lists are encoded element by element and long lists in slices of *slice_size* elements, each with the
+    C encoder of *json*. So only one slice of the encoded body is in memory at a time. Each iteration encodes the
+    document again, so the body can be sent again when a request is repeated.
+    """
+
+    data: Any
+    """ The document """
+
+    chunk_size: int
+    slice_size: int
+
+    def __init__(self, data: Any, chunk_size: int = CHUNK_SIZE, slice_size: int = SLICE_SIZE):
+        """
+        Constructor
+
+        :param data: The document. Must not be changed while it is sent.
+        :param chunk_size: Approximate size in bytes of the chunks. Default is *CHUNK_SIZE*.
+        :param slice_size: Amount of list elements that are encoded at once. Default is *SLICE_SIZE*.
+        """
+        self.data = data
+        self.chunk_size = chunk_size
+        self.slice_size = slice_size
+
+    def __iter__(self) -> Iterator[bytes]:
+        buffer = []
+        size = 0
+        for part in self._encode(self.data):
+            buffer.append(part)
+            size += len(part)
+            if size >= self.chunk_size:
+                yield ''.join(buffer).encode('utf-8')
+                buffer = []
+                size = 0
+
+        if buffer:
+            yield ''.join(buffer).encode('utf-8')
+
+    def __repr__(self) -> str:
+        return f"JsonStream({type(self.data).__name__})"
+
+    @staticmethod
+    def _dumps(value: Any) -> str:
+        return json.dumps(value, separators=(',', ':'), allow_nan=False)
+
+    def _encode(self, value: Any) -> Iterator[str]:
+        if isinstance(value, dict) and value:
+            separator = '{'
+            for key, item in value.items():
+                yield separator + self._dumps(key if isinstance(key, str) else self._dumps(key)) + ':'
+                yield from self._encode(item)
+                separator = ','
+            yield '}'
+        elif isinstance(value, (list, tuple)) and len(value) > self.slice_size:
+            separator = '['
+            for start in range(0, len(value), self.slice_size):
+                yield separator + self._dumps(value[start:start + self.slice_size])[1:-1]
+                separator = ','
+            yield ']'
+        else:
+            yield self._dumps(value)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Spreads the requests of a GraphConnectionHandler over several HIRO gateway nodes.
+"""
+import logging
+import threading
+import time
+from typing import List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+LEAST_LOADED = 'least_loaded'
+""" Route each request to the node with the fewest requests in flight. Ties are resolved round-robin. """
+
+LOWEST_LATENCY = 'lowest_latency'
+""" Route each request to the node with the lowest average latency. Ties are broken by requests in flight. """
+
+FAILURE_STATUS_CODES = (502, 503, 504)
+""" Status codes of responses that count as a failure of the node """
+
+
+class Node:
+    """
+    State of a single gateway node. Guarded by the lock of its :class:`LoadBalancingSession`.
+    """
+
+    root_url: str
+    """ Root url of the node, like https://node1.engine.datagroup.de """
+
+    in_flight: int = 0
+    """ Requests that have been sent to this node and are not finished yet """
+
+    latency: float = 0.0
+    """ Exponentially weighted average of the response times in seconds """
+
+    failures: int = 0
+    """ Consecutive failures """
+
+    ejected_until: float = 0.0
+    """ Monotonic time until which this node does not receive requests. 0.0 if the node is admitted. """
+
+    probing: bool = False
+    """ A health probe of this node is running """
+
+    version_info: Optional[dict] = None
+    """ Result of /api/version of this node """
+
+    def __init__(self, root_url: str):
+        """
+        Constructor
+
+        :param root_url: Root url of the node.
+        """
+        self.root_url = root_url
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until > 0.0
+
+
+class LoadBalancingSession(requests.Session):
+    """
+    A *requests.Session* that routes each request for the first root url to one of several nodes.
+
+    All nodes are probed via /api/version before the first request. The API endpoints of the first node that answers
+    are the reference for all others: Nodes whose /api/version differs are not used, so endpoints resolved by a
+    GraphConnectionHandler stay valid for every node a request may be routed to.
+
+    A node gets ejected after *max_failures* consecutive failures (connection errors, timeouts and the status codes
+    in *FAILURE_STATUS_CODES*). After *cool_down* seconds, it is probed again and re-admitted when healthy. If all
+    nodes are ejected, requests go to the node whose cool-down ends first.
+
+    Requests that fail are not repeated here. The retries of :class:`~hiro_graph_client.clientlib.AbstractAPI`
+    (see *max_tries*) will be routed to another node.
+    """
+
+    root_url: str
+    """ The root url requests are addressed to. Its prefix gets replaced by the root url of the selected node. """
+
+    nodes: List[Node]
+
+    strategy: str
+    """ Either *LEAST_LOADED* or *LOWEST_LATENCY* """
+
+    cool_down: float
+    """ Seconds an ejected node does not receive requests """
+
+    max_failures: int
+    """ Consecutive failures after which a node gets ejected """
+
+    probe_timeout: float
+    """ Timeout of a health probe in seconds """
+
+    _reference_version: Optional[dict] = None
+    """ Result of /api/version all nodes have to match """
+
+    _probed: bool = False
+    """ Initial probe of all nodes has been done """
+
+    _lock: threading.RLock
+    """ Guards the state of all nodes """
+
+    _probe_lock: threading.Lock
+    """ Serializes the initial probe """
+
+    _rotation: int = 0
+    """ Counter for the round-robin among equally loaded nodes """
+
+    _health_check_thread: Optional[threading.Thread] = None
+    _health_check_condition: threading.Condition
+    _closed: bool = False
+
+    def __init__(self,
+                 root_urls: List[str],
+                 strategy: str = LEAST_LOADED,
+                 cool_down: float = 30.0,
+                 max_failures: int = 1,
+                 probe_timeout: float = 10.0,
+                 health_check_interval: float = None):
+        """
+        Constructor
+
+        :param root_urls: Root urls of all nodes. The first one is used as the root url the requests are addressed to.
+        :param strategy: *LEAST_LOADED* (default) or *LOWEST_LATENCY*.
+        :param cool_down: Seconds an ejected node does not receive requests. Default is 30.
+        :param max_failures: Consecutive failures after which a node gets ejected. Default is 1.
+        :param probe_timeout: Timeout of a health probe in seconds. Default is 10.
+        :param health_check_interval: Optional seconds between health probes of all nodes in a background thread.
+               Default is None: Probe only before the first request and before re-admitting an ejected node.
+        """
+        super().__init__()
+
+        if not root_urls:
+            raise ValueError("'root_urls' must not be empty.")
+
+        if strategy not in [LEAST_LOADED, LOWEST_LATENCY]:
+            raise ValueError(f"Unknown strategy '{strategy}'.")
+
+        self.root_url = root_urls[0]
+        self.nodes = [Node(root_url) for root_url in root_urls]
+        self.strategy = strategy
+        self.cool_down = cool_down
+        self.max_failures = max_failures
+        self.probe_timeout = probe_timeout
+
+        self._lock = threading.RLock()
+        self._probe_lock = threading.Lock()
+        self._health_check_condition = threading.Condition(self._lock)
+
+        if health_check_interval:
+            self._health_check_thread = threading.Thread(target=self._health_check,
+                                                         args=(health_check_interval,),
+                                                         name="LoadBalancingHealthCheck",
+                                                         daemon=True)
+            self._health_check_thread.start()
+
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        if not isinstance(url, str) or not url.startswith(self.root_url):
+            return super().request(method, url, *args, **kwargs)
+
+        node = self.select_node()
+
+        with self._lock:
+            node.in_flight += 1
+
+        start = time.perf_counter()
+        try:
+            res = super().request(method, node.root_url + url[len(self.root_url):], *args, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self._report(node, time.perf_counter() - start, failed=True)
+            raise
+        finally:
+            with self._lock:
+                node.in_flight -= 1
+
+        self._report(node, time.perf_counter() - start, failed=res.status_code in FAILURE_STATUS_CODES)
+        return res
+
+    def select_node(self) -> Node:
+        """
+        :return: The admitted node that shall receive the next request according to *self.strategy*.
+        """
+        self._probe_all_once()
+
+        now = time.monotonic()
+        with self._lock:
+            for node in self.nodes:
+                if node.ejected and node.ejected_until <= now and not node.probing:
+                    node.probing = True
+                    threading.Thread(target=self.probe, args=(node,), daemon=True).start()
+
+            admitted = [node for node in self.nodes if not node.ejected]
+            if not admitted:
+                return min(self.nodes, key=lambda _node: _node.ejected_until)
+
+            if self.strategy == LOWEST_LATENCY:
+                return min(admitted, key=lambda _node: (_node.latency, _node.in_flight))
+
+            self._rotation += 1
+            index = min(range(len(admitted)),
+                        key=lambda _index: (admitted[_index].in_flight, (_index - self._rotation) % len(admitted)))
+            return admitted[index]
+
+    def select_root_url(self) -> str:
+        """
+        :return: The root url of the node that shall receive the next connection, i.e. of a websocket.
+        """
+        return self.select_node().root_url
+
+    def probe(self, node: Node) -> bool:
+        """
+        Check the health of *node* via /api/version. Admits the node if it is healthy and its API endpoints match
+        those of the other nodes, ejects it otherwise.
+
+        :param node: The node to probe.
+        :return: True if the node has been admitted.
+        """
+        result = self._fetch_version(node)
+
+        with self._lock:
+            node.probing = False
+            return self._apply_probe(node, result)
+
+    def probe_all(self) -> None:
+        """
+        Probe all nodes in parallel and wait for the results. The first node in the list of root urls that answers
+        becomes the reference for the API endpoints of all nodes unless a reference exists already.
+        """
+        results = {}
+
+        def _fetch(_node: Node):
+            results[_node.root_url] = self._fetch_version(_node)
+
+        threads = [threading.Thread(target=_fetch, args=(node,), daemon=True) for node in self.nodes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with self._lock:
+            for node in self.nodes:
+                self._apply_probe(node, results.get(node.root_url))
+
+    def close(self) -> None:
+        with self._health_check_condition:
+            self._closed = True
+            self._health_check_condition.notify_all()
+
+        super().close()
+
+    ###############################################################################################################
+    # Internal methods
+    ###############################################################################################################
+
+    def _fetch_version(self, node: Node) -> Optional[tuple]:
+        start = time.perf_counter()
+        try:
+            res = super().request('GET', node.root_url + '/api/version', timeout=self.probe_timeout)
+            res.raise_for_status()
+            return res.json(), time.perf_counter() - start
+        except Exception as err:
+            logger.warning("Health probe of %s failed: %s", node.root_url, str(err))
+            return None
+
+    def _apply_probe(self, node: Node, result: Optional[tuple]) -> bool:
+        if result is None:
+            self._eject(node)
+            return False
+
+        version_info, latency = result
+        node.version_info = version_info
+
+        if self._reference_version is None:
+            self._reference_version = version_info
+        elif version_info != self._reference_version:
+            logger.warning("API version of %s differs from the other nodes. Not using it.", node.root_url)
+            self._eject(node)
+            return False
+
+        if node.ejected:
+            logger.info("Node %s admitted again.", node.root_url)
+
+        node.latency = latency
+        node.failures = 0
+        node.ejected_until = 0.0
+        return True
+
+    def _probe_all_once(self) -> None:
+        if self._probed:
+            return
+
+        with self._probe_lock:
+            if not self._probed:
+                self.probe_all()
+                self._probed = True
+
+    def _eject(self, node: Node) -> None:
+        if not node.ejected:
+            logger.warning("Ejecting node %s for %.1fs.", node.root_url, self.cool_down)
+        node.ejected_until = time.monotonic() + self.cool_down
+
+    def _report(self, node: Node, latency: float, failed: bool) -> None:
+        with self._lock:
+            if failed:
+                node.failures += 1
+                if node.failures >= self.max_failures:
+                    self._eject(node)
+            else:
+                node.failures = 0
+                node.latency = latency if not node.latency else 0.8 * node.latency + 0.2 * latency
+
+    def _health_check(self, interval: float) -> None:
+        while True:
+            with self._health_check_condition:
+                self._health_check_condition.wait_for(lambda: self._closed, timeout=interval)
+                if self._closed:
+                    return
+
+            try:
+                self.probe_all()
+                self._probed = True
+            except Exception as err:
+                logger.warning("Health check failed: %s", str(err))
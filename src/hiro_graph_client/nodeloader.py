@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Batching of single lookups: Lookups made by several threads within a short window are collected and resolved by one
+request (like a *dataloader*).
+"""
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+MISSING = object()
+""" Result of :func:`BatchLoader.load` for keys the batch function did not return a value for """
+
+
+class BatchLoader:
+    """
+    Collects the keys of :func:`load` calls made within *window* seconds of the first one, or until *max_batch_size*
+    keys are pending, and resolves all of them via one call of *batch_function*. Each caller blocks until its own
+    value is available. Concurrent loads of the same key share one value.
+
+    ::
+
+        loader = BatchLoader(lambda keys: {key: fetch(key) for key in keys})
+
+        value = loader.load(key)
+    """
+
+    batch_function: Callable[[List[Hashable]], Dict[Hashable, Any]]
+    """ Function *batch_function(keys)* that returns a dict of the values found for *keys* """
+
+    window: float
+    """ Seconds to wait for more keys after the first key of a batch """
+
+    max_batch_size: int
+    """ Max keys per call of *batch_function* """
+
+    _pending: Dict[Hashable, Future]
+    """ Futures of the keys of the batch that is being collected """
+
+    _timer: Optional[threading.Timer] = None
+
+    _lock: threading.Lock
+    """ Guards *self._pending* and *self._timer* """
+
+    def __init__(self,
+                 batch_function: Callable[[List[Hashable]], Dict[Hashable, Any]],
+                 window: float = 0.005,
+                 max_batch_size: int = 100):
+        """
+        Constructor
+
+        :param batch_function: Function *batch_function(keys)* that returns a dict of the values found for *keys*.
+               Keys without value are resolved as *MISSING*. An exception is raised to all callers of the batch.
+        :param window: Seconds to wait for more keys after the first key of a batch. Default is 0.005.
+        :param max_batch_size: Max keys per call of *batch_function*. Default is 100.
+        """
+        if window < 0 or max_batch_size < 1:
+            raise ValueError("'window' must not be negative and 'max_batch_size' must be positive.")
+
+        self.batch_function = batch_function
+        self.window = window
+        self.max_batch_size = max_batch_size
+
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def load(self, key: Hashable, timeout: float = None) -> Any:
+        """
+        Add *key* to the current batch and wait for its value.
+
+        :param key: The key.
+        :param timeout: Max seconds to wait. Default is to wait until the batch has been resolved.
+        :return: The value of *key* or *MISSING*.
+        :raises Exception: The exception of *batch_function*.
+        """
+        batch = None
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = Future()
+                self._pending[key] = future
+                if len(self._pending) >= self.max_batch_size:
+                    batch = self._take_batch()
+                elif self._timer is None:
+                    self._timer = threading.Timer(self.window, self._dispatch)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+        if batch:
+            # A full batch is resolved by the caller that completed it.
+            self._resolve(batch)
+
+        return future.result(timeout)
+
+    def flush(self) -> None:
+        """
+        Resolve the pending keys now instead of waiting for the window to pass.
+        """
+        with self._lock:
+            batch = self._take_batch()
+        if batch:
+            self._resolve(batch)
+
+    ###############################################################################################################
+    # Internal methods
+    ###############################################################################################################
+
+    def _take_batch(self) -> Dict[Hashable, Future]:
+        batch = self._pending
+        self._pending = {}
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            batch = self._take_batch()
+        if batch:
+            self._resolve(batch)
+
+    def _resolve(self, batch: Dict[Hashable, Future]) -> None:
+        try:
+            values = self.batch_function(list(batch))
+        except Exception as err:
+            logger.debug("Batch of %d keys failed: %s", len(batch), str(err))
+            for future in batch.values():
+                future.set_exception(err)
+            return
+
+        for key, future in batch.items():
+            future.set_result(values.get(key, MISSING))
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Opt-in sampling profiler for the public API methods and the websocket callbacks of this library.
+
+Profiling is disabled by default. Enable it by calling :func:`enable_profiling` or by setting the environment variable
+*HIRO_PROFILE* before the package is imported:
+
+* ``HIRO_PROFILE=1`` profiles every call.
+* ``HIRO_PROFILE=0.05`` profiles a sample of 5% of all calls.
+* ``HIRO_PROFILE_OUTPUT=/tmp/hiro.prof`` sets the file the profile is written to at exit. Default is
+  *hiro_graph_client.prof* in the current working directory.
+
+Wall-time and CPU-time are collected for every call of a profiled method, sampled calls are additionally run under
+*cProfile*. The aggregated profile is written in the standard *pstats* format which can be read by
+``python -m pstats`` or tools like *snakeviz*.
+"""
+import atexit
+import cProfile
+import inspect
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Optional, Dict, Iterator
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+PROFILE_ENV_VAR = 'HIRO_PROFILE'
+""" Environment variable which enables profiling. Either a boolean flag or the sample rate between 0.0 and 1.0. """
+
+PROFILE_OUTPUT_ENV_VAR = 'HIRO_PROFILE_OUTPUT'
+""" Environment variable with the path of the profile that gets written at exit. """
+
+DEFAULT_OUTPUT_FILE = 'hiro_graph_client.prof'
+
+
+class CallStats:
+    """
+    Timing information about all calls of one profiled method.
+    """
+    name: str
+    calls: int = 0
+    """ Amount of calls """
+    sampled: int = 0
+    """ Amount of calls which have been run under cProfile """
+    wall_time: float = 0.0
+    """ Summarized wall-time of all calls in seconds """
+    cpu_time: float = 0.0
+    """ Summarized cpu-time of the calling thread of all calls in seconds """
+    max_wall_time: float = 0.0
+    """ Longest wall-time of a single call in seconds """
+
+    def __init__(self, name: str):
+        """
+        Constructor
+
+        :param name: Name of the method, like *HiroGraph.query*.
+        """
+        self.name = name
+
+    def add(self, wall_time: float, cpu_time: float, sampled: bool, call: bool = True) -> None:
+        """
+        :param wall_time: Wall-time in seconds.
+        :param cpu_time: Cpu-time in seconds.
+        :param sampled: Whether the time has been run under cProfile.
+        :param call: Whether the time starts a new call or continues one, like further steps of a generator.
+        """
+        self.calls += 1 if call else 0
+        self.sampled += 1 if sampled and call else 0
+        self.wall_time += wall_time
+        self.cpu_time += cpu_time
+        self.max_wall_time = max(self.max_wall_time, wall_time)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "sampled": self.sampled,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "max_wall_time": self.max_wall_time
+        }
+
+
+class Profiler:
+    """
+    Collects timings and sampled cProfile data of profiled calls. Thread-safe.
+
+    Only the outermost profiled call of a thread gets sampled, so nested calls (like *HiroGraph.escaped_query* calling
+    *HiroGraph.query*) appear inside the profile of their caller. Since the interpreter allows only one active
+    cProfile at a time, a sampled call that overlaps with a sampled call in another thread only records its timings.
+    """
+
+    sample_rate: float
+    """ Fraction of calls that are run under cProfile """
+
+    output_file: Optional[str]
+    """ Default file for *self.dump()* """
+
+    _stats: Dict[str, CallStats]
+    _profile_stats: Optional[pstats.Stats] = None
+
+    _lock: threading.RLock
+    """ Protects *self._stats* and *self._profile_stats* """
+
+    _cprofile_lock: threading.Lock
+    """ Held while a cProfile is active """
+
+    _local: threading.local
+    """ Nesting depth and sampling decision of the current thread """
+
+    def __init__(self, sample_rate: float = 1.0, output_file: str = None):
+        """
+        Constructor
+
+        :param sample_rate: Fraction of calls (0.0 - 1.0) that are run under cProfile. Default is 1.0: All calls.
+        :param output_file: Default file for *self.dump()*.
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("'sample_rate' must be between 0.0 and 1.0.")
+
+        self.sample_rate = sample_rate
+        self.output_file = output_file
+
+        self._stats = {}
+        self._lock = threading.RLock()
+        self._cprofile_lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def measure(self, name: str, call: bool = True) -> Iterator[None]:
+        """
+        Measure the enclosed code and attribute its time to *name*.
+
+        :param name: Name of the profiled method.
+        :param call: Count the enclosed code as a new call of *name*. Set this to False to add the time of further
+               steps of a generator to its call.
+        """
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+
+        profile: Optional[cProfile.Profile] = None
+        if depth == 0 and random.random() < self.sample_rate and self._cprofile_lock.acquire(blocking=False):
+            profile = cProfile.Profile()
+
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            if profile:
+                profile.enable()
+            yield
+        finally:
+            if profile:
+                profile.disable()
+                self._cprofile_lock.release()
+
+            wall_time = time.perf_counter() - start_wall
+            cpu_time = time.thread_time() - start_cpu
+            self._local.depth = depth
+
+            with self._lock:
+                call_stats = self._stats.get(name)
+                if not call_stats:
+                    call_stats = self._stats[name] = CallStats(name)
+                call_stats.add(wall_time, cpu_time, profile is not None, call)
+
+                if profile:
+                    if self._profile_stats is None:
+                        self._profile_stats = pstats.Stats(profile)
+                    else:
+                        self._profile_stats.add(profile)
+
+    def call_stats(self) -> Dict[str, dict]:
+        """
+        :return: Copy of the collected timings as dict of {method name: timings}.
+        """
+        with self._lock:
+            return {name: call_stats.to_dict() for name, call_stats in self._stats.items()}
+
+    def dump(self, path: str = None) -> Optional[str]:
+        """
+        Write the aggregated cProfile data in pstats format and log a summary of the timings.
+
+        :param path: File to write to. Default is *self.output_file* or *DEFAULT_OUTPUT_FILE*.
+        :return: The path of the written file or None if no call has been sampled yet.
+        """
+        path = path or self.output_file or DEFAULT_OUTPUT_FILE
+
+        with self._lock:
+            for name, call_stats in sorted(self._stats.items(), key=lambda item: -item[1].wall_time):
+                logger.info("%s: %d calls (%d sampled), wall %.6fs (max %.6fs), cpu %.6fs",
+                            name,
+                            call_stats.calls,
+                            call_stats.sampled,
+                            call_stats.wall_time,
+                            call_stats.max_wall_time,
+                            call_stats.cpu_time)
+
+            if self._profile_stats is None:
+                return None
+
+            self._profile_stats.dump_stats(path)
+
+        logger.info("Profile written to %s", path)
+        return path
+
+    def reset(self) -> None:
+        """
+        Discard all collected data.
+        """
+        with self._lock:
+            self._stats = {}
+            self._profile_stats = None
+
+
+_profiler: Optional[Profiler] = None
+""" The active profiler. None when profiling is disabled. """
+
+
+def _dump_at_exit() -> None:
+    if _profiler:
+        _profiler.dump()
+
+
+def enable_profiling(sample_rate: float = 1.0, output_file: str = None, dump_at_exit: bool = True) -> Profiler:
+    """
+    Enable profiling for this process. Replaces a profiler that has been enabled before.
+
+    :param sample_rate: Fraction of calls (0.0 - 1.0) that are run under cProfile. Default is 1.0: All calls.
+    :param output_file: File the profile is written to by :func:`dump_profile`.
+    :param dump_at_exit: Write the profile to *output_file* when the interpreter exits. Default is True.
+    :return: The new profiler.
+    """
+    global _profiler
+
+    _profiler = Profiler(sample_rate=sample_rate, output_file=output_file)
+
+    atexit.unregister(_dump_at_exit)
+    if dump_at_exit:
+        atexit.register(_dump_at_exit)
+
+    return _profiler
+
+
+def disable_profiling() -> None:
+    """
+    Disable profiling. Collected data is discarded.
+    """
+    global _profiler
+
+    _profiler = None
+    atexit.unregister(_dump_at_exit)
+
+
+def get_profiler() -> Optional[Profiler]:
+    """
+    :return: The active profiler or None if profiling is disabled.
+    """
+    return _profiler
+
+
+def dump_profile(path: str = None) -> Optional[str]:
+    """
+    Write the profile of the active profiler. See :meth:`Profiler.dump`.
+
+    :param path: File to write to.
+    :return: The path of the written file or None if nothing has been written.
+    """
+    return _profiler.dump(path) if _profiler else None
+
+
+@contextmanager
+def profiled(name: str, owner: object = None) -> Iterator[None]:
+    """
+    Profile the enclosed code when profiling is enabled.
+
+    :param name: Name of the profiled method.
+    :param owner: Optional object the method belongs to. Its class name will be prepended to *name*.
+    """
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+
+    with profiler.measure(f"{owner.__class__.__name__}.{name}" if owner is not None else name):
+        yield
+
+
+def profile_public_methods(cls):
+    """
+    Class decorator which attributes the time spent in each public method of *cls* to *<cls name>.<method>* while
+    profiling is enabled. Each step of generator methods is measured on its own, so the time the caller spends
+    between two steps is not attributed to the method. All steps of a generator count as one call.
+
+    :param cls: The class to decorate.
+    :return: *cls*
+    """
+
+    def _wrap(name: str, func):
+        if inspect.isgeneratorfunction(func):
+            @wraps(func)
+            def _generator_wrapper(*args, **kwargs):
+                generator = func(*args, **kwargs)
+                step = generator.send
+                argument = None
+                first = True
+                while True:
+                    profiler = _profiler
+                    try:
+                        if profiler is None:
+                            item = step(argument)
+                        else:
+                            with profiler.measure(name, call=first):
+                                item = step(argument)
+                    except StopIteration as stop:
+                        return stop.value
+                    first = False
+
+                    try:
+                        argument = yield item
+                        step = generator.send
+                    except GeneratorExit:
+                        generator.close()
+                        raise
+                    except BaseException as err:
+                        argument = err
+                        step = generator.throw
+
+            return _generator_wrapper
+
+        @wraps(func)
+        def _wrapper(*args, **kwargs):
+            # Read the global once: Another thread may disable profiling in between.
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.measure(name):
+                return func(*args, **kwargs)
+
+        return _wrapper
+
+    for attr_name, attr in list(vars(cls).items()):
+        if not attr_name.startswith('_') and inspect.isfunction(attr):
+            setattr(cls, attr_name, _wrap(f"{cls.__name__}.{attr_name}", attr))
+
+    return cls
+
+
+def _enable_from_environment() -> None:
+    value = os.environ.get(PROFILE_ENV_VAR, '').strip().lower()
+    if not value or value in ['0', 'false', 'no', 'off']:
+        return
+
+    try:
+        sample_rate = 1.0 if value in ['true', 'yes', 'on'] else min(max(float(value), 0.0), 1.0)
+    except ValueError:
+        logger.warning("Invalid value '%s' for %s. Profiling all calls.", value, PROFILE_ENV_VAR)
+        sample_rate = 1.0
+
+    enable_profiling(sample_rate=sample_rate, output_file=os.environ.get(PROFILE_OUTPUT_ENV_VAR))
+
+
+_enable_from_environment()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Compact, read-only records for vertices and edges of HIRO Graph.
+
+A record stores only a reference to a layout shared by all records with the same keys and a tuple of its values.
+Compared to a dict per vertex, this needs a fraction of the memory. Keys and common values like *ogit/_type* are
+interned.
+
+Nested JSON objects which are not vertices or edges, like the meta information of *listMeta*, are rarely used. They
+are kept as compact JSON string and only decoded when they are accessed. Scalar values like *ogit/_graphtype* or
+*ogit/_v-id* are stored as decoded by the JSON parser, since a raw form would not need less memory.
+
+Records are created while the JSON response is decoded, by passing :func:`record_pairs_hook` as *object_pairs_hook*.
+Every JSON object containing *ogit/_id* becomes a :class:`NodeRecord` or an :class:`EdgeRecord`, all others stay
+dicts. See the parameter *records* of :class:`~hiro_graph_client.client.HiroGraph.query`,
+:class:`~hiro_graph_client.client.HiroGraph.get_nodes` and :class:`~hiro_graph_client.client.HiroGraph.get_events`.
+"""
+import json
+import sys
+from collections.abc import Mapping
+from typing import Tuple, Dict, Any, List, Iterator, Optional
+
+INTERNED_VALUE_KEYS = frozenset([
+    'ogit/_type',
+    'ogit/_graphtype',
+    'ogit/_creator',
+    'ogit/_creator-app',
+    'ogit/_modified-by',
+    'ogit/_modified-by-app',
+    'ogit/_owner',
+    'ogit/_organization',
+    'ogit/_scope',
+    'ogit/_is-deleted'
+])
+""" Keys whose string values repeat a lot and get interned """
+
+MAX_LAYOUTS = 10000
+""" Max amount of distinct layouts that are cached """
+
+
+class RecordLayout:
+    """
+    The keys shared by all records with the same fields.
+    """
+    __slots__ = ('keys', 'index', 'record_class', 'intern_positions')
+
+    keys: Tuple[str, ...]
+    """ Interned keys in the order of the values of a record """
+
+    index: Dict[str, int]
+    """ Position of each key in *self.keys* """
+
+    record_class: Optional[type]
+    """ The class of records with this layout. None if JSON objects with these keys stay dicts. """
+
+    intern_positions: Tuple[int, ...]
+    """ Positions of the values that get interned """
+
+    def __init__(self, keys: Tuple[str, ...]):
+        """
+        Constructor
+
+        :param keys: The keys of the JSON object in their original order.
+        """
+        self.keys = tuple(sys.intern(key) for key in keys)
+        self.index = {key: position for position, key in enumerate(self.keys)}
+
+        if 'ogit/_id' not in self.index or len(self.index) != len(self.keys):
+            self.record_class = None
+        elif 'ogit/_out-id' in self.index and 'ogit/_in-id' in self.index:
+            self.record_class = EdgeRecord
+        else:
+            self.record_class = NodeRecord
+
+        self.intern_positions = tuple(position for position, key in enumerate(self.keys) if key in INTERNED_VALUE_KEYS)
+
+
+_layouts: Dict[Tuple[str, ...], RecordLayout] = {}
+""" Cache of all layouts by their keys """
+
+
+def get_layout(keys: Tuple[str, ...]) -> RecordLayout:
+    """
+    :param keys: The keys of a JSON object.
+    :return: The shared layout for *keys*.
+    """
+    layout = _layouts.get(keys)
+    if layout is None:
+        layout = RecordLayout(keys)
+        if len(_layouts) < MAX_LAYOUTS:
+            layout = _layouts.setdefault(layout.keys, layout)
+    return layout
+
+
+class LazyValue:
+    """
+    A nested JSON object of a record, kept as compact JSON string until it is accessed.
+    """
+    __slots__ = ('raw',)
+
+    raw: str
+    """ The compact JSON of the value """
+
+    def __init__(self, raw: str):
+        """
+        Constructor
+
+        :param raw: The compact JSON of the value.
+        """
+        self.raw = raw
+
+    def __repr__(self) -> str:
+        return f"LazyValue({self.raw!r})"
+
+    def decode(self) -> Any:
+        """
+        :return: The decoded value. Each call returns a new object. Nested vertices and edges become records again.
+        """
+        return json.loads(self.raw, object_pairs_hook=record_pairs_hook)
+
+
+def _resolve(value: Any) -> Any:
+    return value.decode() if type(value) is LazyValue else value
+
+
+def _make_record(keys: Tuple[str, ...], values: tuple):
+    layout = get_layout(keys)
+    return layout.record_class(layout, values)
+
+
+class GraphRecord(Mapping):
+    """
+    Read-only mapping of the fields of a vertex or an edge. Compares equal to a dict with the same items.
+
+    Nested JSON objects are decoded each time they are accessed, see :class:`LazyValue`.
+    """
+    __slots__ = ('_layout', '_values')
+
+    def __init__(self, layout: RecordLayout, values: tuple):
+        """
+        Constructor
+
+        :param layout: The shared layout with the keys of *values*.
+        :param values: The values in the order of *layout.keys*.
+        """
+        self._layout = layout
+        self._values = values
+
+    def __getitem__(self, key: str) -> Any:
+        return _resolve(self._values[self._layout.index[key]])
+
+    def __contains__(self, key) -> bool:
+        return key in self._layout.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout.keys)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return _make_record, (self._layout.keys, self._values)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        position = self._layout.index.get(key)
+        return default if position is None else _resolve(self._values[position])
+
+    def to_dict(self) -> dict:
+        """
+        :return: A new dict with all fields. Nested records are converted too.
+        """
+        return {key: _to_plain(value) for key, value in zip(self._layout.keys, self._values)}
+
+    @property
+    def id(self) -> str:
+        return self.get('ogit/_id')
+
+    @property
+    def type(self) -> Optional[str]:
+        return self.get('ogit/_type')
+
+    @property
+    def modified_on(self) -> Optional[int]:
+        return self.get('ogit/_modified-on')
+
+    @property
+    def created_on(self) -> Optional[int]:
+        return self.get('ogit/_created-on')
+
+    @property
+    def is_deleted(self) -> bool:
+        return self.get('ogit/_is-deleted') in [True, 'true']
+
+
+class NodeRecord(GraphRecord):
+    """
+    Record of a vertex.
+    """
+    __slots__ = ()
+
+    @property
+    def xid(self) -> Optional[str]:
+        return self.get('ogit/_xid')
+
+
+class EdgeRecord(GraphRecord):
+    """
+    Record of an edge.
+    """
+    __slots__ = ()
+
+    @property
+    def out_id(self) -> str:
+        return self.get('ogit/_out-id')
+
+    @property
+    def in_id(self) -> str:
+        return self.get('ogit/_in-id')
+
+
+def _to_plain(value: Any) -> Any:
+    if type(value) is LazyValue:
+        return json.loads(value.raw)
+    if isinstance(value, GraphRecord):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_to_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _to_plain(item) for key, item in value.items()}
+    return value
+
+
+def record_pairs_hook(pairs: List[Tuple[str, Any]]) -> Any:
+    """
+    *object_pairs_hook* for the JSON decoder that turns vertices and edges into records.
+
+    :param pairs: The decoded key-value pairs of a JSON object.
+    :return: A :class:`GraphRecord` if the object contains *ogit/_id*, a dict otherwise.
+    """
+    layout = get_layout(tuple([key for key, _ in pairs]))
+    if layout.record_class is None:
+        return dict(pairs)
+
+    values = [value for _, value in pairs]
+    for position, value in enumerate(values):
+        if type(value) is dict:
+            values[position] = LazyValue(json.dumps(value, separators=(',', ':'), default=_to_plain))
+
+    for position in layout.intern_positions:
+        value = values[position]
+        if type(value) is str:
+            values[position] = sys.intern(value)
+
+    return layout.record_class(layout, tuple(values))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Replay of long time ranges of events and history entries in concurrently fetched time slices.
+"""
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Iterator, List, Tuple, Optional, Deque
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+
+def event_time(event: dict) -> Tuple[Optional[int], int]:
+    """
+    :param event: An event or a history entry.
+    :return: Sort key (timestamp in ms, nanotime) of *event*. The timestamp is taken from *timestamp* or, for history
+             entries without event fields, from *ogit/_modified-on*. It is None if neither exists.
+    """
+    timestamp = event.get('timestamp')
+    if timestamp is None:
+        timestamp = event.get('ogit/_modified-on')
+    return (int(timestamp) if timestamp is not None else None), int(event.get('nanotime') or 0)
+
+
+def _slice_sort_key(event: dict) -> Tuple[int, int]:
+    timestamp, nanotime = event_time(event)
+    return timestamp if timestamp is not None else -1, nanotime
+
+
+def replay_slices(fetch: Callable[[int, int], List[dict]],
+                  ts_from: int,
+                  ts_to: int,
+                  window: int,
+                  concurrency: int = 4,
+                  prefetch: int = None) -> Iterator[dict]:
+    """
+    Split *[ts_from, ts_to)* into slices of *window* ms, fetch them concurrently and yield their entries ordered by
+    timestamp and nanotime.
+
+    Since the slices do not overlap, each slice is sorted on its own and the slices are yielded one after another. At
+    most *prefetch* slices are fetched or held in memory at a time, so a slow consumer does not let the buffer grow.
+
+    :param fetch: Function *fetch(ts_from, ts_to)* which returns all entries from *ts_from* to *ts_to* (both inclusive).
+           Entries with a timestamp outside *[ts_from, ts_to)* are dropped, so boundaries are not delivered twice.
+           Entries without timestamp are returned by every slice and are only delivered once, at the start of the
+           first slice.
+    :param ts_from: Start of the range in ms since epoch (inclusive).
+    :param ts_to: End of the range in ms since epoch (exclusive).
+    :param window: Duration of a slice in ms.
+    :param concurrency: Max parallel requests. Default is 4.
+    :param prefetch: Max slices fetched ahead of the consumer. Default is 2 * *concurrency*.
+    :return: Iterator over the entries.
+    """
+    if window <= 0:
+        raise ValueError("'window' must be positive.")
+
+    slices = iter(range(ts_from, ts_to, window))
+    prefetch = max(prefetch or 2 * concurrency, 1)
+
+    def _fetch_slice(start: int) -> List[dict]:
+        end = min(start + window, ts_to)
+        entries = []
+        for entry in fetch(start, end):
+            timestamp, _ = event_time(entry)
+            if (start <= timestamp < end) if timestamp is not None else start == ts_from:
+                entries.append(entry)
+        entries.sort(key=_slice_sort_key)
+        return entries
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="Replay")
+    pending: Deque[Future] = deque()
+    try:
+        for start in slices:
+            pending.append(executor.submit(_fetch_slice, start))
+            if len(pending) >= prefetch:
+                break
+
+        while pending:
+            entries = pending.popleft().result()
+
+            start = next(slices, None)
+            if start is not None:
+                pending.append(executor.submit(_fetch_slice, start))
+
+            yield from entries
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
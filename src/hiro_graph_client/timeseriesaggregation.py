@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Client-side aggregation of timeseries values held in :class:`~hiro_graph_client.timeserieslib.TimeseriesArrays`:
+Downsampling into time buckets, LTTB for plotting, alignment of several timeseries onto a common time grid and
+deltas and rates.
+
+All functions work on whole arrays with NumPy instead of looping over single values and require the optional package
+*numpy* (``pip install hiro_graph_client[numpy]``). Timestamps are expected in ascending order, like returned by
+:func:`~hiro_graph_client.client.HiroGraph.get_timeseries_arrays` with order "asc". Values that are NaN or flagged in
+the *mask* are ignored.
+"""
+from typing import Union, Dict, List, Tuple, Any
+
+from hiro_graph_client.timeserieslib import TimeseriesArrays, import_numpy
+
+MEAN = 'mean'
+MIN = 'min'
+MAX = 'max'
+SUM = 'sum'
+COUNT = 'count'
+FIRST = 'first'
+LAST = 'last'
+
+METHODS = [MEAN, MIN, MAX, SUM, COUNT, FIRST, LAST]
+""" Aggregation methods of :func:`downsample`. Percentiles are given as float instead. """
+
+FILL_NAN = 'nan'
+FILL_PREVIOUS = 'previous'
+FILL_LINEAR = 'linear'
+
+FILL_POLICIES = [FILL_NAN, FILL_PREVIOUS, FILL_LINEAR]
+""" Fill policies of :func:`align` for grid points without values. A number fills them with this number instead. """
+
+
+class AlignedTimeseries:
+    """
+    Several timeseries on a common time grid.
+    """
+
+    timestamps: Any
+    """ The time grid in ms since epoch as *numpy.ndarray* of dtype int64 """
+
+    values: Any
+    """ *numpy.ndarray* of dtype float64 with one row per grid point and one column per timeseries """
+
+    ids: List[str]
+    """ The ids of the timeseries in the order of the columns """
+
+    def __init__(self, timestamps, values, ids: List[str]):
+        """
+        Constructor
+
+        :param timestamps: The time grid.
+        :param values: The 2-D array of values.
+        :param ids: The ids of the columns.
+        """
+        self.timestamps = timestamps
+        self.values = values
+        self.ids = ids
+
+    def __repr__(self) -> str:
+        return f"AlignedTimeseries({len(self.timestamps)} timestamps x {len(self.ids)} timeseries)"
+
+    def column(self, series_id: str) -> TimeseriesArrays:
+        """
+        :param series_id: Id of a timeseries.
+        :return: The column of *series_id* as arrays.
+        """
+        return TimeseriesArrays(self.timestamps, self.values[:, self.ids.index(series_id)])
+
+    def to_arrow(self):
+        """
+        :return: A *pyarrow.Table* with the column *timestamp* and one column per timeseries. Requires *pyarrow*.
+        """
+        from hiro_graph_client.arrowexport import import_pyarrow
+        pa = import_pyarrow()
+
+        columns = [pa.array(self.timestamps)] + [pa.array(self.values[:, column]) for column in range(len(self.ids))]
+        return pa.Table.from_arrays(columns, names=['timestamp'] + list(self.ids))
+
+
+###################################################################################################################
+# Internal helpers
+###################################################################################################################
+
+def _valid(arrays: TimeseriesArrays) -> Tuple[Any, Any]:
+    """
+    :param arrays: Timeseries values.
+    :return: Timestamps and float values of all numeric values that are not NaN.
+    :raises ValueError: When the values are not numeric.
+    """
+    np = import_numpy()
+
+    if arrays.values.dtype == object:
+        raise ValueError("Aggregation requires numeric values. Use non_numeric='mask'.")
+
+    valid = ~np.isnan(arrays.values)
+    if arrays.mask is not None:
+        valid &= ~arrays.mask
+
+    if valid.all():
+        return arrays.timestamps, arrays.values
+    return arrays.timestamps[valid], arrays.values[valid]
+
+
+def _buckets(timestamps, step: int, origin: int) -> Tuple[Any, Any, Any]:
+    """
+    :param timestamps: Ascending timestamps.
+    :param step: Width of a bucket in ms.
+    :param origin: A start of a bucket in ms since epoch.
+    :return: The start of each non-empty bucket, the index of its first value and the amount of its values.
+    """
+    np = import_numpy()
+
+    bucket_ids = (timestamps - origin) // step
+    starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(timestamps)])
+    return bucket_ids[starts] * step + origin, starts, counts
+
+
+def _percentile(values, starts, counts, q: float):
+    """
+    Linear interpolated percentile *q* (0 to 100) of each bucket, computed for all buckets at once.
+    """
+    np = import_numpy()
+
+    bucket_ids = np.repeat(np.arange(len(starts)), counts)
+    ordered = values[np.lexsort((values, bucket_ids))]
+
+    position = starts + (counts - 1) * (q / 100.0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    fraction = position - lower
+    return ordered[lower] * (1.0 - fraction) + ordered[upper] * fraction
+
+
+###################################################################################################################
+# Downsampling
+###################################################################################################################
+
+def downsample(arrays: TimeseriesArrays,
+               step: int,
+               method: Union[str, float] = MEAN,
+               origin: int = 0) -> TimeseriesArrays:
+    """
+    Aggregate the values of each time bucket of width *step* into one value.
+
+    :param arrays: Timeseries values with ascending timestamps.
+    :param step: Width of a bucket in ms.
+    :param method: One of *METHODS* or a percentile between 0 and 100 like 95.0. Default is *MEAN*.
+    :param origin: A start of a bucket in ms since epoch. Buckets are [origin + n * step, origin + (n + 1) * step).
+           Default is 0.
+    :return: One value per non-empty bucket with the start of the bucket as timestamp.
+    """
+    np = import_numpy()
+
+    if step <= 0:
+        raise ValueError("'step' must be positive.")
+
+    timestamps, values = _valid(arrays)
+    if not len(timestamps):
+        return TimeseriesArrays(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+
+    bucket_starts, starts, counts = _buckets(timestamps, step, origin)
+
+    if isinstance(method, (int, float)):
+        if not 0 <= method <= 100:
+            raise ValueError("Percentiles must be between 0 and 100.")
+        result = _percentile(values, starts, counts, float(method))
+    elif method == MEAN:
+        result = np.add.reduceat(values, starts) / counts
+    elif method == MIN:
+        result = np.minimum.reduceat(values, starts)
+    elif method == MAX:
+        result = np.maximum.reduceat(values, starts)
+    elif method == SUM:
+        result = np.add.reduceat(values, starts)
+    elif method == COUNT:
+        result = counts.astype(np.float64)
+    elif method == FIRST:
+        result = values[starts]
+    elif method == LAST:
+        result = values[starts + counts - 1]
+    else:
+        raise ValueError(f"Unknown method '{method}'.")
+
+    return TimeseriesArrays(bucket_starts, result)
+
+
+def lttb(arrays: TimeseriesArrays, threshold: int) -> TimeseriesArrays:
+    """
+    Reduce a timeseries to *threshold* values that keep its visual shape, using Largest-Triangle-Three-Buckets by
+    Sveinn Steinarsson. Selects original values, so the result is meant for plotting, not for further aggregation.
+
+    :param arrays: Timeseries values with ascending timestamps.
+    :param threshold: Amount of values to keep. At least 3.
+    :return: The selected values.
+    """
+    np = import_numpy()
+
+    timestamps, values = _valid(arrays)
+    count = len(timestamps)
+    if threshold >= count or threshold < 3:
+        return TimeseriesArrays(timestamps, values)
+
+    x = timestamps.astype(np.float64)
+    edges = np.floor(np.linspace(1, count - 1, threshold - 1)).astype(np.int64)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = count - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else count
+        next_x = x[next_start:next_end].mean()
+        next_y = values[next_start:next_end].mean()
+
+        areas = np.abs((x[previous] - next_x) * (values[start:end] - values[previous]) -
+                       (x[previous] - x[start:end]) * (next_y - values[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return TimeseriesArrays(timestamps[selected], values[selected])
+
+
+###################################################################################################################
+# Alignment
+###################################################################################################################
+
+def _fill(values, policy: Union[str, float], grid):
+    np = import_numpy()
+
+    missing = np.isnan(values)
+    if not missing.any() or policy == FILL_NAN or policy is None:
+        return values
+
+    if policy == FILL_PREVIOUS:
+        positions = np.where(missing, 0, np.arange(len(values)))
+        np.maximum.accumulate(positions, out=positions)
+        return values[positions]
+
+    if policy == FILL_LINEAR:
+        present = ~missing
+        if not present.any():
+            return values
+        filled = values.copy()
+        filled[missing] = np.interp(grid[missing], grid[present], values[present], left=np.nan, right=np.nan)
+        return filled
+
+    if isinstance(policy, (int, float)):
+        return np.where(missing, float(policy), values)
+
+    raise ValueError(f"Unknown fill policy '{policy}'.")
+
+
+def align(series: Union[Dict[str, TimeseriesArrays], List[TimeseriesArrays]],
+          step: int,
+          ts_from: int = None,
+          ts_to: int = None,
+          method: Union[str, float] = MEAN,
+          fill: Union[str, float, None] = FILL_NAN) -> AlignedTimeseries:
+    """
+    Put several timeseries onto the common grid *ts_from, ts_from + step, ...* by downsampling each of them.
+
+    :param series: Dict of {id: arrays} or a list of arrays, whose ids become their positions as strings.
+    :param step: Distance of the grid points in ms.
+    :param ts_from: First grid point in ms since epoch. Default is the earliest timestamp rounded down to *step*.
+    :param ts_to: End of the grid in ms since epoch (exclusive). Default is after the latest timestamp.
+    :param method: Aggregation of the values of each grid interval. See :func:`downsample`. Default is *MEAN*.
+    :param fill: Value for grid points without values: One of *FILL_POLICIES* or a number. Default is *FILL_NAN*.
+    :return: The aligned timeseries.
+    """
+    np = import_numpy()
+
+    if not isinstance(series, dict):
+        series = {str(position): arrays for position, arrays in enumerate(series)}
+
+    if ts_from is None or ts_to is None:
+        non_empty = [arrays.timestamps for arrays in series.values() if len(arrays)]
+        if ts_from is None:
+            ts_from = (min(int(timestamps[0]) for timestamps in non_empty) // step) * step if non_empty else 0
+        if ts_to is None:
+            ts_to = max(int(timestamps[-1]) for timestamps in non_empty) + 1 if non_empty else ts_from
+
+    grid = np.arange(ts_from, ts_to, step, dtype=np.int64)
+    matrix = np.full((len(grid), len(series)), np.nan)
+
+    for column, arrays in enumerate(series.values()):
+        if len(arrays):
+            inside = (arrays.timestamps >= ts_from) & (arrays.timestamps < ts_to)
+            mask = arrays.mask[inside] if arrays.mask is not None else None
+            arrays = TimeseriesArrays(arrays.timestamps[inside], arrays.values[inside], mask)
+
+        downsampled = downsample(arrays, step, method, ts_from)
+        matrix[(downsampled.timestamps - ts_from) // step, column] = downsampled.values
+        matrix[:, column] = _fill(matrix[:, column], fill, grid)
+
+    return AlignedTimeseries(grid, matrix, list(series.keys()))
+
+
+###################################################################################################################
+# Deltas and rates
+###################################################################################################################
+
+def delta(arrays: TimeseriesArrays, counter: bool = False) -> TimeseriesArrays:
+    """
+    :param arrays: Timeseries values with ascending timestamps.
+    :param counter: Treat the values as a monotonic counter: A decrease is a reset of the counter and the delta is the
+           new value. Default is False.
+    :return: Difference of each value to its predecessor, at the timestamp of the value.
+    """
+    timestamps, values = _valid(arrays)
+    differences = values[1:] - values[:-1]
+    if counter:
+        import_numpy().copyto(differences, values[1:], where=differences < 0)
+    return TimeseriesArrays(timestamps[1:], differences)
+
+
+def rate(arrays: TimeseriesArrays, per: int = 1000, counter: bool = False) -> TimeseriesArrays:
+    """
+    :param arrays: Timeseries values with ascending timestamps.
+    :param per: Unit of the rate in ms. Default is 1000: Change per second.
+    :param counter: Treat the values as a monotonic counter. See :func:`delta`. Default is False.
+    :return: Change of the values per *per* ms between each value and its predecessor, at the timestamp of the value.
+             Values with the same timestamp as their predecessor are dropped.
+    """
+    np = import_numpy()
+
+    timestamps, _ = _valid(arrays)
+    differences = delta(arrays, counter)
+    durations = (timestamps[1:] - timestamps[:-1]).astype(np.float64)
+    distinct = durations > 0
+    return TimeseriesArrays(differences.timestamps[distinct],
+                            differences.values[distinct] / durations[distinct] * per)
+
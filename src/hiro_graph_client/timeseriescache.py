@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Local cache for windows of timeseries values, so overlapping windows of the same timeseries are downloaded only once.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import List, Tuple, Optional, Dict
+
+from hiro_graph_client.client import HiroGraph
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+SeriesKey = Tuple[str, Optional[str], Optional[str], Optional[bool]]
+""" Key of a cached timeseries: (node_id, with_ids, aggregate, include_deleted) """
+
+
+class CachedSeries:
+    """
+    The values of one timeseries for a set of fetched intervals.
+    """
+
+    intervals: List[List[int]]
+    """ Sorted, disjoint intervals [start, end) in ms since epoch whose values are complete """
+
+    timestamps: List[int]
+    """ Sorted timestamps of *self.items* """
+
+    items: List[dict]
+    """ The values within *self.intervals* ordered by timestamp. Only copies of them are handed out. """
+
+    def __init__(self, intervals: List[List[int]] = None, items: List[dict] = None):
+        """
+        Constructor
+
+        :param intervals: Optional intervals that are complete.
+        :param items: Optional values of *intervals* ordered by timestamp.
+        """
+        self.intervals = intervals or []
+        self.items = items or []
+        self.timestamps = [item['timestamp'] for item in self.items]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def missing(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        :param start: Start of the window (inclusive).
+        :param end: End of the window (exclusive).
+        :return: The sub-intervals of [start, end) that are not covered yet.
+        """
+        gaps = []
+        position = start
+        for interval_start, interval_end in self.intervals:
+            if interval_end <= position:
+                continue
+            if interval_start >= end:
+                break
+            if interval_start > position:
+                gaps.append((position, interval_start))
+            position = max(position, interval_end)
+            if position >= end:
+                break
+
+        if position < end:
+            gaps.append((position, end))
+
+        return gaps
+
+    def add(self, start: int, end: int, items: List[dict]) -> None:
+        """
+        Add the values of an interval that has not been covered before.
+
+        :param start: Start of the interval (inclusive).
+        :param end: End of the interval (exclusive).
+        :param items: All values of the interval ordered by timestamp. They are copied.
+        """
+        if end <= start:
+            return
+
+        items = [dict(item) for item in items if start <= item['timestamp'] < end]
+        position = bisect_left(self.timestamps, start)
+        self.items[position:position] = items
+        self.timestamps[position:position] = [item['timestamp'] for item in items]
+
+        intervals = sorted(self.intervals + [[start, end]])
+        merged = [intervals[0]]
+        for interval in intervals[1:]:
+            if interval[0] <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], interval[1])
+            else:
+                merged.append(interval)
+        self.intervals = merged
+
+    def select(self, start: int, end: int) -> List[dict]:
+        """
+        :param start: Start of the window (inclusive).
+        :param end: End of the window (exclusive).
+        :return: Copies of the cached values within [start, end), so callers cannot change the cache.
+        """
+        items = self.items[bisect_left(self.timestamps, start):bisect_left(self.timestamps, end)]
+        return [dict(item) for item in items]
+
+
+class TimeseriesCache:
+    """
+    Caches the values of timeseries per *node_id*, *with_ids*, *aggregate* and *include_deleted*.
+
+    :func:`get` fetches only those parts of the requested window that have not been fetched before, via
+    :func:`~hiro_graph_client.client.HiroGraph.get_timeseries_range`. Values younger than *freshness* seconds at the
+    time they were fetched can still change or arrive late, so this recent edge of a window is never cached and fetched
+    again on each call.
+
+    When more than *max_values* values are cached, the least recently used timeseries are evicted. With a
+    *spill_directory*, evicted timeseries are written to files there and loaded again on their next use. At most
+    *max_spilled* files are kept.
+
+    ::
+
+        cache = TimeseriesCache(hiro_client, freshness=60)
+
+        items = cache.get(ogit_id, ts_from=now - 3600000, ts_to=now)
+    """
+
+    client: HiroGraph
+    max_values: int
+    freshness: float
+    spill_directory: Optional[str]
+    max_spilled: int
+    limit: int
+    concurrency: int
+
+    _series: "OrderedDict[SeriesKey, CachedSeries]"
+    """ Cached timeseries in order of their last use """
+
+    _cached_values: int = 0
+    """ Amount of values over all timeseries in memory """
+
+    _stats: Dict[str, int]
+
+    _lock: threading.RLock
+    """ Guards *self._series*, the spill files and all counters """
+
+    def __init__(self,
+                 client: HiroGraph,
+                 max_values: int = 1000000,
+                 freshness: float = 60.0,
+                 spill_directory: str = None,
+                 max_spilled: int = 1000,
+                 limit: int = 10000,
+                 concurrency: int = 4):
+        """
+        Constructor
+
+        :param client: The client used to fetch the values.
+        :param max_values: Max values held in memory over all timeseries. Default is 1000000.
+        :param freshness: Seconds before the time of a fetch within which values are not cached. Default is 60.
+        :param spill_directory: Optional directory for timeseries evicted from memory. Default is to drop them.
+        :param max_spilled: Max amount of timeseries kept in *spill_directory*. Default is 1000.
+        :param limit: Max values per request. Default is 10000.
+        :param concurrency: Max parallel requests of each fetch. Default is 4.
+        """
+        self.client = client
+        self.max_values = max_values
+        self.freshness = freshness
+        self.spill_directory = spill_directory
+        self.max_spilled = max_spilled
+        self.limit = limit
+        self.concurrency = concurrency
+
+        self._series = OrderedDict()
+        self._stats = {
+            "requests": 0,
+            "values_returned": 0,
+            "values_fetched": 0,
+            "evictions": 0,
+            "spilled": 0
+        }
+        self._lock = threading.RLock()
+
+        if spill_directory:
+            os.makedirs(spill_directory, mode=0o700, exist_ok=True)
+
+    def get(self,
+            node_id: str,
+            ts_from: int,
+            ts_to: int = None,
+            with_ids: str = None,
+            aggregate: str = None,
+            include_deleted: bool = None) -> List[dict]:
+        """
+        Get all values of *[ts_from, ts_to)*, fetching only what is missing from the cache.
+
+        :param node_id: ogit/_id of the node containing timeseries
+        :param ts_from: Start of the window in ms since epoch (inclusive).
+        :param ts_to: End of the window in ms since epoch (exclusive). Default is now.
+        :param with_ids: list of ids to aggregate in result
+        :param aggregate: aggregate numeric values for multiple timeseries ids with same timestamp: avg|min|max|sum|none
+        :param include_deleted: allow to get if ogit/_is-deleted=true
+        :return: The values ordered by timestamp, like :func:`~hiro_graph_client.client.HiroGraph.get_timeseries`.
+        :raises ValueError: When a result contains an error.
+        """
+        fetched_at = time.time()
+        if ts_to is None:
+            ts_to = int(fetched_at * 1000)
+        horizon = int((fetched_at - self.freshness) * 1000)
+
+        key: SeriesKey = (node_id, with_ids, aggregate, include_deleted)
+
+        with self._lock:
+            gaps = self._get_series(key).missing(ts_from, ts_to)
+
+        fetched = []
+        for start, end in gaps:
+            items = self.client.get_timeseries_range(node_id,
+                                                     start,
+                                                     end,
+                                                     include_deleted=include_deleted,
+                                                     with_ids=with_ids,
+                                                     aggregate=aggregate,
+                                                     limit=self.limit,
+                                                     concurrency=self.concurrency)
+            fetched.append((start, end, items))
+
+        with self._lock:
+            series = self._get_series(key)
+
+            recent = []
+            for start, end, items in fetched:
+                self._stats['values_fetched'] += len(items)
+                for gap_start, gap_end in series.missing(start, min(end, horizon)):
+                    count = len(series)
+                    series.add(gap_start, gap_end, items)
+                    self._cached_values += len(series) - count
+                if end > horizon:
+                    recent.extend(item for item in items if item['timestamp'] >= max(start, horizon))
+
+            result = series.select(ts_from, min(ts_to, horizon))
+            if recent:
+                result.extend(sorted(recent, key=lambda item: item['timestamp']))
+
+            self._stats['requests'] += 1
+            self._stats['values_returned'] += len(result)
+            self._evict()
+
+        return result
+
+    def invalidate(self, node_id: str = None) -> None:
+        """
+        Remove cached values from memory and from the spill directory.
+
+        :param node_id: Only remove the values of this ogit/_id. Default is to remove everything.
+        """
+        with self._lock:
+            for key in [key for key in self._series if node_id is None or key[0] == node_id]:
+                self._cached_values -= len(self._series.pop(key))
+
+            for path in self._spill_files():
+                if node_id is None or self._read_spill(path, node_id):
+                    self._remove_file(path)
+
+    def stats(self) -> dict:
+        """
+        :return: Statistics: *requests*, *values_returned*, *values_fetched*, *evictions*, *spilled* and the currently
+                 *cached_values* and *cached_series* in memory.
+        """
+        with self._lock:
+            result = dict(self._stats)
+            result['cached_values'] = self._cached_values
+            result['cached_series'] = len(self._series)
+        return result
+
+    ###############################################################################################################
+    # Internal methods
+    ###############################################################################################################
+
+    def _get_series(self, key: SeriesKey) -> CachedSeries:
+        """
+        Get the cached timeseries of *key* and mark it as most recently used. Loads spilled timeseries. Must be called
+        with *self._lock* held.
+
+        :param key: The key of the timeseries.
+        :return: The cached timeseries. An empty one if nothing has been cached for *key*.
+        """
+        series = self._series.get(key)
+        if series is not None:
+            self._series.move_to_end(key)
+            return series
+
+        series = self._load_spilled(key) or CachedSeries()
+        self._series[key] = series
+        self._cached_values += len(series)
+        return series
+
+    def _evict(self) -> None:
+        """
+        Evict least recently used timeseries until at most *self.max_values* values are cached. Keeps the most
+        recently used one. Must be called with *self._lock* held.
+        """
+        while self._cached_values > self.max_values and len(self._series) > 1:
+            key, series = self._series.popitem(last=False)
+            self._cached_values -= len(series)
+            self._stats['evictions'] += 1
+            if self.spill_directory and series.intervals:
+                self._spill(key, series)
+
+    def _spill_path(self, key: SeriesKey) -> str:
+        digest = hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.spill_directory, digest + '.json')
+
+    def _spill_files(self) -> List[str]:
+        if not self.spill_directory:
+            return []
+        return [os.path.join(self.spill_directory, name) for name in os.listdir(self.spill_directory)
+                if name.endswith('.json')]
+
+    def _spill(self, key: SeriesKey, series: CachedSeries) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.spill_directory, prefix='.spill-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump({"key": key, "intervals": series.intervals, "items": series.items}, file)
+            os.replace(tmp_path, self._spill_path(key))
+            self._stats['spilled'] += 1
+        except (OSError, TypeError, ValueError) as err:
+            logger.warning("Cannot spill timeseries %s: %s", key[0], str(err))
+            self._remove_file(tmp_path)
+            return
+
+        files = self._spill_files()
+        if len(files) > self.max_spilled:
+            files.sort(key=lambda path: os.stat(path).st_mtime)
+            for path in files[:len(files) - self.max_spilled]:
+                self._remove_file(path)
+
+    def _load_spilled(self, key: SeriesKey) -> Optional[CachedSeries]:
+        if not self.spill_directory:
+            return None
+
+        path = self._spill_path(key)
+        data = self._read_spill(path)
+        if data is None:
+            return None
+
+        self._remove_file(path)
+        if tuple(data.get('key') or ()) != key:
+            return None
+
+        return CachedSeries(data.get('intervals'), data.get('items'))
+
+    @staticmethod
+    def _read_spill(path: str, node_id: str = None) -> Optional[dict]:
+        """
+        :param path: Path of a spill file.
+        :param node_id: Optional ogit/_id the file has to belong to.
+        :return: The content of the file or None if it does not exist, cannot be read or belongs to another node.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as err:
+            logger.warning("Cannot read %s: %s", path, str(err))
+            return None
+
+        if not isinstance(data, dict) or (node_id is not None and (data.get('key') or [None])[0] != node_id):
+            return None
+
+        return data
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as err:
+            logger.warning("Cannot remove %s: %s", path, str(err))
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Following timeseries like *tail -f*: New values of a set of timeseries are polled from their last seen timestamp.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Callable, Any, Iterator, Tuple, Iterable, Set
+
+from hiro_graph_client.client import HiroGraph
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+
+class FollowedSeries:
+    """
+    The polling state of one timeseries.
+    """
+
+    node_id: str
+    """ ogit/_id of the timeseries """
+
+    last_timestamp: int
+    """ The latest timestamp seen so far in ms since epoch. The next poll starts at this timestamp. """
+
+    boundary: Set[Tuple[str, Any]]
+    """ Values seen at *last_timestamp*, so they are not delivered again by the next poll """
+
+    interval: float
+    """ Current seconds between two polls """
+
+    next_poll: float
+    """ Monotonic time of the next poll """
+
+    def __init__(self, node_id: str, last_timestamp: int, interval: float):
+        """
+        Constructor
+
+        :param node_id: ogit/_id of the timeseries.
+        :param last_timestamp: Timestamp to start polling from in ms since epoch.
+        :param interval: Initial seconds between two polls.
+        """
+        self.node_id = node_id
+        self.last_timestamp = last_timestamp
+        self.boundary = set()
+        self.interval = interval
+        self.next_poll = time.monotonic()
+
+    @staticmethod
+    def _identity(item: dict) -> Tuple[str, Any]:
+        return repr(item.get('value')), item.get('id')
+
+    def accept(self, items: List[dict]) -> List[dict]:
+        """
+        Remove values that have already been seen and remember the new ones.
+
+        :param items: Values returned by a poll from *self.last_timestamp* in ascending order.
+        :return: The new values.
+        """
+        new_items = []
+        for item in items:
+            timestamp = item['timestamp']
+            if timestamp < self.last_timestamp:
+                continue
+            if timestamp == self.last_timestamp:
+                identity = self._identity(item)
+                if identity in self.boundary:
+                    continue
+                self.boundary.add(identity)
+            else:
+                self.last_timestamp = timestamp
+                self.boundary = {self._identity(item)}
+            new_items.append(item)
+
+        return new_items
+
+
+class TimeseriesFollower:
+    """
+    Polls a set of timeseries for new values via :func:`~hiro_graph_client.client.HiroGraph.get_timeseries`, starting
+    at the last timestamp seen of each timeseries. Values at this timestamp which have already been delivered are
+    dropped.
+
+    The poll interval adapts per timeseries: It is halved down to *min_interval* each time new values arrive and grows
+    by half up to *max_interval* each time there are none. A poll that returns *limit* values is repeated immediately.
+    If *limit* values share the last timestamp seen, the timeseries cannot advance. This is logged as a warning and
+    the timeseries is polled every *max_interval* seconds.
+    Due timeseries are polled concurrently.
+
+    Either iterate over the follower, which yields *(node_id, new values)* until :func:`stop` is called, or pass
+    *on_values* and call :func:`start` to poll in a background thread.
+
+    ::
+
+        follower = TimeseriesFollower(hiro_client, [ogit_id_1, ogit_id_2])
+
+        for node_id, items in follower:
+            print(node_id, items)
+    """
+
+    client: HiroGraph
+    min_interval: float
+    max_interval: float
+    limit: int
+    include_deleted: Optional[bool]
+    on_values: Optional[Callable[[str, List[dict]], Any]]
+
+    _series: Dict[str, FollowedSeries]
+
+    _lock: threading.Lock
+    """ Guards *self._series* and the submission of polls against :func:`stop` """
+
+    _stopped: threading.Event
+    _executor: ThreadPoolExecutor
+    _thread: Optional[threading.Thread] = None
+
+    def __init__(self,
+                 client: HiroGraph,
+                 node_ids: Iterable[str] = None,
+                 ts_from: int = None,
+                 min_interval: float = 1.0,
+                 max_interval: float = 30.0,
+                 limit: int = 10000,
+                 include_deleted: bool = None,
+                 concurrency: int = 8,
+                 on_values: Callable[[str, List[dict]], Any] = None):
+        """
+        Constructor
+
+        :param client: The client used for *get_timeseries*.
+        :param node_ids: ogit/_id of the timeseries to follow.
+        :param ts_from: Timestamp in ms since epoch from which on values are delivered. Default is now.
+        :param min_interval: Min seconds between two polls of a timeseries. Default is 1.0.
+        :param max_interval: Max seconds between two polls of a timeseries. Default is 30.0.
+        :param limit: Max values per request. Default is 10000.
+        :param include_deleted: allow to get if ogit/_is-deleted=true
+        :param concurrency: Max parallel requests. Should not exceed the *pool_maxsize* of the connection. Default is 8.
+        :param on_values: Optional callback *on_values(node_id, items)* for new values. Required for :func:`start`.
+        """
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("'min_interval' must be positive and 'max_interval' at least 'min_interval'.")
+
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.limit = limit
+        self.include_deleted = include_deleted
+        self.on_values = on_values
+
+        self._series = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="TimeseriesFollower")
+
+        for node_id in node_ids or []:
+            self.add(node_id, ts_from)
+
+    def __iter__(self) -> Iterator[Tuple[str, List[dict]]]:
+        return self.follow()
+
+    def add(self, node_id: str, ts_from: int = None) -> None:
+        """
+        Start following a timeseries. Does nothing if it is followed already.
+
+        :param node_id: ogit/_id of the timeseries.
+        :param ts_from: Timestamp in ms since epoch from which on values are delivered. Default is now.
+        """
+        with self._lock:
+            if node_id not in self._series:
+                self._series[node_id] = FollowedSeries(node_id,
+                                                       ts_from if ts_from is not None else int(time.time() * 1000),
+                                                       self.min_interval)
+
+    def remove(self, node_id: str) -> None:
+        """
+        Stop following a timeseries.
+
+        :param node_id: ogit/_id of the timeseries.
+        """
+        with self._lock:
+            self._series.pop(node_id, None)
+
+    def positions(self) -> Dict[str, int]:
+        """
+        :return: The last timestamp seen per ogit/_id. Pass them as *ts_from* to continue following later. Values at
+                 exactly these timestamps will be delivered again then.
+        """
+        with self._lock:
+            return {node_id: series.last_timestamp for node_id, series in self._series.items()}
+
+    def poll(self) -> List[Tuple[str, List[dict]]]:
+        """
+        Poll all timeseries that are due once.
+
+        :return: List of *(node_id, new values)* for all timeseries with new values. Empty after :func:`stop`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            # The executor is shut down by stop() under the same lock, so no poll is submitted after that.
+            if self._stopped.is_set():
+                return []
+            due = [series for series in self._series.values() if series.next_poll <= now]
+            futures = [self._executor.submit(self._poll_series, series) for series in due]
+
+        results = []
+        for series, future in zip(due, futures):
+            items = future.result()
+            if items:
+                results.append((series.node_id, items))
+        return results
+
+    def follow(self) -> Iterator[Tuple[str, List[dict]]]:
+        """
+        :return: Iterator over *(node_id, new values)* that polls until :func:`stop` is called.
+        """
+        while not self._stopped.is_set():
+            for result in self.poll():
+                yield result
+
+            with self._lock:
+                next_poll = min((series.next_poll for series in self._series.values()),
+                                default=time.monotonic() + self.max_interval)
+
+            self._stopped.wait(max(next_poll - time.monotonic(), 0.0))
+
+    def start(self) -> None:
+        """
+        Poll in a background thread and deliver new values to *on_values*.
+        """
+        if not self.on_values:
+            raise ValueError("'on_values' is required to follow in the background.")
+        if self._thread:
+            return
+
+        self._thread = threading.Thread(target=self._run, name="TimeseriesFollowerPolling", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        """
+        Stop polling. Ends :func:`follow` and the background thread.
+
+        :param timeout: Max seconds to wait for the background thread.
+        """
+        with self._lock:
+            self._stopped.set()
+            self._executor.shutdown(wait=False)
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    ###############################################################################################################
+    # Internal methods
+    ###############################################################################################################
+
+    def _run(self) -> None:
+        for node_id, items in self.follow():
+            try:
+                self.on_values(node_id, items)
+            except Exception as err:
+                logger.error("Error in on_values: %s", str(err))
+
+    def _poll_series(self, series: FollowedSeries) -> List[dict]:
+        try:
+            result = self.client.get_timeseries(series.node_id,
+                                                starttime=str(series.last_timestamp),
+                                                include_deleted=self.include_deleted,
+                                                limit=self.limit,
+                                                order="asc")
+            if isinstance(result, dict):
+                raise ValueError(self.client._get_error_message(result))
+        except Exception as err:
+            logger.warning("Cannot poll timeseries %s: %s", series.node_id, str(err))
+            with self._lock:
+                series.interval = self.max_interval
+                series.next_poll = time.monotonic() + series.interval
+            return []
+
+        with self._lock:
+            items = series.accept(result)
+            if len(result) >= self.limit and items:
+                series.next_poll = time.monotonic()
+                return items
+
+            if len(result) >= self.limit:
+                # Each poll starts at last_timestamp again and cannot get past the values already delivered there.
+                logger.warning("Timeseries %s is stuck: At least %d values share timestamp %d. Increase 'limit'.",
+                               series.node_id, self.limit, series.last_timestamp)
+                series.interval = self.max_interval
+                series.next_poll = time.monotonic() + series.interval
+                return []
+
+            if items:
+                series.interval = max(self.min_interval, series.interval / 2)
+            else:
+                series.interval = min(self.max_interval, series.interval * 1.5)
+            series.next_poll = time.monotonic() + series.interval
+
+        return items
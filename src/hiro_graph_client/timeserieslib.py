@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Timeseries values as NumPy arrays and concurrent fetching of long time ranges.
+
+Arrays require the optional package *numpy* (``pip install hiro_graph_client[numpy]``). It is imported on first use.
+
+Timestamps and values are copied from the decoded response into contiguous arrays by iterators that run in C
+(*operator.itemgetter* and *numpy.fromiter*) instead of a Python loop per value.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from operator import itemgetter
+from typing import Any, List, Dict, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+MASK = 'mask'
+""" Non-numeric values become NaN and are flagged in *TimeseriesArrays.mask* """
+
+OBJECT = 'object'
+""" Non-numeric values are kept as they are in an array of dtype object """
+
+
+def import_numpy():
+    """
+    :return: The module *numpy*.
+    :raises ImportError: When *numpy* is not installed.
+    """
+    try:
+        import numpy
+        return numpy
+    except ImportError as err:
+        raise ImportError("Timeseries arrays require the package 'numpy'. "
+                          "Install it via 'pip install hiro_graph_client[numpy]'.") from err
+
+
+class TimeseriesArrays:
+    """
+    Timestamps and values of a timeseries as NumPy arrays of equal length.
+    """
+
+    timestamps: Any
+    """ Timestamps in ms since epoch as *numpy.ndarray* of dtype int64 """
+
+    values: Any
+    """ The values as *numpy.ndarray* of dtype float64. Of dtype object when non-numeric values are kept. """
+
+    mask: Optional[Any] = None
+    """ *numpy.ndarray* of dtype bool that is True where a value is not numeric. None if all values are numeric. """
+
+    def __init__(self, timestamps, values, mask=None):
+        """
+        Constructor
+
+        :param timestamps: Timestamps as *numpy.ndarray* of dtype int64.
+        :param values: Values as *numpy.ndarray*.
+        :param mask: Optional *numpy.ndarray* of dtype bool flagging non-numeric values.
+        """
+        self.timestamps = timestamps
+        self.values = values
+        self.mask = mask
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __repr__(self) -> str:
+        return f"TimeseriesArrays({len(self)} values, dtype={self.values.dtype})"
+
+    def to_items(self) -> List[dict]:
+        """
+        :return: The values as list of *{"timestamp": ..., "value": ...}* like returned by the API.
+        """
+        values = self.values.tolist()
+        if self.mask is not None and self.values.dtype != object:
+            values = [None if masked else value for value, masked in zip(values, self.mask.tolist())]
+        return [{"timestamp": timestamp, "value": value} for timestamp, value in zip(self.timestamps.tolist(), values)]
+
+
+_get_timestamp = itemgetter('timestamp')
+_get_value = itemgetter('value')
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_arrays(items: List[dict], non_numeric: str = MASK) -> TimeseriesArrays:
+    """
+    Copy timeseries values into arrays.
+
+    :param items: Timeseries values like *{"timestamp": ..., "value": ...}*.
+    :param non_numeric: How to handle values that cannot be converted to float: *MASK* (default) or *OBJECT*.
+    :return: The arrays.
+    """
+    np = import_numpy()
+
+    if non_numeric not in [MASK, OBJECT]:
+        raise ValueError(f"Unknown value '{non_numeric}' for 'non_numeric'.")
+
+    count = len(items)
+    timestamps = np.fromiter(map(_get_timestamp, items), dtype=np.int64, count=count)
+    try:
+        raw_values = list(map(_get_value, items))
+    except KeyError:
+        raw_values = [item.get('value') for item in items]
+
+    try:
+        return TimeseriesArrays(timestamps, np.fromiter(map(float, raw_values), dtype=np.float64, count=count))
+    except (TypeError, ValueError):
+        pass
+
+    converted = [_to_float(value) for value in raw_values]
+    mask = np.fromiter((value is None for value in converted), dtype=bool, count=count)
+
+    if non_numeric == OBJECT:
+        return TimeseriesArrays(timestamps, np.array(raw_values, dtype=object), mask)
+
+    values = np.fromiter((np.nan if value is None else value for value in converted), dtype=np.float64, count=count)
+    return TimeseriesArrays(timestamps, values, mask)
+
+
+def split_by_id(items: List[dict], default_id: str = None, non_numeric: str = MASK) -> Dict[str, TimeseriesArrays]:
+    """
+    Copy timeseries values of several timeseries into arrays per timeseries.
+
+    :param items: Timeseries values like *{"timestamp": ..., "value": ..., "id": ...}*.
+    :param default_id: Id for values without id.
+    :param non_numeric: How to handle values that cannot be converted to float: *MASK* (default) or *OBJECT*.
+    :return: Dict of {id: arrays}
+    """
+    items_by_id: Dict[str, List[dict]] = {}
+    for item in items:
+        items_by_id.setdefault(item.get('id') or default_id, []).append(item)
+
+    return {series_id: to_arrays(series_items, non_numeric) for series_id, series_items in items_by_id.items()}
+
+
+def fetch_range(fetch: Callable[[int, int, int], List[dict]],
+                ts_from: int,
+                ts_to: int,
+                limit: int = 10000,
+                slices: int = None,
+                concurrency: int = 4) -> List[dict]:
+    """
+    Fetch all timeseries values of *[ts_from, ts_to)* in concurrent time slices.
+
+    The range is split into *slices* slices of equal duration. A slice whose request returns *limit* values has
+    possibly been truncated: Its values up to the last returned timestamp are kept and the rest of the slice is split
+    again, into as many slices as the density of the values received so far suggests.
+
+    :param fetch: Function *fetch(starttime, endtime, limit)* which returns the values of the timeseries from
+           *starttime* in ascending order.
+    :param ts_from: Start of the range in ms since epoch (inclusive).
+    :param ts_to: End of the range in ms since epoch (exclusive).
+    :param limit: Max values per request. Default is 10000.
+    :param slices: Initial amount of slices. Default is 2 * *concurrency*.
+    :param concurrency: Max parallel requests. Default is 4.
+    :return: All values of the range, ordered by timestamp.
+    :raises ValueError: When more than *limit* values share one timestamp.
+    """
+    if ts_to <= ts_from:
+        return []
+
+    slices = slices or 2 * concurrency
+    pieces: Dict[int, List[dict]] = {}
+
+    def _split(start: int, end: int, count: int) -> List[Tuple[int, int]]:
+        width = max(1, -(-(end - start) // max(count, 1)))
+        return [(slice_start, min(slice_start + width, end)) for slice_start in range(start, end, width)]
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="TimeseriesRange") as executor:
+        pending: Dict[Future, Tuple[int, int]] = {}
+
+        def _submit(_slices: List[Tuple[int, int]]) -> None:
+            for _start, _end in _slices:
+                pending[executor.submit(fetch, _start, _end, limit)] = (_start, _end)
+
+        _submit(_split(ts_from, ts_to, slices))
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, end = pending.pop(future)
+                    items = future.result()
+
+                    if len(items) < limit:
+                        pieces[start] = [item for item in items if start <= item['timestamp'] < end]
+                        continue
+
+                    last = items[-1]['timestamp']
+                    if last <= start:
+                        raise ValueError(f"More than {limit} values at timestamp {start}. Increase 'limit'.")
+
+                    pieces[start] = [item for item in items if start <= item['timestamp'] < min(last, end)]
+                    if last >= end:
+                        continue
+
+                    expected = len(pieces[start]) * (end - last) / (last - start)
+                    _submit(_split(last, end, min(int(expected * 2 / limit) + 1, 4 * concurrency)))
+        finally:
+            for future in pending:
+                future.cancel()
+
+    return [item for start in sorted(pieces) for item in pieces[start]]
@@ -0,0 +1,633 @@
+#!/usr/bin/env python3
+"""
+Store-and-forward for timeseries values: Values are appended to a durable local spool first and shipped to HIRO by a
+background thread, so they survive times in which HIRO cannot be reached as well as restarts of the process.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import List, Tuple, Dict, Optional, IO, Any, Set
+
+import requests
+
+from hiro_graph_client.client import HiroGraph
+from hiro_graph_client.clientlib import AuthenticationTokenError
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+RAISE = 'raise'
+""" Raise :class:`SpoolFullError` when the spool is full """
+
+DROP_OLDEST = 'drop_oldest'
+""" Drop the oldest segment when the spool is full """
+
+Position = Tuple[int, int]
+""" Position in the spool: (number of the segment, byte offset) """
+
+DEAD_LETTER_FILE = 'dead-letter.jsonl'
+""" File within the spool directory that receives values which HIRO rejected permanently """
+
+RETRYABLE_STATUS_CODES = frozenset([401, 408, 429])
+""" HTTP status codes below 500 after which shipping is retried """
+
+
+class SpoolFullError(Exception):
+    """
+    When a record does not fit into the spool because it reached *max_bytes*.
+    """
+    pass
+
+
+###################################################################################################################
+# Spool
+###################################################################################################################
+
+class TimeseriesSpool:
+    """
+    Append-only queue of timeseries values in segment files of a directory.
+
+    Each record holds values of one ogit/_id as a line of JSON. A new segment is started when the current one reaches
+    *segment_size* bytes. Records are read in the order they have been appended and removed by :func:`commit` after
+    they have been shipped. Segments that have been read completely are deleted. The read position is stored in the
+    file *cursor.json*, so a spool continues where it stopped when it is opened again. A record that has been cut off by
+    a crash is removed on open. Values that cannot be shipped at all are moved to the file *DEAD_LETTER_FILE* via
+    :func:`dead_letter`.
+
+    A directory must only be used by one spool at a time.
+    """
+
+    directory: str
+    segment_size: int
+    max_bytes: int
+    overflow: str
+    fsync: bool
+
+    _sizes: Dict[int, int]
+    """ Size in bytes per segment number """
+
+    _cursor: Position
+    """ Position of the first record that has not been committed """
+
+    _write_file: Optional[IO] = None
+    _write_segment: int = 0
+
+    _pending_records: int = 0
+    _stats: Dict[str, int]
+
+    _condition: threading.Condition
+    """ Guards the segments and the cursor. Notified when records are appended or committed. """
+
+    def __init__(self,
+                 directory: str,
+                 segment_size: int = 16 * 1024 * 1024,
+                 max_bytes: int = 1024 * 1024 * 1024,
+                 overflow: str = RAISE,
+                 fsync: bool = False):
+        """
+        Constructor
+
+        :param directory: Directory of the segment files. Will be created if it does not exist.
+        :param segment_size: Bytes after which a new segment file is started. Default is 16 MiB.
+        :param max_bytes: Max bytes of all records that have not been committed. Default is 1 GiB.
+        :param overflow: What happens when a record does not fit anymore: *RAISE* (default) raises
+               :class:`SpoolFullError`, *DROP_OLDEST* drops the oldest segment that is not written to.
+        :param fsync: Call *os.fsync()* after each record, so records also survive a crash of the host. Default is
+               False: Records survive a crash of the process only.
+        """
+        if overflow not in [RAISE, DROP_OLDEST]:
+            raise ValueError(f"Unknown value '{overflow}' for 'overflow'.")
+
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.overflow = overflow
+        self.fsync = fsync
+
+        self._stats = {
+            "appended_records": 0,
+            "committed_records": 0,
+            "dropped_records": 0,
+            "dead_letter_records": 0
+        }
+        self._condition = threading.Condition()
+
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._open()
+
+    def append(self, node_id: str, items: List[dict]) -> None:
+        """
+        Append values of one timeseries.
+
+        :param node_id: ogit/_id of the timeseries.
+        :param items: Values like *[{"timestamp": ..., "value": ...}, ...]*.
+        :raises SpoolFullError: When the spool is full and *overflow* is *RAISE*.
+        """
+        if not items:
+            return
+
+        line = json.dumps({"id": node_id, "items": items}, separators=(',', ':')).encode('utf-8') + b'\n'
+
+        with self._condition:
+            if self._write_file is None:
+                raise RuntimeError("TimeseriesSpool has been closed.")
+
+            while self._pending_bytes() + len(line) > self.max_bytes:
+                if self.overflow != DROP_OLDEST or self._cursor[0] == self._write_segment:
+                    raise SpoolFullError(f"Spool {self.directory} is full ({self.max_bytes} bytes).")
+                self._drop_oldest()
+
+            if self._sizes[self._write_segment] and self._sizes[self._write_segment] + len(line) > self.segment_size:
+                self._start_segment(self._write_segment + 1)
+
+            self._write_file.write(line)
+            self._write_file.flush()
+            if self.fsync:
+                os.fsync(self._write_file.fileno())
+
+            self._sizes[self._write_segment] += len(line)
+            self._pending_records += 1
+            self._stats['appended_records'] += 1
+            self._condition.notify_all()
+
+    def read(self, max_records: int = 1000) -> Tuple[List[Tuple[str, List[dict]]], Position]:
+        """
+        Read the oldest records that have not been committed. Reads from one segment at a time.
+
+        :param max_records: Max records to read.
+        :return: List of *(node_id, items)* and the position after the last record, which has to be passed to
+                 :func:`commit`.
+        """
+        with self._condition:
+            segment, offset = self._cursor
+            if offset >= self._sizes.get(segment, 0) and segment < self._write_segment:
+                segment, offset = segment + 1, 0
+                self._cursor = (segment, offset)
+
+            records = []
+            with open(self._segment_path(segment), 'rb') as file:
+                file.seek(offset)
+                while len(records) < max_records and offset < self._sizes[segment]:
+                    line = file.readline()
+                    offset += len(line)
+                    try:
+                        record = json.loads(line)
+                        records.append((record['id'], record['items']))
+                    except (ValueError, KeyError, TypeError) as err:
+                        logger.error("Skipping corrupt record in %s: %s", self._segment_path(segment), str(err))
+                        records.append((None, []))
+
+        return [record for record in records if record[0] is not None], (segment, offset)
+
+    def commit(self, position: Position) -> None:
+        """
+        Remove all records before *position* after they have been shipped.
+
+        :param position: Position returned by :func:`read`.
+        """
+        with self._condition:
+            if position <= self._cursor or position[0] != self._cursor[0]:
+                # The records have been dropped in the meantime.
+                return
+
+            count = self._count_records(position[0], self._cursor[1], position[1])
+            self._cursor = position
+            self._pending_records -= count
+            self._stats['committed_records'] += count
+
+            for segment in [segment for segment in self._sizes if segment < position[0]]:
+                self._delete_segment(segment)
+
+            self._save_cursor()
+            self._condition.notify_all()
+
+    def dead_letter(self, node_id: str, items: List[dict], error: str) -> None:
+        """
+        Keep values that have been rejected permanently in *DEAD_LETTER_FILE* of the spool directory for inspection.
+        The records they came from still have to be committed.
+
+        :param node_id: ogit/_id of the timeseries.
+        :param items: The rejected values.
+        :param error: The reason of the rejection.
+        """
+        line = json.dumps({"id": node_id, "items": items, "error": error}, separators=(',', ':')).encode('utf-8')
+
+        with self._condition:
+            with open(os.path.join(self.directory, DEAD_LETTER_FILE), 'ab') as file:
+                file.write(line + b'\n')
+                if self.fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+            self._stats['dead_letter_records'] += 1
+
+    def wait(self, empty: bool, timeout: float = None) -> bool:
+        """
+        Wait until the spool has records or until it is empty. Returns early when the spool gets closed.
+
+        :param empty: Wait until all records have been committed instead of until there are records.
+        :param timeout: Max seconds to wait. Default is None: Wait indefinitely.
+        :return: True if the condition has been met.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._write_file is None or (self._pending_records == 0) == empty,
+                                     timeout=timeout)
+            return (self._pending_records == 0) == empty
+
+    def stats(self) -> dict:
+        """
+        :return: The depth of the spool as *pending_records*, *pending_bytes* and *segments* and the counters
+                 *appended_records*, *committed_records*, *dropped_records* and *dead_letter_records* since the spool
+                 has been opened.
+        """
+        with self._condition:
+            result = dict(self._stats)
+            result['pending_records'] = self._pending_records
+            result['pending_bytes'] = self._pending_bytes()
+            result['segments'] = len(self._sizes)
+        return result
+
+    def close(self) -> None:
+        with self._condition:
+            if self._write_file is not None:
+                self._write_file.close()
+                self._write_file = None
+            self._condition.notify_all()
+
+    ###############################################################################################################
+    # Internal methods
+    ###############################################################################################################
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:020d}.seg")
+
+    def _cursor_path(self) -> str:
+        return os.path.join(self.directory, 'cursor.json')
+
+    def _open(self) -> None:
+        """
+        Load the segments and the cursor, remove a record that has been cut off and count the pending records.
+        """
+        self._sizes = {}
+        for name in os.listdir(self.directory):
+            if name.endswith('.seg') and name[:-4].isdigit():
+                segment = int(name[:-4])
+                self._sizes[segment] = os.path.getsize(self._segment_path(segment))
+
+        try:
+            with open(self._cursor_path(), 'r', encoding='utf-8') as file:
+                cursor = json.load(file)
+                self._cursor = (int(cursor['segment']), int(cursor['offset']))
+        except FileNotFoundError:
+            self._cursor = (min(self._sizes, default=1), 0)
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            logger.warning("Cannot read %s: %s. Reading all segments.", self._cursor_path(), str(err))
+            self._cursor = (min(self._sizes, default=1), 0)
+
+        for segment in [segment for segment in self._sizes if segment < self._cursor[0]]:
+            self._delete_segment(segment)
+
+        if self._cursor[0] not in self._sizes:
+            self._cursor = (min(self._sizes, default=self._cursor[0]), 0)
+
+        if self._sizes:
+            self._repair(max(self._sizes))
+            self._cursor = (self._cursor[0], min(self._cursor[1], self._sizes[self._cursor[0]]))
+
+        self._pending_records = 0
+        for segment in sorted(self._sizes):
+            self._pending_records += self._count_records(segment, self._cursor[1] if segment == self._cursor[0] else 0)
+
+        self._start_segment(max(self._sizes, default=self._cursor[0]))
+
+    def _repair(self, segment: int) -> None:
+        """
+        Truncate *segment* after its last complete record.
+        """
+        path = self._segment_path(segment)
+        with open(path, 'r+b') as file:
+            size = self._sizes[segment]
+            end = size
+            while end > 0:
+                file.seek(max(end - 4096, 0))
+                chunk = file.read(end - max(end - 4096, 0))
+                newline = chunk.rfind(b'\n')
+                if newline >= 0:
+                    end = max(end - 4096, 0) + newline + 1
+                    break
+                end = max(end - 4096, 0)
+
+            if end < size:
+                logger.warning("Removing %d bytes of an incomplete record from %s.", size - end, path)
+                file.truncate(end)
+                self._sizes[segment] = end
+
+    def _start_segment(self, segment: int) -> None:
+        if self._write_file is not None:
+            self._write_file.close()
+
+        self._write_file = open(self._segment_path(segment), 'ab')
+        self._write_segment = segment
+        self._sizes.setdefault(segment, self._write_file.tell())
+
+    def _delete_segment(self, segment: int) -> None:
+        self._sizes.pop(segment, None)
+        try:
+            os.unlink(self._segment_path(segment))
+        except FileNotFoundError:
+            pass
+
+    def _count_records(self, segment: int, start: int, end: int = None) -> int:
+        """
+        :return: Amount of records in *segment* between the byte offsets *start* and *end* (default: end of file).
+        """
+        count = 0
+        with open(self._segment_path(segment), 'rb') as file:
+            file.seek(start)
+            remaining = (end if end is not None else self._sizes[segment]) - start
+            while remaining > 0:
+                chunk = file.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                count += chunk.count(b'\n')
+                remaining -= len(chunk)
+        return count
+
+    def _pending_bytes(self) -> int:
+        return sum(size for segment, size in self._sizes.items() if segment >= self._cursor[0]) - self._cursor[1]
+
+    def _drop_oldest(self) -> None:
+        """
+        Drop the records of the segment of the cursor. Must be called with *self._condition* held.
+        """
+        segment, offset = self._cursor
+        dropped = self._count_records(segment, offset)
+
+        logger.warning("Spool %s is full. Dropping %d records.", self.directory, dropped)
+
+        self._delete_segment(segment)
+        self._cursor = (segment + 1, 0)
+        self._pending_records -= dropped
+        self._stats['dropped_records'] += dropped
+        self._save_cursor()
+
+    def _save_cursor(self) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.cursor-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump({"segment": self._cursor[0], "offset": self._cursor[1]}, file)
+            os.replace(tmp_path, self._cursor_path())
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+###################################################################################################################
+# Shipper
+###################################################################################################################
+
+def _is_retryable_status(status_code: Optional[int]) -> bool:
+    return status_code is None or status_code >= 500 or status_code in RETRYABLE_STATUS_CODES
+
+
+def _is_retryable(err: Exception) -> bool:
+    """
+    :param err: Exception of a shipped batch.
+    :return: Whether shipping the batch again later may succeed: Connection errors, timeouts, token errors and HTTP
+             status codes of *RETRYABLE_STATUS_CODES* or 5xx. Other errors reject the values permanently.
+    """
+    if isinstance(err, requests.exceptions.HTTPError):
+        return _is_retryable_status(err.response.status_code if err.response is not None else None)
+    return isinstance(err, (requests.exceptions.ConnectionError,
+                            requests.exceptions.Timeout,
+                            AuthenticationTokenError,
+                            OSError))
+
+
+class BatchRejectedError(Exception):
+    """
+    When HIRO answers a batch with an error.
+    """
+
+    status_code: Optional[int]
+    """ The status code of the error or None if it is unknown """
+
+    def __init__(self, message: str, status_code: Optional[int]):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TimeseriesShipper:
+    """
+    Writes timeseries values into a :class:`TimeseriesSpool` and ships them in a background thread via
+    :func:`~hiro_graph_client.client.HiroGraph.post_timeseries`.
+
+    Records are shipped in the order of the spool. Values of the same ogit/_id are combined into batches of up to
+    *batch_size* values. When a batch fails with a retryable error (connection errors, timeouts, 5xx, 429, ...),
+    shipping pauses and continues with this batch after a backoff that doubles up to *max_backoff* seconds. Batches
+    that have been shipped already are not sent again. Batches that HIRO rejects permanently (other 4xx, invalid
+    values) are moved to the dead letters of the spool (see :func:`TimeseriesSpool.dead_letter`) and skipped.
+    Records are removed from the spool only after all their batches have been handled, so values can be sent more
+    than once after a restart.
+
+    ::
+
+        with TimeseriesShipper(hiro_client, TimeseriesSpool('/var/spool/hiro')) as shipper:
+            shipper.write(ogit_id, timestamp, value)
+    """
+
+    client: HiroGraph
+    spool: TimeseriesSpool
+    batch_size: int
+    max_records: int
+    max_backoff: float
+    synchronous: bool
+    ttl: Optional[int]
+
+    _stats: Dict[str, Any]
+    _stats_lock: threading.Lock
+    _stopped: threading.Event
+    _thread: threading.Thread
+
+    def __init__(self,
+                 client: HiroGraph,
+                 spool: TimeseriesSpool,
+                 batch_size: int = 1000,
+                 max_records: int = 1000,
+                 max_backoff: float = 60.0,
+                 synchronous: bool = True,
+                 ttl: int = None):
+        """
+        Constructor
+
+        :param client: The client used for *post_timeseries*.
+        :param spool: The spool. Records already in it are shipped first.
+        :param batch_size: Max values per request. Default is 1000.
+        :param max_records: Max records read from the spool at a time. Default is 1000.
+        :param max_backoff: Max seconds to wait before shipping again after a failure. Default is 60.
+        :param synchronous: Parameter *synchronous* of *post_timeseries*. Default is True.
+        :param ttl: Optional parameter *ttl* of *post_timeseries*.
+        """
+        self.client = client
+        self.spool = spool
+        self.batch_size = batch_size
+        self.max_records = max_records
+        self.max_backoff = max_backoff
+        self.synchronous = synchronous
+        self.ttl = ttl
+
+        self._stats = {
+            "shipped_values": 0,
+            "dead_letter_values": 0,
+            "failures": 0,
+            "last_error": None
+        }
+        self._stats_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._ship_loop, name="TimeseriesShipper", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def write(self, node_id: str, timestamp: int, value: Any) -> None:
+        """
+        Append a single value to the spool.
+
+        :param node_id: ogit/_id of the timeseries.
+        :param timestamp: Timestamp in ms since epoch.
+        :param value: The value.
+        :raises SpoolFullError: When the spool is full.
+        """
+        self.spool.append(node_id, [{"timestamp": timestamp, "value": value}])
+
+    def write_items(self, node_id: str, items: List[dict]) -> None:
+        """
+        Append several values of one timeseries to the spool.
+
+        :param node_id: ogit/_id of the timeseries.
+        :param items: Values like *[{"timestamp": ..., "value": ...}, ...]*.
+        :raises SpoolFullError: When the spool is full.
+        """
+        self.spool.append(node_id, items)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until all records of the spool have been shipped.
+
+        :param timeout: Max seconds to wait. Default is None: Wait indefinitely.
+        :return: True if the spool is empty.
+        """
+        return self.spool.wait(empty=True, timeout=timeout)
+
+    def close(self, timeout: float = 0) -> bool:
+        """
+        Stop shipping and close the spool. Records that have not been shipped stay in the spool.
+
+        :param timeout: Seconds to wait for the spool to become empty first. Default is 0.
+        :return: True if the spool is empty.
+        """
+        result = self.flush(timeout)
+        self._stopped.set()
+        self.spool.close()
+        self._thread.join()
+        return result
+
+    def stats(self) -> dict:
+        """
+        :return: *shipped_values*, *dead_letter_values*, *failures* and *last_error* of this shipper plus
+                 :func:`TimeseriesSpool.stats`.
+        """
+        with self._stats_lock:
+            result = dict(self._stats)
+        result.update(self.spool.stats())
+        return result
+
+    ###############################################################################################################
+    # Internal methods
+    ###############################################################################################################
+
+    def _batches(self, records: List[Tuple[str, List[dict]]]) -> List[Tuple[str, List[dict]]]:
+        """
+        :param records: Records in the order of the spool.
+        :return: Batches of up to *self.batch_size* values per ogit/_id in the order of their first record.
+        """
+        items_by_id: Dict[str, List[dict]] = {}
+        for node_id, items in records:
+            items_by_id.setdefault(node_id, []).extend(items)
+
+        return [(node_id, items[start:start + self.batch_size])
+                for node_id, items in items_by_id.items()
+                for start in range(0, len(items), self.batch_size)]
+
+    def _ship_batch(self, node_id: str, items: List[dict]) -> None:
+        """
+        :raises Exception: When the batch has not been accepted.
+        """
+        result = self.client.post_timeseries(node_id, items, synchronous=self.synchronous, ttl=self.ttl)
+        if isinstance(result, dict) and 'error' in result:
+            error = result.get('error')
+            raise BatchRejectedError(self.client._get_error_message(result),
+                                     error.get('code') if isinstance(error, dict) else None)
+
+    def _ship_loop(self) -> None:
+        backoff = 0.0
+
+        # Batches of the last read that have been handled already, so a retry of this read continues after them.
+        handled_position: Optional[Position] = None
+        handled: Set[int] = set()
+
+        while not self._stopped.is_set():
+            if backoff:
+                self._stopped.wait(backoff)
+                if self._stopped.is_set():
+                    return
+
+            if not self.spool.wait(empty=False, timeout=1.0):
+                continue
+            if self._stopped.is_set():
+                return
+
+            records, position = self.spool.read(self.max_records)
+            if position != handled_position:
+                handled_position = position
+                handled = set()
+
+            try:
+                for index, (node_id, items) in enumerate(self._batches(records)):
+                    if index in handled:
+                        continue
+
+                    try:
+                        self._ship_batch(node_id, items)
+                    except Exception as err:
+                        retryable = _is_retryable_status(err.status_code) \
+                            if isinstance(err, BatchRejectedError) else _is_retryable(err)
+                        if retryable:
+                            raise
+
+                        logger.error("HIRO rejected %d values of timeseries %s: %s. Moving them to the dead letters.",
+                                     len(items), node_id, str(err))
+                        self.spool.dead_letter(node_id, items, str(err))
+                        with self._stats_lock:
+                            self._stats['dead_letter_values'] += len(items)
+                            self._stats['last_error'] = str(err)
+                    else:
+                        with self._stats_lock:
+                            self._stats['shipped_values'] += len(items)
+
+                    handled.add(index)
+            except Exception as err:
+                backoff = min(max(backoff * 2, 1.0), self.max_backoff)
+                logger.warning("Cannot ship timeseries values: %s. Retrying in %.1fs.", str(err), backoff)
+                with self._stats_lock:
+                    self._stats['failures'] += 1
+                    self._stats['last_error'] = str(err)
+                continue
+
+            backoff = 0.0
+            self.spool.commit(position)
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Buffered writing of timeseries values via :func:`~hiro_graph_client.client.HiroGraph.post_timeseries`.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Dict, List, Optional, Callable, Any, Set, Tuple
+
+from hiro_graph_client.client import HiroGraph
+
+logger = logging.getLogger(__name__)
+""" The logger for this module """
+
+
+class FlushResult:
+    """
+    The outcome of sending one batch of values of a timeseries.
+    """
+
+    node_id: str
+    """ ogit/_id of the timeseries """
+
+    count: int
+    """ Amount of values in the batch """
+
+    latency: float
+    """ Duration of the request in seconds """
+
+    error: Optional[Exception]
+    """ The error if the batch could not be written, None otherwise """
+
+    def __init__(self, node_id: str, count: int, latency: float, error: Optional[Exception] = None):
+        """
+        Constructor
+
+        :param node_id: ogit/_id of the timeseries.
+        :param count: Amount of values in the batch.
+        :param latency: Duration of the request in seconds.
+        :param error: Optional error.
+        """
+        self.node_id = node_id
+        self.count = count
+        self.latency = latency
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class TimeseriesWriter:
+    """
+    Buffers timeseries values per ogit/_id and writes them in batches.
+
+    A buffer is sent when it holds *batch_size* values, when its oldest value is older than *max_age* seconds or when
+    :func:`flush` is called. Up to *concurrency* batches are sent in parallel, sharing the connection pool of the
+    *HiroGraph* client (see *pool_maxsize* of the TokenApiHandler). When more than *max_buffered* values are buffered or
+    in flight, :func:`write` sends the oldest buffers until there is enough room, even if they are not due yet, and
+    blocks until they have been sent.
+
+    Failed batches are not repeated beyond the retries of the client. They are logged and reported via *on_flush* and
+    :func:`stats`.
+
+    Use it as context manager or call :func:`close` to send all remaining values.
+
+    ::
+
+        with TimeseriesWriter(hiro_client) as writer:
+            writer.write(ogit_id, timestamp, value)
+    """
+
+    client: HiroGraph
+    batch_size: int
+    max_age: float
+    max_buffered: int
+    synchronous: bool
+    ttl: Optional[int]
+    on_flush: Optional[Callable[[FlushResult], Any]]
+
+    _buffers: Dict[str, List[dict]]
+    """ Buffered values per ogit/_id """
+
+    _buffer_times: Dict[str, float]
+    """ Monotonic time of the oldest buffered value per ogit/_id """
+
+    _buffered: int = 0
+    """ Amount of values that are buffered or in flight """
+
+    _in_flight: Set[Future]
+
+    _stats: Dict[str, float]
+
+    _condition: threading.Condition
+    """ Guards all buffers and counters """
+
+    _executor: ThreadPoolExecutor
+    _flusher: threading.Thread
+    _closed: bool = False
+
+    def __init__(self,
+                 client: HiroGraph,
+                 batch_size: int = 1000,
+                 max_age: float = 1.0,
+                 max_buffered: int = 100000,
+                 concurrency: int = 4,
+                 synchronous: bool = True,
+                 ttl: int = None,
+                 on_flush: Callable[[FlushResult], Any] = None):
+        """
+        Constructor
+
+        :param client: The client used for *post_timeseries*.
+        :param batch_size: Max values per request. A buffer is sent as soon as it reaches this size. Default is 1000.
+        :param max_age: Seconds after which a buffered value gets sent at the latest. Default is 1.0.
+        :param max_buffered: Max values buffered or in flight over all timeseries before *write()* blocks. Default is
+               100000.
+        :param concurrency: Max parallel requests. Should not exceed the *pool_maxsize* of the connection. Default is 4.
+        :param synchronous: Parameter *synchronous* of *post_timeseries*. Default is True.
+        :param ttl: Optional parameter *ttl* of *post_timeseries*.
+        :param on_flush: Optional callback that receives a :class:`FlushResult` for each batch. Called from the
+               threads that send the batches.
+        """
+        if batch_size < 1 or max_buffered < batch_size:
+            raise ValueError("'batch_size' must be at least 1 and 'max_buffered' at least 'batch_size'.")
+
+        self.client = client
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.max_buffered = max_buffered
+        self.synchronous = synchronous
+        self.ttl = ttl
+        self.on_flush = on_flush
+
+        self._buffers = {}
+        self._buffer_times = {}
+        self._in_flight = set()
+        self._stats = {
+            "flushes": 0,
+            "failures": 0,
+            "values_written": 0,
+            "values_failed": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0
+        }
+
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="TimeseriesWriter")
+        self._flusher = threading.Thread(target=self._flush_loop, name="TimeseriesWriterFlusher", daemon=True)
+        self._flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def write(self, node_id: str, timestamp: int, value: Any, timeout: float = None) -> None:
+        """
+        Buffer a single value.
+
+        :param node_id: ogit/_id of the timeseries.
+        :param timestamp: Timestamp in ms since epoch.
+        :param value: The value.
+        :param timeout: Max seconds to block when the buffers are full. Default is None: Wait indefinitely.
+        :raises TimeoutError: When the buffers stayed full for *timeout* seconds.
+        """
+        self.write_items(node_id, [{"timestamp": timestamp, "value": value}], timeout)
+
+    def write_items(self, node_id: str, items: List[dict], timeout: float = None) -> None:
+        """
+        Buffer several values of one timeseries.
+
+        :param node_id: ogit/_id of the timeseries.
+        :param items: Values like *[{"timestamp": ..., "value": ...}, ...]*.
+        :param timeout: Max seconds to block when the buffers are full. Default is None: Wait indefinitely.
+        :raises TimeoutError: When the buffers stayed full for *timeout* seconds.
+        """
+        if not items:
+            return
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("TimeseriesWriter has been closed.")
+
+            if self._buffered + len(items) > self.max_buffered:
+                self._submit(self._take_oldest_batches(self._buffered + len(items) - self.max_buffered))
+
+            if not self._condition.wait_for(
+                    lambda: self._buffered + len(items) <= self.max_buffered or self._buffered == 0 or self._closed,
+                    timeout=timeout):
+                raise TimeoutError(f"Buffers stayed full for {timeout}s.")
+
+            if self._closed:
+                raise RuntimeError("TimeseriesWriter has been closed.")
+
+            buffer = self._buffers.get(node_id)
+            if buffer is None:
+                buffer = self._buffers[node_id] = []
+                self._buffer_times[node_id] = time.monotonic()
+
+            buffer.extend(items)
+            self._buffered += len(items)
+
+            if len(buffer) >= self.batch_size:
+                self._condition.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Send all buffered values and wait until they and all batches in flight have been sent.
+
+        :param timeout: Max seconds to wait. Default is None: Wait indefinitely.
+        :return: True if everything has been sent within *timeout*.
+        """
+        with self._condition:
+            futures = self._submit(self._take_batches(force=True))
+            futures.extend(self._in_flight)
+
+        done, not_done = wait(futures, timeout=timeout)
+        return not not_done
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        Send all remaining values and stop the threads of this writer.
+
+        :param timeout: Max seconds to wait for the remaining values. Default is None: Wait indefinitely.
+        :return: True if everything has been sent within *timeout*.
+        """
+        with self._condition:
+            if self._closed:
+                return True
+            self._closed = True
+            self._condition.notify_all()
+
+        result = self.flush(timeout)
+        self._flusher.join()
+        self._executor.shutdown(wait=result)
+        return result
+
+    def stats(self) -> dict:
+        """
+        :return: Statistics of all batches sent so far: *flushes*, *failures*, *values_written*, *values_failed*,
+                 *avg_latency*, *max_latency* (seconds) and the currently *buffered* values.
+        """
+        with self._condition:
+            result = dict(self._stats)
+            result['buffered'] = self._buffered
+
+        total_latency = result.pop('total_latency')
+        result['avg_latency'] = total_latency / result['flushes'] if result['flushes'] else 0.0
+        return result
+
+    ###############################################################################################################
+    # Internal methods
+    ###############################################################################################################
+
+    def _take_batches(self, force: bool) -> List[Tuple[str, List[dict]]]:
+        """
+        Remove the buffers that are due from *self._buffers*. Must be called with *self._condition* held.
+
+        :param force: Take all buffers regardless of their size and age.
+        :return: List of (node_id, items) with at most *self.batch_size* items each.
+        """
+        deadline = time.monotonic() - self.max_age
+
+        due = [node_id for node_id, buffer in self._buffers.items()
+               if force or len(buffer) >= self.batch_size or self._buffer_times[node_id] <= deadline]
+
+        return self._pop_batches(due)
+
+    def _take_oldest_batches(self, count: int) -> List[Tuple[str, List[dict]]]:
+        """
+        Remove the oldest buffers from *self._buffers* until they hold at least *count* values or no buffer is left.
+        Must be called with *self._condition* held.
+
+        :param count: Amount of values to take.
+        :return: List of (node_id, items) with at most *self.batch_size* items each.
+        """
+        due = []
+        for node_id in sorted(self._buffer_times, key=self._buffer_times.get):
+            if count <= 0:
+                break
+            due.append(node_id)
+            count -= len(self._buffers[node_id])
+
+        return self._pop_batches(due)
+
+    def _pop_batches(self, due: List[str]) -> List[Tuple[str, List[dict]]]:
+        batches = []
+        for node_id in due:
+            buffer = self._buffers.pop(node_id)
+            del self._buffer_times[node_id]
+            for start in range(0, len(buffer), self.batch_size):
+                batches.append((node_id, buffer[start:start + self.batch_size]))
+
+        return batches
+
+    def _submit(self, batches: List[Tuple[str, List[dict]]]) -> List[Future]:
+        futures = []
+        for node_id, items in batches:
+            future = self._executor.submit(self._send, node_id, items)
+            self._in_flight.add(future)
+            future.add_done_callback(self._discard_future)
+            futures.append(future)
+        return futures
+
+    def _discard_future(self, future: Future) -> None:
+        with self._condition:
+            self._in_flight.discard(future)
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._condition:
+                batches = self._take_batches(force=False)
+                if batches:
+                    self._submit(batches)
+                    continue
+
+                if self._closed:
+                    return
+
+                timeout = self.max_age
+                if self._buffer_times:
+                    timeout = max(min(self._buffer_times.values()) + self.max_age - time.monotonic(), 0.001)
+
+                self._condition.wait(timeout=timeout)
+
+    def _send(self, node_id: str, items: List[dict]) -> FlushResult:
+        error = None
+        start = time.perf_counter()
+        try:
+            result = self.client.post_timeseries(node_id, items, synchronous=self.synchronous, ttl=self.ttl)
+            if isinstance(result, dict) and 'error' in result:
+                raise ValueError(self.client._get_error_message(result))
+        except Exception as err:
+            error = err
+            logger.warning("Cannot write %d values of timeseries %s: %s", len(items), node_id, str(err))
+
+        flush_result = FlushResult(node_id, len(items), time.perf_counter() - start, error)
+
+        with self._condition:
+            self._buffered -= len(items)
+            self._stats['flushes'] += 1
+            self._stats['total_latency'] += flush_result.latency
+            self._stats['max_latency'] = max(self._stats['max_latency'], flush_result.latency)
+            if error:
+                self._stats['failures'] += 1
+                self._stats['values_failed'] += len(items)
+            else:
+                self._stats['values_written'] += len(items)
+            self._condition.notify_all()
+
+        if self.on_flush:
+            try:
+                self.on_flush(flush_result)
+            except Exception as err:
+                logger.error("Error in on_flush: %s", str(err))
+
+        return flush_result
@@ -13,6 +13,7 @@ from websocket import WebSocketApp, ABNF, WebSocketException, setdefaulttimeout,
     STATUS_NORMAL, STATUS_UNEXPECTED_CONDITION
 
 from hiro_graph_client.clientlib import AbstractTokenApiHandler
+from hiro_graph_client.profiling import profiled
 
 logger = logging.getLogger(__name__)
 """ The logger for this module """
@@ -214,7 +215,8 @@ class AbstractAuthenticatedWebSocketHandler:
                     else:
                         logger.info("Received message of length %d", len(message))
 
-            self.on_message(ws, message)
+            with profiled('on_message', self):
+                self.on_message(ws, message)
 
             with self._reader_guard:
                 # If we get here, the token is valid
@@ -35,6 +35,8 @@ setup(
     ],
     extras_require={
         'doc': ['sphinx', 'sphinx-rtd-theme'],
+        'arrow': ['pyarrow'],
+        'numpy': ['numpy'],
     },
     package_data={
         name: ['VERSION']
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import hiro_graph_client
+
+IMPORT_BUDGET = 0.05
+""" Seconds the import of the package may take at most """
+
+BUDGET_ENV_VAR = 'HIRO_BENCHMARK_BUDGET'
+""" Environment variable which enables the check of *IMPORT_BUDGET*. Wall-clock budgets fail on loaded hosts. """
+
+RUNS = 5
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import hiro_graph_client
+duration = time.perf_counter() - start
+print(json.dumps({"duration": duration, "modules": sorted(sys.modules)}))
+"""
+
+
+def _import_package() -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run([sys.executable, '-c', SCRIPT], env=env, check=True, capture_output=True, text=True)
+    return json.loads(result.stdout)
+
+
+class TestImportTimeBenchmark:
+
+    def test_heavy_modules_not_imported(self):
+        modules = _import_package()['modules']
+        for heavy_module in ['requests', 'backoff', 'websocket', 'apscheduler', 'hiro_graph_client.clientlib']:
+            assert heavy_module not in modules
+
+    @pytest.mark.skipif(not os.environ.get(BUDGET_ENV_VAR), reason=f"Set {BUDGET_ENV_VAR}=1 to check the budget")
+    def test_import_time(self):
+        results = [_import_package() for _ in range(RUNS)]
+        duration = min(result['duration'] for result in results)
+
+        print(f"\nimport hiro_graph_client: {duration * 1000:.1f}ms (best of {RUNS})")
+
+        assert duration < IMPORT_BUDGET
+
+    def test_lazy_attributes(self):
+        assert hiro_graph_client.HiroGraph.__name__ == 'HiroGraph'
+        for name in hiro_graph_client.__all__:
+            assert getattr(hiro_graph_client, name)
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from hiro_graph_client.clientlib import PasswordAuthTokenApiHandler, TokenInfo
+
+VERSION_INFO = {"auth": {"endpoint": "/api/auth/6.6", "version": "6.6"}}
+
+THREADS = 64
+READS_PER_THREAD = 2000
+
+
+class LockedTokenApiHandler(PasswordAuthTokenApiHandler):
+    """ Reads the token under the lock on every access like previous versions did. """
+
+    @property
+    def token(self) -> str:
+        with self._lock:
+            if not self._token_info.token:
+                self.get_token()
+            elif self._token_info.expired():
+                self.refresh_token()
+
+            return self._token_info.token
+
+
+def _create_handler(handler_class) -> PasswordAuthTokenApiHandler:
+    handler = handler_class(root_url='https://localhost', version_info=VERSION_INFO)
+    handler._publish_token_info(TokenInfo(token='token', expires_at=TokenInfo.get_epoch_millis() + 3600000))
+    return handler
+
+
+def _read_tokens(handler: PasswordAuthTokenApiHandler) -> float:
+    barrier = threading.Barrier(THREADS + 1)
+    errors = []
+
+    def _reader():
+        barrier.wait()
+        for _ in range(READS_PER_THREAD):
+            if handler.token != 'token':
+                errors.append('wrong token')
+
+    threads = [threading.Thread(target=_reader) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+
+    assert not errors
+    return duration
+
+
+class TestTokenReadBenchmark:
+
+    def test_token_read(self):
+        locked = _read_tokens(_create_handler(LockedTokenApiHandler))
+        lock_free = _read_tokens(_create_handler(PasswordAuthTokenApiHandler))
+
+        reads = THREADS * READS_PER_THREAD
+        print(f"\n{THREADS} threads, {reads} token reads: "
+              f"locked {locked:.3f}s ({reads / locked:.0f}/s), "
+              f"lock-free {lock_free:.3f}s ({reads / lock_free:.0f}/s)")
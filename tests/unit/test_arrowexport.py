@@ -0,0 +1,106 @@
+import logging
+from unittest import mock
+
+import pyarrow.parquet as pq
+import pytest
+
+from hiro_graph_client import arrowexport
+from hiro_graph_client.client import HiroGraph
+from hiro_graph_client.clientlib import FixedTokenApiHandler
+
+VERSION_INFO = {"graph": {"endpoint": "/api/graph/7.2", "version": "7.2"}}
+
+
+def _vertex(number: int) -> dict:
+    return {
+        "ogit/_id": f"id{number}",
+        "ogit/_type": "ogit/Machine",
+        "ogit/_modified-on": 1600000000000 + number,
+        "ogit/_tags": ["a", "b"],
+        "/free": None
+    }
+
+
+class TestArrowExport:
+
+    def test_pages(self, caplog):
+        pages = [
+            [_vertex(0), _vertex(1)],
+            [dict(_vertex(2), **{"ogit/_modified-on": "not a number", "/free": {"nested": 1}, "/new": "x"})],
+            [dict(_vertex(3), **{"/new": 1.5})]
+        ]
+
+        with caplog.at_level(logging.WARNING):
+            table = arrowexport.to_table(pages)
+
+        assert table.num_rows == 4
+        assert table.schema.field('ogit/_modified-on').type == 'string'
+        assert table.schema.field('/free').type == 'string'
+        assert table.column('ogit/_modified-on').to_pylist() == ['1600000000000', '1600000000001', 'not a number',
+                                                                 '1600000000003']
+        assert table.column('/free').to_pylist() == [None, None, '{"nested": 1}', None]
+        assert table.column('ogit/_tags').to_pylist()[0] == ['a', 'b']
+        assert table.column('/new').to_pylist() == [None, None, 'x', '1.5']
+        assert not caplog.text
+
+    def test_promoted_types(self):
+        pages = [[{"a": 1, "b": None}], [{"a": 1.5, "b": [1]}]]
+
+        table = arrowexport.to_table(pages)
+
+        assert table.schema.field('a').type == 'double'
+        assert table.column('a').to_pylist() == [1.0, 1.5]
+        assert table.column('b').to_pylist() == [None, [1]]
+
+    def test_parquet_raises_instead_of_dropping(self, tmp_path):
+        pages = [[_vertex(0)], [dict(_vertex(1), **{"/new": "x"})]]
+
+        with pytest.raises(arrowexport.SchemaMismatchError, match="'/new'"):
+            arrowexport.to_parquet(pages, str(tmp_path / 'test.parquet'))
+
+        with pytest.raises(arrowexport.SchemaMismatchError, match="'ogit/_modified-on'"):
+            arrowexport.to_parquet([[_vertex(0)], [dict(_vertex(1), **{"ogit/_modified-on": "x"})]],
+                                   str(tmp_path / 'test.parquet'))
+
+        count = arrowexport.to_parquet(pages, str(tmp_path / 'test.parquet'), arrowexport.scan_schema(pages))
+
+        assert count == 2
+        assert pq.read_table(str(tmp_path / 'test.parquet')).column('/new').to_pylist() == [None, 'x']
+
+    def test_query_to_parquet(self, tmp_path):
+        vertices = [_vertex(number) for number in range(5)]
+        requested = []
+
+        def _query(self, query, limit, offset, **kwargs):
+            requested.append(offset)
+            # The server caps pages at 2 vertices although 3 have been requested.
+            return {"items": vertices[offset:offset + min(limit, 2)]}
+
+        api_handler = FixedTokenApiHandler('token', root_url='https://localhost', version_info=VERSION_INFO)
+        with mock.patch.object(HiroGraph, 'query', _query):
+            count = HiroGraph(api_handler).query_to_parquet(str(tmp_path / 'test.parquet'), 'query', page_size=3)
+
+        assert count == 5
+        assert requested == [0, 2, 4, 5]
+        table = pq.read_table(str(tmp_path / 'test.parquet'))
+        assert table.column('ogit/_id').to_pylist() == [f"id{number}" for number in range(5)]
+
+    def test_events_on_window_edges_once(self):
+        timestamps = [1000, 1100, 1200, 1250, 1300]
+        requested = []
+
+        def _get_events(self, ts_from, ts_to, ogit_type=None, jfilter=None, records=False):
+            requested.append((ts_from, ts_to))
+            # Both ends are inclusive like in HIRO.
+            return {"items": [{"id": f"e{timestamp}", "timestamp": timestamp, "type": "UPDATE",
+                               "body": _vertex(timestamp)}
+                              for timestamp in timestamps if ts_from <= timestamp <= ts_to]}
+
+        api_handler = FixedTokenApiHandler('token', root_url='https://localhost', version_info=VERSION_INFO)
+        with mock.patch.object(HiroGraph, 'get_events', _get_events):
+            table = HiroGraph(api_handler).get_events_to_arrow(1000, 1300, window=100)
+            single = HiroGraph(api_handler).get_events_to_arrow(1300, 1300)
+
+        assert requested[:3] == [(1000, 1100), (1100, 1200), (1200, 1300)]
+        assert table.column('event/timestamp').to_pylist() == timestamps
+        assert single.column('event/timestamp').to_pylist() == [1300]
@@ -0,0 +1,91 @@
+import os
+import threading
+
+from hiro_graph_client.cachelib import FileTokenStore, FileLock, AbstractTokenStore, FileVersionCache
+from hiro_graph_client.clientlib import TokenInfo
+
+
+class TestFileTokenStore:
+
+    def test_save_load(self, tmp_path):
+        store = FileTokenStore(str(tmp_path / 'tokens.json'))
+        key = AbstractTokenStore.make_key('https://localhost', 'client', 'user')
+
+        assert store.load(key) is None
+
+        token_info = TokenInfo(token='token', refresh_token='refresh', expires_at=TokenInfo.get_epoch_millis() + 60000)
+        store.save(key, token_info.to_dict())
+
+        loaded = TokenInfo.from_dict(store.load(key))
+        assert loaded.token == 'token'
+        assert loaded.refresh_token == 'refresh'
+        assert loaded.expires_at == token_info.expires_at
+        assert not loaded.expired()
+        assert os.stat(store.path).st_mode & 0o777 == 0o600
+
+        store.save(key, None)
+        assert store.load(key) is None
+
+    def test_lock_is_exclusive(self, tmp_path):
+        lock = FileLock(str(tmp_path / 'test.lock'))
+        counter = []
+
+        def _increment():
+            for _ in range(100):
+                with lock:
+                    with lock:
+                        value = len(counter)
+                        counter.append(value)
+
+        threads = [threading.Thread(target=_increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter == list(range(400))
+
+    def test_stores_of_one_path_share_the_lock(self, tmp_path):
+        stores = [FileTokenStore(str(tmp_path / 'tokens.json')), FileVersionCache(str(tmp_path / 'tokens.json'))]
+
+        def _increment(store):
+            for _ in range(50):
+                with store.lock():
+                    data = store.load('counter') or {"value": 0}
+                    store.save('counter', {"value": data["value"] + 1})
+
+        threads = [threading.Thread(target=_increment, args=(store,)) for store in stores * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert stores[0].load('counter') == {"value": 200}
+
+        def _nested():
+            with stores[0].lock():
+                stores[1].save('nested', {})
+
+        # Locks of one path are reentrant across stores.
+        thread = threading.Thread(target=_nested, daemon=True)
+        thread.start()
+        thread.join(5)
+        assert not thread.is_alive()
+
+
+class TestFileVersionCache:
+
+    def test_ttl(self, tmp_path):
+        path = str(tmp_path / 'cache.json')
+        version_info = {"graph": {"endpoint": "/api/graph/7.2", "version": "7.2"}}
+
+        cache = FileVersionCache(path, ttl=60)
+        assert cache.load_version('https://localhost') == (None, True)
+
+        cache.save_version('https://localhost', version_info)
+        assert cache.load_version('https://localhost') == (version_info, False)
+        assert FileVersionCache(path, ttl=-1).load_version('https://localhost') == (version_info, True)
+
+        # A token store can share the same file
+        FileTokenStore(path).save('key', {"token": "token"})
+        assert cache.load_version('https://localhost') == (version_info, False)
@@ -0,0 +1,30 @@
+from unittest import mock
+
+from hiro_graph_client.clientlib import GraphConnectionHandler, FixedTokenApiHandler
+
+VERSION_INFO = {
+    "graph": {"endpoint": "/api/graph/7.2", "version": "7.2"},
+    "auth": {"endpoint": "/api/auth/6", "version": "6"}
+}
+
+
+class TestGraphConnectionHandler:
+
+    def teardown_method(self):
+        GraphConnectionHandler.clear_shared()
+
+    def test_lazy_shared_version(self):
+        with mock.patch.object(GraphConnectionHandler, 'get', return_value=VERSION_INFO) as get:
+            connection_handler = GraphConnectionHandler.get_shared('https://localhost')
+            assert GraphConnectionHandler.get_shared('https://localhost') is connection_handler
+
+            handler1 = FixedTokenApiHandler('token', connection_handler=connection_handler)
+            handler2 = FixedTokenApiHandler('token', connection_handler=handler1)
+            assert get.call_count == 0
+
+            assert handler2.get_api_endpoint_of('graph') == 'https://localhost/api/graph/7.2'
+            assert handler1.get_api_endpoint_of('auth') == 'https://localhost/api/auth/6'
+            assert get.call_count == 1
+
+        GraphConnectionHandler.clear_shared()
+        assert GraphConnectionHandler.get_shared('https://localhost') is not connection_handler
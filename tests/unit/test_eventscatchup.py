@@ -0,0 +1,57 @@
+import json
+import time
+from unittest import mock
+
+from hiro_graph_client.cachelib import FileEventPositionStore
+from hiro_graph_client.client import HiroGraph
+from hiro_graph_client.clientlib import FixedTokenApiHandler
+from hiro_graph_client.eventswebsocket import AbstractEventsWebSocketHandler, EventsFilter
+
+VERSION_INFO = {
+    "graph": {"endpoint": "/api/graph/7.2", "version": "7.2"},
+    "events-ws": {"endpoint": "/api/events-ws/6.1", "protocol": "events-1.0.0", "version": "6.1"}
+}
+
+
+def _event(number: int, timestamp: int) -> dict:
+    return {"id": f"event-{number}", "timestamp": timestamp, "nanotime": number, "type": "CREATE", "body": {}}
+
+
+class RecordingHandler(AbstractEventsWebSocketHandler):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.received = []
+
+    def on_create(self, message):
+        self.received.append(message.id)
+
+
+class TestEventsCatchUp:
+
+    def test_catch_up_and_dedupe(self, tmp_path):
+        now = int(time.time() * 1000) - 10000
+        store = FileEventPositionStore(str(tmp_path / 'positions.json'))
+        store.save_position('consumer', now, 1)
+        stored_events = [_event(1, now), _event(2, now + 500), _event(3, now + 1000)]
+
+        api_handler = FixedTokenApiHandler('token', root_url='https://localhost', version_info=VERSION_INFO)
+        handler = RecordingHandler(api_handler, [EventsFilter('all', '(element.ogit/_type=ogit/Node)')],
+                                   catch_up=True, position_store=store, position_name='consumer')
+
+        def _get_events(self, ts_from, ts_to, ogit_type=None, jfilter=None, records=False):
+            return {"items": [event for event in stored_events if ts_from <= event['timestamp'] <= ts_to]}
+
+        with mock.patch.object(HiroGraph, 'get_events', _get_events), \
+                mock.patch.object(RecordingHandler, 'send'), \
+                mock.patch.object(handler, '_token_scheduler'):
+            handler.on_open(None)
+
+        assert handler.received == ['event-2', 'event-3']
+
+        handler.on_message(None, json.dumps(_event(3, now + 1000)))
+        handler.on_message(None, json.dumps(_event(4, now + 1500)))
+        handler._save_position(force=True)
+
+        assert handler.received == ['event-2', 'event-3', 'event-4']
+        assert store.load_position('consumer') == (now + 1500, 4)
@@ -0,0 +1,48 @@
+import base64
+import json
+import time
+from unittest import mock
+
+from hiro_graph_client.clientlib import FixedTokenApiHandler
+from hiro_graph_client.eventswebsocket import AbstractEventsWebSocketHandler, EventsFilter
+
+VERSION_INFO = {
+    "graph": {"endpoint": "/api/graph/7.2", "version": "7.2"},
+    "events-ws": {"endpoint": "/api/events-ws/6.1", "protocol": "events-1.0.0", "version": "6.1"}
+}
+
+
+def _token(exp: int) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip('=')
+    return f"header.{payload}.signature"
+
+
+class EventsHandler(AbstractEventsWebSocketHandler):
+
+    def on_create(self, message):
+        pass
+
+
+class TestEventsTokenRefresh:
+
+    def test_fixed_token_not_scheduled(self):
+        api_handler = FixedTokenApiHandler(_token(int(time.time()) + 3600), root_url='https://localhost',
+                                           version_info=VERSION_INFO)
+        handler = EventsHandler(api_handler, [EventsFilter('all', '(element.ogit/_type=ogit/Node)')])
+
+        with mock.patch.object(handler, '_token_scheduler') as scheduler:
+            handler._set_next_token_refresh()
+
+        scheduler.add_job.assert_not_called()
+
+    def test_past_refresh_time_scheduled_soon(self):
+        api_handler = FixedTokenApiHandler('token', root_url='https://localhost', version_info=VERSION_INFO)
+        handler = EventsHandler(api_handler, [EventsFilter('all', '(element.ogit/_type=ogit/Node)')])
+
+        with mock.patch.object(handler, '_token_scheduler') as scheduler, \
+                mock.patch.object(FixedTokenApiHandler, 'can_refresh_token', return_value=True), \
+                mock.patch.object(FixedTokenApiHandler, 'refresh_time', return_value=int(time.time() * 1000) - 5000):
+            handler._set_next_token_refresh()
+
+        run_date = scheduler.add_job.call_args.kwargs['run_date']
+        assert time.time() < run_date.timestamp() <= time.time() + 2
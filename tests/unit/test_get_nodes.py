@@ -0,0 +1,56 @@
+import threading
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+
+from hiro_graph_client.client import HiroGraph
+from hiro_graph_client.clientlib import FixedTokenApiHandler
+
+VERSION_INFO = {"graph": {"endpoint": "/api/graph/7.2", "version": "7.2"}}
+
+
+class TestGetNodes:
+
+    def test_chunked_in_input_order_with_missing(self):
+        requested = []
+        lock = threading.Lock()
+
+        def _get(self, url, object_pairs_hook=None):
+            assert len(url) < 1000
+            ids = parse_qs(urlparse(url).query)['query'][0].split(',')
+            with lock:
+                requested.append(ids)
+            # Reverse order and without the missing ids, like the server could return them.
+            return {"items": [{"ogit/_id": node_id} for node_id in reversed(ids) if not node_id.startswith('missing')]}
+
+        node_ids = [f"id:{number}" for number in range(500)] + ['missing-1', 'id:3', 'missing-2']
+
+        api_handler = FixedTokenApiHandler('token', root_url='https://localhost', version_info=VERSION_INFO)
+        with mock.patch.object(HiroGraph, 'get', _get):
+            result = HiroGraph(api_handler).get_nodes(node_ids, chunk_size=100, max_query_length=500)
+
+        assert len(requested) > 5
+        assert all(len(chunk) <= 100 for chunk in requested)
+        assert sorted(node_id for chunk in requested for node_id in chunk) == sorted(set(node_ids))
+        assert [item['ogit/_id'] for item in result['items']] == [f"id:{number}" for number in range(500)]
+        assert result['missing'] == ['missing-1', 'missing-2']
+
+    def test_single_request_unchanged_and_added_field_removed(self):
+        requested = []
+
+        def _get(self, url, object_pairs_hook=None):
+            query = parse_qs(urlparse(url).query)
+            requested.append(query)
+            ids = query['query'][0].split(',')
+            return {"items": [{"ogit/_id": node_id, "ogit/name": node_id} for node_id in reversed(ids)]}
+
+        api_handler = FixedTokenApiHandler('token', root_url='https://localhost', version_info=VERSION_INFO)
+        with mock.patch.object(HiroGraph, 'get', _get):
+            hiro_client = HiroGraph(api_handler)
+            result = hiro_client.get_nodes(['b', 'a', 'b'], fields='ogit/name')
+            chunked = hiro_client.get_nodes(['b', 'a', 'b'], fields='ogit/name', chunk_size=100)
+
+        assert requested[0] == {"query": ['b,a,b'], "fields": ['ogit/name']}
+        assert result == {"items": [{"ogit/_id": node_id, "ogit/name": node_id} for node_id in ['b', 'a', 'b']]}
+
+        assert requested[1]['fields'] == ['ogit/name,ogit/_id']
+        assert chunked == {"items": [{"ogit/name": 'b'}, {"ogit/name": 'a'}], "missing": []}
@@ -0,0 +1,25 @@
+import json
+
+import requests
+
+from hiro_graph_client.jsonstream import JsonStream
+
+
+class TestJsonStream:
+
+    def test_encoding_is_equal_and_repeatable(self):
+        data = {"items": [{"timestamp": number, "value": str(number)} for number in range(2500)],
+                "nested": {"list": list(range(3)), 1: None, "empty": {}}, "text": "äö\"", "tuple": (1, 2)}
+        stream = JsonStream(data, chunk_size=1024, slice_size=100)
+
+        chunks = list(stream)
+        assert len(chunks) > 1
+        assert max(len(chunk) for chunk in chunks[:-1]) < 1024 + 10000
+        assert json.loads(b''.join(chunks)) == json.loads(json.dumps(data))
+        assert list(stream) == chunks
+
+    def test_sent_chunked(self):
+        request = requests.Request('POST', 'https://localhost/values', data=JsonStream({"items": [1]})).prepare()
+
+        assert request.headers.get('Transfer-Encoding') == 'chunked'
+        assert 'Content-Length' not in request.headers
@@ -0,0 +1,72 @@
+import json
+from unittest import mock
+
+import requests
+
+from hiro_graph_client.clientlib import FixedTokenApiHandler, GraphConnectionHandler
+from hiro_graph_client.loadbalancer import LoadBalancingSession
+
+VERSION_INFO = {"graph": {"endpoint": "/api/graph/7.2", "version": "7.2"}}
+
+
+class FakeNodes:
+
+    def __init__(self, down: set = None, versions: dict = None):
+        self.down = down or set()
+        self.versions = versions or {}
+        self.urls = []
+
+    def request(self, session, method, url, *args, **kwargs) -> requests.Response:
+        self.urls.append(url)
+        root_url = url.split('/api/')[0]
+        if root_url in self.down:
+            raise requests.exceptions.ConnectionError(f"{root_url} is down")
+
+        res = requests.Response()
+        res.status_code = 200
+        res.url = url
+        res.headers['Content-Type'] = 'application/json'
+        res._content = json.dumps(
+            self.versions.get(root_url, VERSION_INFO) if url.endswith('/api/version') else {"node": root_url}
+        ).encode('utf-8')
+        return res
+
+
+class TestLoadBalancingSession:
+
+    def test_spread_and_eject(self):
+        nodes = FakeNodes()
+        with mock.patch.object(requests.Session, 'request', autospec=True, side_effect=nodes.request):
+            handler = FixedTokenApiHandler('token', root_url=['https://a', 'https://b'], cool_down=60)
+            url = handler.get_api_endpoint_of('graph') + '/test'
+            assert url == 'https://a/api/graph/7.2/test'
+
+            assert {handler.get(url)['node'] for _ in range(4)} == {'https://a', 'https://b'}
+
+            nodes.down.add('https://b')
+            assert {handler.get(url)['node'] for _ in range(4)} == {'https://a'}
+            assert [node.ejected for node in handler._session.nodes] == [False, True]
+
+    def test_inconsistent_version(self):
+        nodes = FakeNodes(versions={'https://b': {"graph": {"endpoint": "/api/graph/8.0", "version": "8.0"}}})
+        with mock.patch.object(requests.Session, 'request', autospec=True, side_effect=nodes.request):
+            session = LoadBalancingSession(['https://a', 'https://b'])
+            assert session.select_root_url() == 'https://a'
+            assert session.select_root_url() == 'https://a'
+            assert [node.ejected for node in session.nodes] == [False, True]
+
+    def test_close_stops_health_check(self):
+        nodes = FakeNodes()
+        with mock.patch.object(requests.Session, 'request', autospec=True, side_effect=nodes.request):
+            connection_handler = GraphConnectionHandler.get_shared(['https://a', 'https://b'],
+                                                                   health_check_interval=0.01)
+            copy = FixedTokenApiHandler('token', connection_handler=connection_handler)
+            thread = connection_handler._session._health_check_thread
+            assert thread.is_alive()
+
+            copy.close()
+            assert thread.is_alive()
+
+            GraphConnectionHandler.clear_shared()
+            thread.join(5)
+            assert not thread.is_alive()
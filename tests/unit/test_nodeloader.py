@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+
+from hiro_graph_client.client import HiroGraph
+from hiro_graph_client.clientlib import FixedTokenApiHandler
+from hiro_graph_client.nodeloader import BatchLoader, MISSING
+
+VERSION_INFO = {"graph": {"endpoint": "/api/graph/7.2", "version": "7.2"}}
+
+
+class TestNodeLoader:
+
+    def test_batch_loader(self):
+        batches = []
+
+        def _batch_function(keys):
+            batches.append(sorted(keys))
+            return {key: key * 2 for key in keys if key != 3}
+
+        loader = BatchLoader(_batch_function, window=0.05, max_batch_size=100)
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            values = list(executor.map(loader.load, [1, 2, 3, 4, 1]))
+
+        assert values == [2, 4, MISSING, 8, 2]
+        assert batches == [[1, 2, 3, 4]]
+
+    def test_get_node_batched(self):
+        requested = []
+        lock = threading.Lock()
+
+        def _get(self, url, object_pairs_hook=None):
+            with lock:
+                requested.append(url)
+            parsed = urlparse(url)
+            if parsed.path.endswith('/query/ids'):
+                ids = parse_qs(parsed.query)['query'][0].split(',')
+                return {"items": [{"ogit/_id": node_id, "ogit/name": "n"} for node_id in ids
+                                  if not node_id.startswith('missing')]}
+            return {"error": {"code": 404, "message": "not found"}}
+
+        api_handler = FixedTokenApiHandler('token', root_url='https://localhost', version_info=VERSION_INFO)
+        hiro_client = HiroGraph(api_handler, batch_lookups=True, batch_window=0.05)
+
+        node_ids = [f"id:{number}" for number in range(20)] + ['missing-1']
+        with mock.patch.object(HiroGraph, 'get', _get):
+            with ThreadPoolExecutor(max_workers=len(node_ids)) as executor:
+                results = list(executor.map(lambda node_id: hiro_client.get_node(node_id, fields='ogit/name'),
+                                            node_ids))
+
+        assert results[:-1] == [{"ogit/name": "n"}] * 20
+        assert results[-1] == {"error": {"code": 404, "message": "not found"}}
+
+        # One batch for all ids plus the individual request for the missing one.
+        assert len(requested) == 2
+        assert '/query/ids' in requested[0]
+        assert requested[1].startswith('https://localhost/api/graph/7.2/missing-1')
@@ -0,0 +1,81 @@
+import pstats
+import time
+
+from hiro_graph_client import profiling
+from hiro_graph_client.profiling import profile_public_methods, profiled
+
+
+@profile_public_methods
+class Profiled:
+
+    def outer(self) -> int:
+        return self.inner() + 1
+
+    def inner(self) -> int:
+        return sum(range(1000))
+
+    def items(self):
+        yield from range(3)
+
+
+class TestProfiling:
+
+    def teardown_method(self):
+        profiling.disable_profiling()
+
+    def test_disabled(self):
+        assert profiling.get_profiler() is None
+        assert Profiled().outer() == 499501
+        assert profiling.dump_profile() is None
+
+    def test_call_stats(self, tmp_path):
+        profiler = profiling.enable_profiling(dump_at_exit=False)
+
+        obj = Profiled()
+        obj.outer()
+        obj.outer()
+        assert list(obj.items()) == [0, 1, 2]
+        with profiled('on_message', obj):
+            pass
+
+        stats = profiler.call_stats()
+        assert stats['Profiled.outer']['calls'] == 2
+        assert stats['Profiled.outer']['sampled'] == 2
+        # Nested calls are timed, but only sampled as part of their caller
+        assert stats['Profiled.inner']['calls'] == 2
+        assert stats['Profiled.inner']['sampled'] == 0
+        assert stats['Profiled.items']['calls'] == 1
+        assert stats['Profiled.on_message']['calls'] == 1
+
+        path = profiling.dump_profile(str(tmp_path / 'test.prof'))
+        assert path
+        assert pstats.Stats(path).total_calls > 0
+
+    def test_generator_steps(self):
+        profiler = profiling.enable_profiling(dump_at_exit=False)
+
+        obj = Profiled()
+        items = obj.items()
+        assert next(items) == 0
+
+        # The caller's own code between two steps is neither attributed to the generator nor blocks sampling.
+        time.sleep(0.2)
+        obj.outer()
+        assert list(items) == [1, 2]
+
+        abandoned = obj.items()
+        next(abandoned)
+        obj.outer()
+
+        stats = profiler.call_stats()
+        assert stats['Profiled.items']['calls'] == 2
+        assert stats['Profiled.items']['wall_time'] < 0.1
+        assert stats['Profiled.outer']['sampled'] == 2
+
+    def test_sample_rate(self):
+        profiler = profiling.enable_profiling(sample_rate=0.0, dump_at_exit=False)
+
+        Profiled().outer()
+
+        assert profiler.call_stats()['Profiled.outer']['sampled'] == 0
+        assert profiler.dump() is None
@@ -0,0 +1,75 @@
+import json
+import pickle
+
+from hiro_graph_client.records import record_pairs_hook, NodeRecord, EdgeRecord, LazyValue
+
+PAYLOAD = {
+    "items": [
+        {
+            "ogit/_id": "node1",
+            "ogit/_type": "ogit/Person",
+            "ogit/_modified-on": 1600000000000,
+            "ogit/name": "Tom",
+            "ogit/_tags": ["a", "b"]
+        },
+        {
+            "ogit/_id": "node1$$ogit/relates$$node2",
+            "ogit/_type": "ogit/relates",
+            "ogit/_out-id": "node1",
+            "ogit/_in-id": "node2"
+        },
+        {
+            "no-id": {"ogit/_type": "ogit/Person"}
+        }
+    ]
+}
+
+
+class TestRecords:
+
+    def test_decode(self):
+        result = json.loads(json.dumps(PAYLOAD), object_pairs_hook=record_pairs_hook)
+        node, edge, other = result['items']
+
+        assert isinstance(node, NodeRecord)
+        assert node.id == 'node1'
+        assert node.type == 'ogit/Person'
+        assert node.modified_on == 1600000000000
+        assert node['ogit/name'] == 'Tom'
+        assert node.get('ogit/missing') is None
+        assert node == PAYLOAD['items'][0]
+        assert node.to_dict() == PAYLOAD['items'][0]
+        assert type(node.to_dict()) is dict
+
+        assert isinstance(edge, EdgeRecord)
+        assert (edge.out_id, edge.in_id) == ('node1', 'node2')
+
+        assert type(other) is dict
+        assert other == PAYLOAD['items'][2]
+
+        assert pickle.loads(pickle.dumps(node)) == node
+
+    def test_shared_layout(self):
+        first = json.loads(json.dumps(PAYLOAD), object_pairs_hook=record_pairs_hook)['items'][0]
+        second = json.loads(json.dumps(PAYLOAD), object_pairs_hook=record_pairs_hook)['items'][0]
+
+        assert first._layout is second._layout
+        assert first.type is second.type
+
+    def test_lazy_nested_objects(self):
+        vertex = {
+            "ogit/_id": "node1",
+            "ogit/_type": "ogit/Person",
+            "ogit/name": {"value": "Tom", "meta": {"modified": 1600000000000}},
+            "/owner": {"ogit/_id": "node2", "ogit/_type": "ogit/Person", "/meta": {"a": 1}}
+        }
+
+        node = json.loads(json.dumps(vertex), object_pairs_hook=record_pairs_hook)
+
+        assert type(node._values[2]) is LazyValue
+        assert node['ogit/name'] == vertex['ogit/name']
+        assert node.get('ogit/name')['meta'] == {"modified": 1600000000000}
+        assert isinstance(node['/owner'], NodeRecord)
+        assert node == vertex
+        assert node.to_dict() == vertex
+        assert pickle.loads(pickle.dumps(node)) == vertex
@@ -0,0 +1,56 @@
+import threading
+from unittest import mock
+
+from hiro_graph_client import replay
+from hiro_graph_client.client import HiroGraph
+from hiro_graph_client.clientlib import FixedTokenApiHandler
+
+VERSION_INFO = {"graph": {"endpoint": "/api/graph/7.2", "version": "7.2"}}
+
+EVENTS = [{"id": str(number), "timestamp": number // 3, "nanotime": 100 - number, "body": {}} for number in range(300)]
+
+
+class TestReplay:
+
+    def test_ordered_without_duplicates_and_bounded(self):
+        active = []
+        lock = threading.Lock()
+
+        def _fetch(start: int, end: int) -> list:
+            with lock:
+                active.append(start)
+            # Both ends inclusive and in reverse order, like a server could return them.
+            return [event for event in reversed(EVENTS) if start <= event['timestamp'] <= end]
+
+        iterator = replay.replay_slices(_fetch, 0, 100, 10, concurrency=2, prefetch=3)
+        first = next(iterator)
+        assert len(active) <= 4
+
+        events = [first] + list(iterator)
+        assert [replay.event_time(event) for event in events] == sorted(replay.event_time(event) for event in EVENTS)
+        assert len({event['id'] for event in events}) == 300
+
+    def test_entries_without_timestamp_once(self):
+        def _fetch(start: int, end: int) -> list:
+            return [{"id": "no time"}] + [event for event in EVENTS if start <= event['timestamp'] <= end]
+
+        events = list(replay.replay_slices(_fetch, 0, 100, 10))
+
+        assert [event['id'] for event in events].count("no time") == 1
+        assert events[0]['id'] == "no time"
+        assert len(events) == 301
+
+    def test_replay_history_pages(self):
+        requests = []
+
+        def _get_history(self, node_id, start, end, history_type, limit, offset, include_deleted, meta):
+            requests.append((start, end, offset))
+            entries = [event for event in EVENTS if start <= event['timestamp'] <= end]
+            return {"items": entries[offset:offset + limit]}
+
+        api_handler = FixedTokenApiHandler('token', root_url='https://localhost', version_info=VERSION_INFO)
+        with mock.patch.object(HiroGraph, 'get_history', _get_history):
+            events = list(HiroGraph(api_handler).replay_history('node', 0, 100, window=50, page_size=100))
+
+        assert len(events) == 300
+        assert sorted(requests) == [(0, 50, 0), (0, 50, 100), (50, 100, 0), (50, 100, 100)]
@@ -0,0 +1,82 @@
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from hiro_graph_client import timeseriesaggregation as aggregation
+from hiro_graph_client.client import HiroGraph
+from hiro_graph_client.clientlib import FixedTokenApiHandler
+from hiro_graph_client.timeserieslib import TimeseriesArrays
+
+VERSION_INFO = {"graph": {"endpoint": "/api/graph/7.2", "version": "7.2"}}
+
+
+def _arrays(timestamps, values, mask=None):
+    return TimeseriesArrays(np.array(timestamps, dtype=np.int64), np.array(values, dtype=np.float64),
+                            None if mask is None else np.array(mask, dtype=bool))
+
+
+class TestTimeseriesAggregation:
+
+    def test_downsample(self):
+        arrays = _arrays([0, 5, 9, 10, 30, 31], [1, 2, 6, 4, 5, 7], [False, False, False, False, False, True])
+
+        mean = aggregation.downsample(arrays, 10)
+        assert mean.timestamps.tolist() == [0, 10, 30]
+        assert mean.values.tolist() == [3.0, 4.0, 5.0]
+
+        assert aggregation.downsample(arrays, 10, aggregation.LAST).values.tolist() == [6.0, 4.0, 5.0]
+        assert aggregation.downsample(arrays, 10, aggregation.MAX).values.tolist() == [6.0, 4.0, 5.0]
+        assert aggregation.downsample(arrays, 10, 50.0).values.tolist() == [2.0, 4.0, 5.0]
+
+        values = np.random.default_rng(1).random(1000)
+        percentile = aggregation.downsample(_arrays(np.arange(1000), values), 100, 95.0)
+        assert np.allclose(percentile.values, np.percentile(values.reshape(10, 100), 95.0, axis=1))
+
+    def test_lttb_keeps_peaks(self):
+        values = np.zeros(1000)
+        values[500] = 10.0
+        reduced = aggregation.lttb(_arrays(np.arange(1000), values), 20)
+
+        assert len(reduced) == 20
+        assert reduced.timestamps[0] == 0 and reduced.timestamps[-1] == 999
+        assert 10.0 in reduced.values.tolist()
+
+    def test_align_and_fill(self):
+        series = {
+            'a': _arrays([0, 10, 20, 30], [1, 2, 3, 4]),
+            'b': _arrays([0, 30], [10, 40])
+        }
+
+        aligned = aggregation.align(series, 10, 0, 40, fill=aggregation.FILL_LINEAR)
+        assert aligned.timestamps.tolist() == [0, 10, 20, 30]
+        assert aligned.values.tolist() == [[1, 10], [2, 20], [3, 30], [4, 40]]
+
+        previous = aggregation.align(series, 10, 0, 40, fill=aggregation.FILL_PREVIOUS)
+        assert previous.column('b').values.tolist() == [10, 10, 10, 40]
+
+        assert np.isnan(aggregation.align(series, 10, 0, 40).values[1, 1])
+
+    def test_rate_with_counter_reset(self):
+        arrays = _arrays([0, 1000, 2000, 3000], [10, 20, 5, 15])
+
+        assert aggregation.delta(arrays).values.tolist() == [10, -15, 10]
+        assert aggregation.rate(arrays, counter=True).values.tolist() == [10, 5, 10]
+
+    def test_get_timeseries_matrix(self):
+        def _get(self, url):
+            node_id = urlparse(url).path.split('/')[-2]
+            query = parse_qs(urlparse(url).query)
+            start, end = int(query['from'][0]), int(query['to'][0])
+            timestamps = range(0, 100, 10) if node_id == 'a' else range(5, 100, 20)
+            return {"items": [{"timestamp": timestamp, "value": str(timestamp)}
+                              for timestamp in timestamps if start <= timestamp <= end]}
+
+        api_handler = FixedTokenApiHandler('token', root_url='https://localhost', version_info=VERSION_INFO)
+        with mock.patch.object(HiroGraph, 'get', _get):
+            matrix = HiroGraph(api_handler).get_timeseries_matrix(['b', 'a', 'b'], 0, 100, 20,
+                                                                   fill=aggregation.FILL_PREVIOUS)
+
+        assert matrix.ids == ['b', 'a']
+        assert matrix.timestamps.tolist() == [0, 20, 40, 60, 80]
+        assert matrix.values.tolist() == [[5, 5], [25, 25], [45, 45], [65, 65], [85, 85]]
@@ -0,0 +1,66 @@
+from hiro_graph_client.timeseriescache import TimeseriesCache
+
+
+class FakeClient:
+
+    def __init__(self, timestamps: list):
+        self.timestamps = timestamps
+        self.requests = []
+
+    def get_timeseries_range(self, node_id, ts_from, ts_to, include_deleted=None, with_ids=None, aggregate=None,
+                             limit=10000, concurrency=4):
+        self.requests.append((node_id, ts_from, ts_to))
+        return [{"timestamp": timestamp, "value": timestamp} for timestamp in self.timestamps
+                if ts_from <= timestamp < ts_to]
+
+
+class TestTimeseriesCache:
+
+    def test_fetch_missing_intervals_only(self):
+        client = FakeClient(list(range(0, 1000, 10)))
+        cache = TimeseriesCache(client, freshness=0)
+
+        assert [item['timestamp'] for item in cache.get('a', 100, 300)] == list(range(100, 300, 10))
+        assert [item['timestamp'] for item in cache.get('a', 200, 500)] == list(range(200, 500, 10))
+        assert [item['timestamp'] for item in cache.get('a', 0, 600)] == list(range(0, 600, 10))
+
+        assert client.requests == [('a', 100, 300), ('a', 300, 500), ('a', 0, 100), ('a', 500, 600)]
+
+        cache.get('a', 50, 550, aggregate='max')
+        assert client.requests[-1] == ('a', 50, 550)
+
+    def test_callers_cannot_change_the_cache(self):
+        client = FakeClient([0, 10, 20])
+        cache = TimeseriesCache(client, freshness=0)
+
+        cache.get('a', 0, 30)[0]['value'] = 'changed'
+
+        assert cache.get('a', 0, 30)[0]['value'] == 0
+        assert len(client.requests) == 1
+
+    def test_recent_edge_is_not_cached(self):
+        client = FakeClient([0, 10, 20])
+        cache = TimeseriesCache(client, freshness=10 ** 12)
+
+        cache.get('a', 0, 30)
+        client.timestamps.append(25)
+
+        assert [item['timestamp'] for item in cache.get('a', 0, 30)] == [0, 10, 20, 25]
+        assert len(client.requests) == 2
+
+    def test_eviction_and_spill(self, tmp_path):
+        client = FakeClient(list(range(100)))
+        cache = TimeseriesCache(client, max_values=150, freshness=0, spill_directory=str(tmp_path))
+
+        cache.get('a', 0, 100)
+        cache.get('b', 0, 100)
+
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['cached_values'] == 100
+
+        assert len(cache.get('a', 0, 100)) == 100
+        assert len(client.requests) == 2
+
+        cache.invalidate()
+        cache.get('a', 0, 100)
+        assert len(client.requests) == 3
@@ -0,0 +1,73 @@
+import logging
+import threading
+
+from hiro_graph_client.timeseriesfollower import TimeseriesFollower
+
+
+class FakeClient:
+
+    def __init__(self):
+        self.values = {'a': [], 'b': []}
+        self.requests = []
+
+    def get_timeseries(self, node_id, starttime=None, include_deleted=None, limit=None, order=None):
+        self.requests.append((node_id, int(starttime)))
+        return [item for item in self.values[node_id] if item['timestamp'] >= int(starttime)][:limit]
+
+
+class TestTimeseriesFollower:
+
+    def test_poll_dedupes_boundary_and_adapts_interval(self):
+        client = FakeClient()
+        follower = TimeseriesFollower(client, ['a', 'b'], ts_from=10, min_interval=0.001, max_interval=10, limit=2)
+
+        client.values['a'] = [{"timestamp": 5, "value": 0}, {"timestamp": 10, "value": 1},
+                               {"timestamp": 20, "value": 2}, {"timestamp": 20, "value": 3}]
+
+        assert follower.poll() == [('a', [{"timestamp": 10, "value": 1}, {"timestamp": 20, "value": 2}])]
+        assert follower.poll() == [('a', [{"timestamp": 20, "value": 3}])]
+        assert follower.poll() == []
+        assert follower.positions() == {'a': 20, 'b': 10}
+
+        assert follower._series['b'].interval > 0.001
+        follower.stop()
+
+    def test_limit_values_on_one_timestamp(self, caplog):
+        client = FakeClient()
+        follower = TimeseriesFollower(client, ['a'], ts_from=10, min_interval=0.001, max_interval=10, limit=2)
+
+        client.values['a'] = [{"timestamp": 10, "value": 1}, {"timestamp": 10, "value": 2},
+                               {"timestamp": 10, "value": 3}]
+
+        assert follower.poll() == [('a', [{"timestamp": 10, "value": 1}, {"timestamp": 10, "value": 2}])]
+        with caplog.at_level(logging.WARNING):
+            assert follower.poll() == []
+
+        assert "Timeseries a is stuck" in caplog.text
+        assert follower._series['a'].interval == 10
+        follower.stop()
+
+    def test_background_callback(self):
+        client = FakeClient()
+        client.values['a'] = [{"timestamp": 10, "value": 1}]
+        received = []
+        event = threading.Event()
+
+        def _on_values(node_id, items):
+            received.append((node_id, items))
+            event.set()
+
+        follower = TimeseriesFollower(client, ['a'], ts_from=0, min_interval=0.01, on_values=_on_values)
+        follower.start()
+        assert event.wait(5)
+        follower.stop(timeout=5)
+
+        assert received == [('a', [{"timestamp": 10, "value": 1}])]
+
+    def test_poll_after_stop(self):
+        client = FakeClient()
+        follower = TimeseriesFollower(client, ['a'], ts_from=0)
+        follower.stop()
+
+        assert follower.poll() == []
+        assert client.requests == []
@@ -0,0 +1,73 @@
+import json
+from unittest import mock
+
+import numpy
+
+from hiro_graph_client import timeserieslib
+from hiro_graph_client.client import HiroGraph
+from hiro_graph_client.clientlib import FixedTokenApiHandler
+
+VERSION_INFO = {"graph": {"endpoint": "/api/graph/7.2", "version": "7.2"}}
+
+
+def _decode(payload: dict) -> list:
+    return json.loads(json.dumps(payload))['items']
+
+
+class TestTimeseriesArrays:
+
+    def test_numeric(self):
+        items = _decode({"items": [{"timestamp": 1, "value": "1.5"}, {"timestamp": 2, "value": 2}]})
+        arrays = timeserieslib.to_arrays(items)
+
+        assert arrays.timestamps.dtype == numpy.int64
+        assert arrays.values.dtype == numpy.float64
+        assert arrays.values.tolist() == [1.5, 2.0]
+        assert arrays.mask is None
+
+    def test_non_numeric(self):
+        items = _decode({"items": [{"timestamp": 1, "value": "1.5"}, {"timestamp": 2, "value": "on"}]})
+
+        masked = timeserieslib.to_arrays(items)
+        assert masked.values[0] == 1.5
+        assert numpy.isnan(masked.values[1])
+        assert masked.mask.tolist() == [False, True]
+        assert masked.to_items() == [{"timestamp": 1, "value": 1.5}, {"timestamp": 2, "value": None}]
+
+        kept = timeserieslib.to_arrays(items, non_numeric=timeserieslib.OBJECT)
+        assert kept.values.dtype == object
+        assert kept.values.tolist() == ["1.5", "on"]
+
+    def test_split_ids(self):
+        payload = {"items": [
+            {"timestamp": 1, "value": "1", "id": "a"},
+            {"timestamp": 1, "value": "2", "id": "b"},
+            {"timestamp": 2, "value": "3", "id": "a"}
+        ]}
+
+        api_handler = FixedTokenApiHandler('token', root_url='https://localhost', version_info=VERSION_INFO)
+        with mock.patch.object(HiroGraph, 'get', lambda self, url: {"items": _decode(payload)}):
+            arrays = HiroGraph(api_handler).get_timeseries_arrays('a', with_ids='b', aggregate='none', split_ids=True)
+
+        assert arrays['a'].timestamps.tolist() == [1, 2]
+        assert arrays['a'].values.tolist() == [1.0, 3.0]
+        assert arrays['b'].values.tolist() == [2.0]
+
+
+class TestFetchRange:
+
+    def test_subdivide_truncated_slices(self):
+        timestamps = list(range(0, 1000, 2)) + [500] * 3 + list(range(1000, 1010))
+        timestamps.sort()
+        requests = []
+
+        def _fetch(starttime: int, endtime: int, limit: int) -> list:
+            requests.append((starttime, endtime))
+            # The end is inclusive here, which fetch_range has to handle.
+            return [{"timestamp": timestamp, "value": timestamp}
+                    for timestamp in timestamps if starttime <= timestamp <= endtime][:limit]
+
+        items = timeserieslib.fetch_range(_fetch, 0, 1005, limit=20, slices=2, concurrency=3)
+
+        assert [item['timestamp'] for item in items] == [timestamp for timestamp in timestamps if timestamp < 1005]
+        assert len(requests) > 2
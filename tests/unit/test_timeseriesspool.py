@@ -0,0 +1,121 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from hiro_graph_client.timeseriesspool import TimeseriesSpool, TimeseriesShipper, SpoolFullError, DROP_OLDEST, \
+    DEAD_LETTER_FILE
+
+
+class FakeClient:
+
+    def __init__(self):
+        self.available = threading.Event()
+        self.batches = []
+
+    def post_timeseries(self, node_id, items, synchronous=True, ttl=None):
+        if not self.available.is_set():
+            raise ConnectionError('unreachable')
+        self.batches.append((node_id, list(items)))
+        return {}
+
+
+class TestTimeseriesSpool:
+
+    def test_segments_survive_reopen(self, tmp_path):
+        spool = TimeseriesSpool(str(tmp_path), segment_size=100)
+        for number in range(10):
+            spool.append('a', [{"timestamp": number, "value": number}])
+
+        records, position = spool.read(3)
+        assert len(records) == 2
+        spool.commit(position)
+        assert spool.stats()['segments'] > 1
+        spool.close()
+
+        with open(tmp_path / sorted(path.name for path in tmp_path.glob('*.seg'))[-1], 'ab') as file:
+            file.write(b'{"id":"a","items":[{"time')
+
+        spool = TimeseriesSpool(str(tmp_path), segment_size=100)
+        assert spool.stats()['pending_records'] == 8
+
+        timestamps = []
+        while spool.stats()['pending_records']:
+            records, position = spool.read(100)
+            timestamps.extend(item['timestamp'] for node_id, items in records for item in items)
+            spool.commit(position)
+
+        assert timestamps == list(range(2, 10))
+
+    def test_size_cap(self, tmp_path):
+        spool = TimeseriesSpool(str(tmp_path / 'raise'), segment_size=100, max_bytes=200)
+        with pytest.raises(SpoolFullError):
+            for number in range(10):
+                spool.append('a', [{"timestamp": number, "value": number}])
+
+        spool = TimeseriesSpool(str(tmp_path / 'drop'), segment_size=100, max_bytes=200, overflow=DROP_OLDEST)
+        for number in range(10):
+            spool.append('a', [{"timestamp": number, "value": number}])
+
+        stats = spool.stats()
+        assert stats['dropped_records'] > 0
+        assert stats['pending_records'] + stats['dropped_records'] == 10
+        assert stats['pending_bytes'] <= 200
+
+
+class TestTimeseriesShipper:
+
+    def test_ships_in_order_after_recovery(self, tmp_path):
+        client = FakeClient()
+        shipper = TimeseriesShipper(client, TimeseriesSpool(str(tmp_path)), batch_size=3, max_backoff=0.05)
+
+        for number in range(5):
+            shipper.write('a', number, number)
+        shipper.write_items('b', [{"timestamp": 0, "value": 0}])
+
+        assert not shipper.flush(timeout=0.2)
+        assert shipper.stats()['failures'] > 0
+        assert shipper.stats()['pending_records'] == 6
+
+        client.available.set()
+        assert shipper.flush(timeout=5)
+        shipper.close()
+
+        assert [(node_id, [item['timestamp'] for item in items]) for node_id, items in client.batches] == \
+               [('a', [0, 1, 2]), ('a', [3, 4]), ('b', [0])]
+
+    def test_dead_letter_and_resume_after_shipped_batches(self, tmp_path):
+        client = FakeClient()
+        client.available.set()
+        unavailable_once = {('a', 3)}
+
+        def _post_timeseries(node_id, items, synchronous=True, ttl=None):
+            response = requests.Response()
+            if node_id == 'unknown':
+                response.status_code = 404
+                raise requests.exceptions.HTTPError('404 Not Found', response=response)
+            if (node_id, items[0]['timestamp']) in unavailable_once:
+                unavailable_once.clear()
+                response.status_code = 503
+                raise requests.exceptions.HTTPError('503 Service Unavailable', response=response)
+            client.batches.append((node_id, list(items)))
+            return {}
+
+        client.post_timeseries = _post_timeseries
+        spool = TimeseriesSpool(str(tmp_path))
+        spool.append('unknown', [{"timestamp": 0, "value": 0}])
+        for number in range(5):
+            spool.append('a', [{"timestamp": number, "value": number}])
+
+        shipper = TimeseriesShipper(client, spool, batch_size=3, max_backoff=0.05)
+        assert shipper.flush(timeout=5)
+        stats = shipper.stats()
+        shipper.close()
+
+        assert [(node_id, [item['timestamp'] for item in items]) for node_id, items in client.batches] == \
+               [('a', [0, 1, 2]), ('a', [3, 4])]
+        assert stats['failures'] == 1
+        assert stats['dead_letter_values'] == 1
+        with open(tmp_path / DEAD_LETTER_FILE, 'r', encoding='utf-8') as file:
+            assert json.loads(file.readline())['id'] == 'unknown'
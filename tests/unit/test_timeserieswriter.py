@@ -0,0 +1,70 @@
+import threading
+import time
+
+from hiro_graph_client.timeserieswriter import TimeseriesWriter
+
+
+class FakeClient:
+
+    def __init__(self, delay: float = 0.0, fail: set = None):
+        self.delay = delay
+        self.fail = fail or set()
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def post_timeseries(self, node_id, items, synchronous=True, ttl=None):
+        time.sleep(self.delay)
+        if node_id in self.fail:
+            raise ValueError('failed')
+        with self.lock:
+            self.batches.append((node_id, list(items)))
+        return {}
+
+
+class TestTimeseriesWriter:
+
+    def test_batches_and_stats(self):
+        client = FakeClient(fail={'bad'})
+        results = []
+
+        with TimeseriesWriter(client, batch_size=10, max_age=60, on_flush=results.append) as writer:
+            for number in range(25):
+                writer.write('a', number, number)
+            writer.write('bad', 0, 0)
+            assert writer.flush(timeout=5)
+
+            stats = writer.stats()
+
+        assert sorted(len(items) for node_id, items in client.batches) == [5, 10, 10]
+        batches = sorted(client.batches, key=lambda batch: batch[1][0]['timestamp'])
+        assert [item['timestamp'] for node_id, items in batches if node_id == 'a' for item in items] == list(range(25))
+        assert stats['values_written'] == 25
+        assert stats['values_failed'] == 1
+        assert stats['failures'] == 1
+        assert stats['buffered'] == 0
+        assert len(results) == 4
+
+    def test_max_age(self):
+        client = FakeClient()
+        with TimeseriesWriter(client, batch_size=100, max_age=0.05) as writer:
+            writer.write('a', 1, 1.0)
+            time.sleep(0.3)
+            assert client.batches == [('a', [{"timestamp": 1, "value": 1.0}])]
+
+    def test_backpressure(self):
+        client = FakeClient(delay=0.2)
+        with TimeseriesWriter(client, batch_size=2, max_buffered=2, max_age=0.01) as writer:
+            writer.write_items('a', [{"timestamp": 1, "value": 1}, {"timestamp": 2, "value": 2}])
+            start = time.monotonic()
+            writer.write('a', 3, 3)
+            assert time.monotonic() - start >= 0.1
+
+    def test_backpressure_flushes_oldest_buffers_only(self):
+        client = FakeClient()
+        with TimeseriesWriter(client, batch_size=2, max_buffered=3, max_age=60) as writer:
+            writer.write('a', 1, 1)
+            writer.write('b', 1, 1)
+            writer.write_items('c', [{"timestamp": 1, "value": 1}, {"timestamp": 2, "value": 2}])
+
+            assert client.batches == [('a', [{"timestamp": 1, "value": 1}])]
+            assert writer.stats()['buffered'] == 3
@@ -0,0 +1,45 @@
+import pytest
+import requests
+
+from hiro_graph_client.client import HiroGraph
+from hiro_graph_client.clientlib import AbstractTokenApiHandler
+
+VERSION_INFO = {"graph": {"endpoint": "/api/graph/7.2", "version": "7.2"}}
+
+
+class LegacyTokenApiHandler(AbstractTokenApiHandler):
+    """
+    A handler of a user that overrides the methods with their original signatures.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.refreshed = 0
+
+    @property
+    def token(self) -> str:
+        return 'token'
+
+    def refresh_token(self) -> None:
+        self.refreshed += 1
+
+    def revoke_token(self, token_hint: str = "revoke_token") -> None:
+        pass
+
+    def refresh_time(self):
+        return None
+
+
+class TestTokenHandler:
+
+    def test_legacy_refresh_token_on_401(self):
+        api_handler = LegacyTokenApiHandler(root_url='https://localhost', version_info=VERSION_INFO)
+        hiro_client = HiroGraph(api_handler)
+        hiro_client._handle_token()
+
+        response = requests.Response()
+        response.status_code = 401
+        with pytest.raises(requests.exceptions.RequestException):
+            hiro_client._check_response(response)
+
+        assert api_handler.refreshed == 1